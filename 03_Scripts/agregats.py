@@ -0,0 +1,313 @@
+"""
+Tables agrégées des tableaux de bord Power BI, maintenues après chaque
+chargement de upload_to_sql.py.
+
+    Vue exécutive      : Agg_Ventes_Jour, Agg_CA_Mensuel (CA vs Objectifs_Mensuels)
+    Clients / RFM      : Agg_Clients_Segment
+    Produits / ABC     : Agg_Produits_Mois
+    Retours / logist.  : Agg_Retours_Jour
+    Trafic / funnel    : Agg_Funnel_Jour
+
+Après un chargement incrémental, seules les dates (ou mois) qui ont reçu
+de nouvelles lignes de faits sont recalculées : DELETE puis INSERT ...
+SELECT restreints à ces ID_Date, dans une transaction par agrégat. Les
+petits agrégats (mensuel, segments clients) sont recalculés en entier à
+partir des agrégats journaliers et des dimensions. Les tableaux de bord
+lisent quelques milliers de lignes au lieu des tables de faits.
+
+Une modification de dimension (upsert d'une ville, d'une catégorie) ne
+recalcule pas les dates passées : reconstruction complète avec
+    python agregats.py
+ou un chargement MODE_RAFRAICHISSEMENT=complet.
+"""
+
+import os
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+
+from instrumentation import instrumente
+from lectures import lire_excel_par_lots
+
+# ============================================
+# DÉFINITION DES AGRÉGATS
+# ============================================
+
+DDL_AGREGATS = [
+    """
+    CREATE TABLE IF NOT EXISTS Objectifs_Mensuels (
+      Annee INT,
+      Mois INT,
+      Objectif_CA DECIMAL(14,2),
+      Budget_Marketing DECIMAL(14,2),
+      PRIMARY KEY (Annee, Mois)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS Agg_Ventes_Jour (
+      ID_Date INT,
+      ID_Canal INT,
+      Categorie VARCHAR(64),
+      Ville VARCHAR(64),
+      Nb_Ventes INT,
+      Quantite INT,
+      CA_HT DECIMAL(14,2),
+      CA_TTC DECIMAL(14,2),
+      Marge DECIMAL(14,2),
+      Remise DECIMAL(14,2),
+      PRIMARY KEY (ID_Date, ID_Canal, Categorie, Ville)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS Agg_Produits_Mois (
+      Annee INT,
+      Mois INT,
+      ID_Produit INT,
+      Categorie VARCHAR(64),
+      Nb_Ventes INT,
+      Quantite INT,
+      CA_HT DECIMAL(14,2),
+      Marge DECIMAL(14,2),
+      PRIMARY KEY (Annee, Mois, ID_Produit)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS Agg_Retours_Jour (
+      ID_Date INT,
+      ID_Motif INT,
+      Nb_Retours INT,
+      Montant_Rembourse DECIMAL(14,2),
+      Delai_Total_Jours INT,
+      PRIMARY KEY (ID_Date, ID_Motif)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS Agg_Funnel_Jour (
+      ID_Date INT,
+      Nb_Sessions INT,
+      Nb_Sessions_Clients INT,
+      Pages_Vues INT,
+      Duree_Totale_Sec INT,
+      Nb_Achats INT,
+      Nb_Paniers_Abandonnes INT,
+      PRIMARY KEY (ID_Date)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS Agg_CA_Mensuel (
+      Annee INT,
+      Mois INT,
+      Nb_Ventes INT,
+      CA_HT DECIMAL(14,2),
+      CA_TTC DECIMAL(14,2),
+      Marge DECIMAL(14,2),
+      Objectif_CA DECIMAL(14,2),
+      Taux_Realisation DECIMAL(8,4),
+      PRIMARY KEY (Annee, Mois)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS Agg_Clients_Segment (
+      Segment_RFM VARCHAR(64),
+      Ville VARCHAR(64),
+      Nb_Clients INT,
+      Age_Moyen DECIMAL(6,2),
+      Score_Fidelite_Moyen DECIMAL(8,2),
+      PRIMARY KEY (Segment_RFM, Ville)
+    )""",
+]
+
+# Agrégats journaliers : agrégat -> (fait, colonne date du fait, clé du filigrane, SELECT)
+# {filtre} : vide (reconstruction) ou restriction aux ID_Date touchées
+AGREGATS_JOUR = {
+    'Agg_Ventes_Jour': ('Fait_Ventes', 'ID_Date', 'ID_Vente', """
+        SELECT f.ID_Date, COALESCE(f.ID_Canal, 0), COALESCE(p.Categorie, 'Inconnue'),
+               COALESCE(c.Ville, 'Inconnue'), COUNT(*), SUM(f.Quantite), SUM(f.Montant_HT),
+               SUM(f.Montant_TTC), SUM(f.Marge), SUM(f.Remise_Appliquee)
+        FROM Fait_Ventes f
+        LEFT JOIN Dim_Produit p ON p.ID_Produit = f.ID_Produit
+        LEFT JOIN Dim_Client c ON c.ID_Client = f.ID_Client
+        {filtre}
+        GROUP BY f.ID_Date, COALESCE(f.ID_Canal, 0), COALESCE(p.Categorie, 'Inconnue'),
+                 COALESCE(c.Ville, 'Inconnue')"""),
+    'Agg_Retours_Jour': ('Fait_Retours', 'ID_Date_Retour', 'ID_Retour', """
+        SELECT f.ID_Date_Retour, COALESCE(f.ID_Motif, 0), COUNT(*), SUM(f.Montant_Rembourse),
+               SUM(f.Delai_Retour_Jours)
+        FROM Fait_Retours f
+        {filtre}
+        GROUP BY f.ID_Date_Retour, COALESCE(f.ID_Motif, 0)"""),
+    'Agg_Funnel_Jour': ('Fait_Trafic_Web', 'ID_Date', 'ID_Session', """
+        SELECT f.ID_Date, COUNT(*), COUNT(f.ID_Client), SUM(f.Pages_Vues), SUM(f.Duree_Session_Sec),
+               SUM(f.A_Achete), SUM(f.Panier_Abandonne)
+        FROM Fait_Trafic_Web f
+        {filtre}
+        GROUP BY f.ID_Date"""),
+}
+
+# Agrégat mensuel par produit (ABC) : recalculé pour les mois touchés par Fait_Ventes
+SELECT_PRODUITS_MOIS = """
+    SELECT t.Annee, t.Mois, f.ID_Produit, MAX(p.Categorie), COUNT(*), SUM(f.Quantite),
+           SUM(f.Montant_HT), SUM(f.Marge)
+    FROM Fait_Ventes f
+    JOIN Dim_Temps t ON t.ID_Date = f.ID_Date
+    LEFT JOIN Dim_Produit p ON p.ID_Produit = f.ID_Produit
+    {filtre}
+    GROUP BY t.Annee, t.Mois, f.ID_Produit"""
+
+# Petits agrégats recalculés en entier (à partir d'Agg_Ventes_Jour et des dimensions)
+AGREGATS_COMPLETS = {
+    'Agg_CA_Mensuel': """
+        SELECT t.Annee, t.Mois, SUM(a.Nb_Ventes), SUM(a.CA_HT), SUM(a.CA_TTC), SUM(a.Marge),
+               o.Objectif_CA, SUM(a.CA_TTC) / NULLIF(o.Objectif_CA, 0)
+        FROM Agg_Ventes_Jour a
+        JOIN Dim_Temps t ON t.ID_Date = a.ID_Date
+        LEFT JOIN Objectifs_Mensuels o ON o.Annee = t.Annee AND o.Mois = t.Mois
+        GROUP BY t.Annee, t.Mois, o.Objectif_CA""",
+    'Agg_Clients_Segment': """
+        SELECT COALESCE(Segment_RFM, 'Inconnu'), COALESCE(Ville, 'Inconnue'), COUNT(*),
+               AVG(Age), AVG(Score_Fidelite)
+        FROM Dim_Client
+        GROUP BY COALESCE(Segment_RFM, 'Inconnu'), COALESCE(Ville, 'Inconnue')""",
+}
+
+
+# ============================================
+# OBJECTIFS MENSUELS (Objectifs_Mensuels.xlsx, une feuille par année)
+# ============================================
+
+@instrumente(lignes=lambda n, _: n)
+def charger_objectifs(engine: Engine, chemin_xlsx: str) -> int:
+    """Remplace Objectifs_Mensuels par le contenu du classeur ; retourne le nombre de lignes."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(chemin_xlsx, read_only=True)
+    feuilles = wb.sheetnames
+    wb.close()
+
+    lots = []
+    for feuille in feuilles:
+        for lot in lire_excel_par_lots(chemin_xlsx, feuille):
+            lot.insert(0, 'Annee', int(feuille))
+            lots.append(lot)
+    objectifs = pd.concat(lots, ignore_index=True)
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM Objectifs_Mensuels;"))
+        objectifs.to_sql("Objectifs_Mensuels", conn, if_exists="append", index=False)
+    return len(objectifs)
+
+
+# ============================================
+# MAINTENANCE
+# ============================================
+
+def _filtre(colonne: str, dates: list[int] | None) -> str:
+    return "" if dates is None else f"WHERE f.{colonne} IN :dates"
+
+def _dates_touchees(engine: Engine, fait: str, colonne: str, cle: str, filigrane) -> list[int] | None:
+    """ID_Date des lignes de `fait` au-delà du filigrane (None : tout recalculer)."""
+    if filigrane is None:
+        return None
+    with engine.connect() as conn:
+        lignes = conn.execute(
+            text(f"SELECT DISTINCT {colonne} FROM {fait} WHERE {cle} > :f AND {colonne} IS NOT NULL;"),
+            {"f": int(filigrane)},
+        )
+        return sorted(int(d) for (d,) in lignes)
+
+def _dates_des_mois(engine: Engine, dates: list[int]) -> tuple[list[int], list[int]]:
+    """(ID_Date de tous les jours des mois de `dates`, clés Annee*100+Mois de ces mois)."""
+    with engine.connect() as conn:
+        mois = sorted({int(m) for (m,) in conn.execute(
+            text("SELECT DISTINCT Annee * 100 + Mois FROM Dim_Temps WHERE ID_Date IN :dates;")
+            .bindparams(bindparam("dates", expanding=True)), {"dates": dates})})
+        jours = [int(d) for (d,) in conn.execute(
+            text("SELECT ID_Date FROM Dim_Temps WHERE Annee * 100 + Mois IN :mois;")
+            .bindparams(bindparam("mois", expanding=True)), {"mois": mois})]
+    return jours, mois
+
+@instrumente(cible=lambda a: a['agregat'], lignes=lambda n, _: n)
+def recalculer(engine: Engine, agregat: str, select: str, colonne: str | None = None,
+               dates: list[int] | None = None, suppression: str | None = None,
+               valeurs: list[int] | None = None) -> int:
+    """
+    Recalcule `agregat` en une transaction : DELETE des lignes concernées
+    puis INSERT ... SELECT. dates : ID_Date à recalculer (filtre du SELECT
+    sur f.<colonne>) ; None : reconstruction complète. suppression /
+    valeurs : condition du DELETE si elle diffère de "ID_Date IN :dates".
+    Retourne le nombre de lignes insérées.
+    """
+    if dates is None:
+        delete = text(f"DELETE FROM {agregat};")
+        insert = text(f"INSERT INTO {agregat} {select.format(filtre='')};")
+        parametres = {}
+    else:
+        delete = text(f"DELETE FROM {agregat} WHERE {suppression or 'ID_Date IN :valeurs'};")
+        delete = delete.bindparams(bindparam("valeurs", expanding=True))
+        insert = text(f"INSERT INTO {agregat} {select.format(filtre=_filtre(colonne, dates))};")
+        insert = insert.bindparams(bindparam("dates", expanding=True))
+        parametres = {"dates": dates}
+
+    with engine.begin() as conn:
+        if dates is None:
+            conn.execute(delete)
+        else:
+            conn.execute(delete, {"valeurs": valeurs if valeurs is not None else dates})
+        return conn.execute(insert, parametres).rowcount
+
+def creer_tables_agregats(engine: Engine) -> None:
+    with engine.begin() as conn:
+        for ddl in DDL_AGREGATS:
+            conn.execute(text(ddl))
+
+def maintenir_agregats(engine: Engine, filigranes: dict | None = None,
+                       chemin_objectifs: str | None = None) -> dict:
+    """
+    Met à jour les agrégats après un chargement.
+    filigranes : {fait: filigrane avant le chargement} (chargement
+    incrémental) -> seules les dates des nouvelles lignes sont recalculées ;
+    None (ou filigrane absent : table vide avant) -> reconstruction complète.
+    chemin_objectifs : Objectifs_Mensuels.xlsx à (re)charger s'il existe.
+    Retourne {agrégat: lignes recalculées}.
+    """
+    creer_tables_agregats(engine)
+    if chemin_objectifs and os.path.exists(chemin_objectifs):
+        print(f"   🎯 Objectifs_Mensuels : {charger_objectifs(engine, chemin_objectifs)} lignes")
+
+    resultats = {}
+    dates_ventes = None
+    for agregat, (fait, colonne, cle, select) in AGREGATS_JOUR.items():
+        dates = None if filigranes is None else _dates_touchees(engine, fait, colonne, cle, filigranes.get(fait))
+        if agregat == 'Agg_Ventes_Jour':
+            dates_ventes = dates
+        if dates == []:
+            resultats[agregat] = 0
+            continue
+        resultats[agregat] = recalculer(engine, agregat, select, colonne, dates)
+        portee = "reconstruction" if dates is None else f"{len(dates)} dates"
+        print(f"   📊 {agregat} : {resultats[agregat]} lignes recalculées ({portee})")
+
+    if dates_ventes is None:
+        resultats['Agg_Produits_Mois'] = recalculer(engine, 'Agg_Produits_Mois', SELECT_PRODUITS_MOIS)
+        print(f"   📊 Agg_Produits_Mois : {resultats['Agg_Produits_Mois']} lignes recalculées (reconstruction)")
+    elif dates_ventes:
+        jours, mois = _dates_des_mois(engine, dates_ventes)
+        resultats['Agg_Produits_Mois'] = recalculer(
+            engine, 'Agg_Produits_Mois', SELECT_PRODUITS_MOIS, 'ID_Date', jours,
+            suppression="Annee * 100 + Mois IN :valeurs", valeurs=mois)
+        print(f"   📊 Agg_Produits_Mois : {resultats['Agg_Produits_Mois']} lignes recalculées ({len(mois)} mois)")
+
+    for agregat, select in AGREGATS_COMPLETS.items():
+        resultats[agregat] = recalculer(engine, agregat, select)
+        print(f"   📊 {agregat} : {resultats[agregat]} lignes")
+    return resultats
+
+
+# ============================================
+# MAIN : reconstruction complète
+# ============================================
+
+def main():
+    from upload_to_sql import SOURCES_DIR, make_engine
+
+    print("📊 Reconstruction complète des agrégats des tableaux de bord...")
+    maintenir_agregats(make_engine(), chemin_objectifs=os.path.join(SOURCES_DIR, "Objectifs_Mensuels.xlsx"))
+    print("\n🎉 Terminé : agrégats reconstruits.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark des étapes de génération (gen_data.py) : débit et mémoire.
+
+Chaque étape (Dim_Temps, Dim_Client, ..., Fait_Stock, RFM, chaque exporteur)
+est mesurée à plusieurs facteurs d'échelle, chacune dans un processus neuf :
+- lignes : lignes produites (dimensions, faits) ou traitées (RFM : ventes
+  agrégées, Fait_Retours : ventes examinées, exporteurs : lignes écrites)
+- secondes, lignes_par_sec (meilleure des répétitions)
+- rss_avant_mo : pic RSS après préparation des entrées de l'étape
+- rss_pic_mo : pic RSS à la fin de l'étape (ru_maxrss, Linux / macOS)
+
+Utilisation :
+    python benchmark_generation.py                          # SF 0.1 et 1, toutes les étapes
+    python benchmark_generation.py --sf 1 10 --sortie baseline.json
+    python benchmark_generation.py --sf 1 --comparer baseline.json --seuil 0.15
+    python benchmark_generation.py --sf 1 --comparer baseline.json --sortie baseline.json --mettre-a-jour
+    python benchmark_generation.py --etapes Fait_Ventes RFM Export_CSV
+
+En mode comparaison, une étape régresse si son débit baisse ou si son pic RSS
+augmente de plus du seuil par rapport à la baseline (code de sortie 1).
+La comparaison précède l'écriture des résultats : remplacer la baseline
+par la mesure courante (--sortie = --comparer) demande --mettre-a-jour.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import gen_data as gd
+from instrumentation import environnement, rss_pic_mo
+
+FACTEURS_ECHELLE = [0.1, 1]
+REPETITIONS = 1
+SEUIL_REGRESSION = 0.10
+FICHIER_RESULTATS = 'benchmark_generation.json'
+
+
+# ============================================
+# MESURES
+# ============================================
+
+@contextlib.contextmanager
+def silencieux():
+    """Masque les prints de progression de gen_data.py pendant les mesures."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ============================================
+# ÉTAPES : préparation des entrées (non mesurée) + exécution (mesurée)
+# ============================================
+
+def _parametres(facteur_echelle: float, dossier: str, mode: str) -> gd.ParametresGeneration:
+    return gd.ParametresGeneration(facteur_echelle=facteur_echelle, output_path=dossier,
+                                   mode_generation=mode, **gd.volumes_echelle(facteur_echelle))
+
+def _dimensions(p):
+    rng = gd.initialiser_graines(p.seed)
+    dims = gd.generer_dimensions(p)
+    return rng, dims, gd.IndexDates(dims['Dim_Temps'])
+
+def _ventes(p, rng, dims):
+    if p.mode_generation == "iteratif":
+        return gd.generer_fait_ventes(p.nb_transactions, dims['Dim_Temps'], dims['Dim_Produit'],
+                                      dims['Dim_Promotion'], p.nb_clients)
+    return gd.generer_fait_ventes_vectorise(rng, p.nb_transactions, dims['Dim_Temps'], dims['Dim_Produit'],
+                                            dims['Dim_Promotion'], p.nb_clients)
+
+def _etape_dim_temps(p):
+    return lambda: len(gd.generer_dim_temps(p.date_debut, p.date_fin))
+
+def _etape_dim_client(p):
+    gd.initialiser_graines(p.seed)
+    return lambda: len(gd.generer_dim_clients(p.nb_clients, p.date_debut, p.date_fin, p.seed))
+
+def _etape_dim_produit(p):
+    gd.initialiser_graines(p.seed)
+    return lambda: len(gd.generer_dim_produits(p.nb_produits, p.seed))
+
+def _etape_fait_ventes(p):
+    rng, dims, _ = _dimensions(p)
+    return lambda: len(_ventes(p, rng, dims))
+
+def _etape_rfm(p):
+    rng, dims, _ = _dimensions(p)
+    ventes = _ventes(p, rng, dims)
+
+    def executer():
+        accumulateur = gd.AccumulateurRFM(nb_clients=p.nb_clients)
+        accumulateur.ajouter(ventes)
+        gd.appliquer_segmentation_rfm(dims['Dim_Client'], accumulateur.resultat(),
+                                      gd.REGLES_RFM[p.regles_rfm], date_reference=p.date_fin)
+        return len(ventes)
+    return executer
+
+def _etape_fait_retours(p):
+    rng, dims, index_dates = _dimensions(p)
+    ventes = _ventes(p, rng, dims)
+
+    def executer():
+        gd.generer_fait_retours(rng, ventes, dims['Dim_Temps'], index_dates)
+        return len(ventes)
+    return executer
+
+def _etape_fait_trafic(p):
+    rng, dims, _ = _dimensions(p)
+    if p.mode_generation == "iteratif":
+        return lambda: len(gd.generer_fait_trafic(p.nb_sessions_web, dims['Dim_Temps'], p.nb_clients))
+    return lambda: len(gd.generer_fait_trafic_vectorise(rng, p.nb_sessions_web, dims['Dim_Temps'],
+                                                        p.nb_clients))
+
+def _etape_fait_stock(p):
+    rng, dims, index_dates = _dimensions(p)
+    dates = gd.dates_snapshot_stock(p.date_debut, p.date_fin)
+    return lambda: len(gd.generer_fait_stock(rng, dates, dims['Dim_Temps'], dims['Dim_Produit'], index_dates))
+
+def _etape_export(nom_etape):
+    exporteur, tables = gd.EXPORTEURS[nom_etape]
+
+    def preparer(p):
+        rng, donnees, index_dates = _dimensions(p)
+        gd.generer_faits(p, rng, donnees, index_dates)
+        donnees['Objectifs_Mensuels'] = gd.generer_objectifs_mensuels()
+        if exporteur is gd.exporter_parquet:
+            os.makedirs(p.parquet_path, exist_ok=True)
+
+        def executer():
+            exporteur(p, donnees)
+            return gd.lignes_exportees(p, donnees, tables)
+        return executer
+    return preparer
+
+ETAPES = {
+    'Dim_Temps': _etape_dim_temps,
+    'Dim_Client': _etape_dim_client,
+    'Dim_Produit': _etape_dim_produit,
+    'Fait_Ventes': _etape_fait_ventes,
+    'RFM': _etape_rfm,
+    'Fait_Retours': _etape_fait_retours,
+    'Fait_Trafic_Web': _etape_fait_trafic,
+    'Fait_Stock': _etape_fait_stock,
+    **{nom: _etape_export(nom) for nom in gd.EXPORTEURS}
+}
+
+
+def mesurer_etape(etape: str, facteur_echelle: float, mode: str = "vectorise") -> dict:
+    """Prépare puis mesure une étape. Appelé dans un processus neuf (RSS propre)."""
+    with tempfile.TemporaryDirectory() as dossier, silencieux():
+        p = _parametres(facteur_echelle, dossier, mode)
+        executer = ETAPES[etape](p)
+        rss_avant = rss_pic_mo()
+
+        debut = time.perf_counter()
+        nb_lignes = executer()
+        secondes = time.perf_counter() - debut
+
+    return {
+        'etape': etape,
+        'sf': facteur_echelle,
+        'mode': mode,
+        'lignes': int(nb_lignes),
+        'secondes': round(secondes, 4),
+        'lignes_par_sec': round(nb_lignes / secondes, 1) if secondes > 0 else None,
+        'rss_avant_mo': rss_avant,
+        'rss_pic_mo': rss_pic_mo()
+    }
+
+def etape_disponible(etape: str) -> bool:
+    if etape != 'Export_Parquet':
+        return True
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def lancer_benchmark(etapes, facteurs, repetitions: int = REPETITIONS, mode: str = "vectorise") -> list:
+    """
+    Une mesure = un processus 'spawn' neuf (max_tasks_per_child=1) : le pic
+    RSS d'une étape n'hérite pas des étapes précédentes.
+    Garde, par (étape, sf), la répétition la plus rapide et le pic RSS maximal.
+    """
+    resultats = []
+    contexte = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexte, max_tasks_per_child=1) as executeur:
+        for facteur in facteurs:
+            for etape in etapes:
+                if not etape_disponible(etape):
+                    print(f"   ⏭️ {etape} ignorée (pyarrow absent)")
+                    continue
+                mesures = [executeur.submit(mesurer_etape, etape, facteur, mode).result()
+                           for _ in range(repetitions)]
+                meilleure = min(mesures, key=lambda m: m['secondes'])
+                pics = [m['rss_pic_mo'] for m in mesures if m['rss_pic_mo'] is not None]
+                meilleure['rss_pic_mo'] = max(pics) if pics else None
+                resultats.append(meilleure)
+                print(f"   ⏱️ SF{facteur:g} {etape:<16} {meilleure['lignes']:>10} lignes "
+                      f"{meilleure['secondes']:>9.3f} s {meilleure['lignes_par_sec'] or 0:>13,.0f} l/s "
+                      f"RSS {meilleure['rss_pic_mo']} Mo")
+    return resultats
+
+
+# ============================================
+# BASELINES
+# ============================================
+
+def enregistrer(resultats: list, chemin: str, repetitions: int) -> None:
+    contenu = {
+        'genere_le': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'environnement': environnement(),
+        'repetitions': repetitions,
+        'resultats': resultats
+    }
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(contenu, f, ensure_ascii=False, indent=2)
+
+def comparer(resultats: list, chemin_baseline: str, seuil: float = SEUIL_REGRESSION) -> list:
+    """
+    Compare aux mesures de la baseline de même (étape, sf, mode).
+    Retourne la liste des régressions (débit en baisse ou pic RSS en
+    hausse de plus de `seuil`).
+    """
+    with open(chemin_baseline, 'r', encoding='utf-8') as f:
+        baseline = {(m['etape'], m['sf'], m.get('mode', 'vectorise')): m
+                    for m in json.load(f)['resultats']}
+
+    regressions = []
+    print(f"\n📊 Comparaison avec {chemin_baseline} (seuil {seuil:.0%})")
+    for mesure in resultats:
+        reference = baseline.get((mesure['etape'], mesure['sf'], mesure['mode']))
+        if reference is None:
+            print(f"   ➖ SF{mesure['sf']:g} {mesure['etape']} : absente de la baseline")
+            continue
+
+        ecarts = []
+        if reference['lignes_par_sec'] and mesure['lignes_par_sec']:
+            variation = mesure['lignes_par_sec'] / reference['lignes_par_sec'] - 1
+            ecarts.append(('débit', variation, variation < -seuil))
+        if reference.get('rss_pic_mo') and mesure['rss_pic_mo']:
+            variation = mesure['rss_pic_mo'] / reference['rss_pic_mo'] - 1
+            ecarts.append(('RSS', variation, variation > seuil))
+
+        en_regression = [nom for nom, _, regresse in ecarts if regresse]
+        details = ", ".join(f"{nom} {variation:+.1%}" for nom, variation, _ in ecarts)
+        print(f"   {'❌' if en_regression else '✅'} SF{mesure['sf']:g} {mesure['etape']:<16} {details}")
+        if en_regression:
+            regressions.append({'etape': mesure['etape'], 'sf': mesure['sf'], 'criteres': en_regression})
+    return regressions
+
+
+# ============================================
+# LIGNE DE COMMANDE
+# ============================================
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark des étapes de gen_data.py (débit, pic RSS).")
+    parser.add_argument('--sf', type=float, nargs='+', default=FACTEURS_ECHELLE, dest='facteurs',
+                        help="facteurs d'échelle mesurés (défaut : %(default)s)")
+    parser.add_argument('--etapes', nargs='+', choices=list(ETAPES), default=list(ETAPES), metavar='ETAPE',
+                        help="étapes mesurées (défaut : toutes) : " + ", ".join(ETAPES))
+    parser.add_argument('--mode', choices=['vectorise', 'iteratif'], default='vectorise',
+                        help="moteur de Fait_Ventes / Fait_Trafic_Web")
+    parser.add_argument('--repetitions', type=int, default=REPETITIONS)
+    parser.add_argument('--sortie', default=FICHIER_RESULTATS, help="fichier JSON des résultats")
+    parser.add_argument('--comparer', metavar='BASELINE', help="baseline JSON à comparer")
+    parser.add_argument('--seuil', type=float, default=SEUIL_REGRESSION,
+                        help="écart toléré avant régression (défaut : %(default)s)")
+    parser.add_argument('--mettre-a-jour', action='store_true',
+                        help="autorise --sortie à remplacer la baseline --comparer (après comparaison)")
+    arguments = parser.parse_args(argv)
+    if (arguments.comparer and not arguments.mettre_a_jour
+            and os.path.realpath(arguments.sortie) == os.path.realpath(arguments.comparer)):
+        parser.error(f"--sortie écraserait la baseline {arguments.comparer} : "
+                     "choisir un autre --sortie ou ajouter --mettre-a-jour")
+
+    print(f"🏁 Benchmark génération : SF {arguments.facteurs}, {len(arguments.etapes)} étapes")
+    resultats = lancer_benchmark(arguments.etapes, arguments.facteurs, arguments.repetitions, arguments.mode)
+    # baseline lue avant l'écriture des résultats (--mettre-a-jour : même fichier)
+    regressions = comparer(resultats, arguments.comparer, arguments.seuil) if arguments.comparer else []
+    enregistrer(resultats, arguments.sortie, arguments.repetitions)
+    print(f"💾 Résultats : {arguments.sortie}")
+
+    if arguments.comparer:
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s) au-delà de {arguments.seuil:.0%}")
+            return 1
+        print("\n✅ Aucune régression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Génération des tables de faits par shards, sur un pool de processus.
+
+Principe :
+- chaque table est découpée en shards de taille fixe (TAILLE_SHARD lignes),
+  indépendante du nombre de workers ;
+- chaque shard a son propre flux aléatoire, dérivé du SEED par
+  np.random.SeedSequence(SEED, spawn_key=(table, index_shard)) ;
+- les résultats sont rendus dans l'ordre des shards, et les ID sont
+  renumérotés de façon contiguë côté processus principal.
+
+Le contenu généré est donc identique (octet pour octet une fois exporté)
+que l'on utilise 1 ou 32 workers.
+"""
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from moteur_vectorise import (generer_fait_ventes_vectorise, generer_fait_retours_lot,
+                              generer_fait_trafic_vectorise, generer_fait_stock_vectorise,
+                              iter_lots, IndexDates)
+
+TAILLE_SHARD = 100_000
+
+# Identifiant stable de chaque table dans la dérivation des flux aléatoires
+CODES_TABLES = {
+    'ventes': 1,   # Fait_Ventes + Fait_Retours du même shard
+    'trafic': 2,
+    'stock': 3,
+    'produits': 4  # variantes synthétiques de Dim_Produit (facteur d'échelle)
+}
+
+
+def rng_shard(seed: int, table: str, index_shard: int) -> np.random.Generator:
+    """Flux aléatoire indépendant et reproductible pour un shard donné."""
+    sequence = np.random.SeedSequence(seed, spawn_key=(CODES_TABLES[table], index_shard))
+    return np.random.default_rng(sequence)
+
+
+# ============================================
+# TRAVAIL D'UN SHARD (exécuté dans les workers)
+# ============================================
+
+# Dimensions et paramètres, transmis une seule fois à chaque worker
+_CONTEXTE = {}
+
+def _initialiser_worker(contexte: dict) -> None:
+    global _CONTEXTE
+    _CONTEXTE = dict(contexte, index_dates=IndexDates(contexte['dim_temps']))
+
+def _shard_ventes(args):
+    index_shard, id_debut, n = args
+    ctx = _CONTEXTE
+    rng = rng_shard(ctx['seed'], 'ventes', index_shard)
+    ventes = generer_fait_ventes_vectorise(rng, n, ctx['dim_temps'], ctx['dim_produits'],
+                                           ctx['dim_promotion'], ctx['nb_clients'],
+                                           id_debut=id_debut, compact=ctx['compact'])
+    retours = generer_fait_retours_lot(rng, ventes, ctx['dim_temps'], index_dates=ctx['index_dates'],
+                                       compact=ctx['compact'])
+    return ventes, retours
+
+def _shard_trafic(args):
+    index_shard, id_debut, n = args
+    ctx = _CONTEXTE
+    rng = rng_shard(ctx['seed'], 'trafic', index_shard)
+    return generer_fait_trafic_vectorise(rng, n, ctx['dim_temps'], ctx['nb_clients'],
+                                         id_debut=id_debut, compact=ctx['compact'])
+
+def _shard_stock(args):
+    index_shard, dates_snapshot = args
+    ctx = _CONTEXTE
+    rng = rng_shard(ctx['seed'], 'stock', index_shard)
+    return generer_fait_stock_vectorise(rng, dates_snapshot, ctx['dim_temps'], ctx['dim_produits'],
+                                        index_dates=ctx['index_dates'], compact=ctx['compact'])
+
+
+# ============================================
+# ORCHESTRATION
+# ============================================
+
+def _contexte_multiprocessing():
+    """
+    'fork' quand il est disponible (les dimensions ne sont pas re-sérialisées
+    pour chaque worker), sinon la méthode par défaut de la plateforme
+    ('spawn' sous Windows : gen_data.py est importable sans effet de bord).
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class GenerateurParallele:
+    """
+    Génère Fait_Ventes/Fait_Retours, Fait_Trafic_Web et Fait_Stock par shards.
+
+        with GenerateurParallele(SEED, dim_temps, dim_produits, dim_promotion,
+                                 NB_CLIENTS, nb_workers=8) as gen:
+            for ventes, retours in gen.iter_ventes(NB_TRANSACTIONS):
+                ...
+
+    Au plus 2 x nb_workers shards sont en vol à la fois : la mémoire reste
+    bornée, quel que soit le nombre total de shards. compact=True : shards au
+    schéma compact (moins d'octets à renvoyer au processus principal).
+    """
+
+    def __init__(self, seed: int,
+                 dim_temps: pd.DataFrame,
+                 dim_produits: pd.DataFrame,
+                 dim_promotion: pd.DataFrame,
+                 nb_clients: int,
+                 nb_workers: int = 1,
+                 taille_shard: int = TAILLE_SHARD,
+                 compact: bool = False):
+        self.contexte = {
+            'seed': seed,
+            'dim_temps': dim_temps,
+            'dim_produits': dim_produits,
+            'dim_promotion': dim_promotion,
+            'nb_clients': nb_clients,
+            'compact': compact
+        }
+        self.nb_workers = max(1, int(nb_workers))
+        self.taille_shard = int(taille_shard)
+        self._executor = None
+
+    def __enter__(self):
+        if self.nb_workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.nb_workers,
+                                                 mp_context=_contexte_multiprocessing(),
+                                                 initializer=_initialiser_worker,
+                                                 initargs=(self.contexte,))
+        else:
+            _initialiser_worker(self.contexte)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        return False
+
+    def _map_ordonne(self, fonction, taches):
+        """Comme executor.map, mais avec une fenêtre bornée de shards en vol."""
+        if self._executor is None:
+            for tache in taches:
+                yield fonction(tache)
+            return
+
+        en_vol = deque()
+        for tache in taches:
+            en_vol.append(self._executor.submit(fonction, tache))
+            if len(en_vol) >= 2 * self.nb_workers:
+                yield en_vol.popleft().result()
+        while en_vol:
+            yield en_vol.popleft().result()
+
+    def iter_ventes(self, nb_ventes: int):
+        """yield (ventes, retours) par shard ; ID_Retour contigus sur l'ensemble."""
+        taches = ((i, id_debut, n)
+                  for i, (id_debut, n) in enumerate(iter_lots(nb_ventes, self.taille_shard)))
+        prochain_id_retour = 1
+        for ventes, retours in self._map_ordonne(_shard_ventes, taches):
+            retours['ID_Retour'] = np.arange(prochain_id_retour,
+                                             prochain_id_retour + len(retours), dtype=np.int64)
+            prochain_id_retour += len(retours)
+            yield ventes, retours
+
+    def iter_trafic(self, nb_sessions: int):
+        taches = ((i, id_debut, n)
+                  for i, (id_debut, n) in enumerate(iter_lots(nb_sessions, self.taille_shard)))
+        yield from self._map_ordonne(_shard_trafic, taches)
+
+    def iter_stock(self, dates_snapshot):
+        """Un shard = un groupe de semaines (environ taille_shard lignes)."""
+        dates_snapshot = pd.DatetimeIndex(dates_snapshot)
+        nb_produits = len(self.contexte['dim_produits'])
+        semaines_par_shard = max(1, self.taille_shard // max(1, nb_produits))
+        taches = ((i, dates_snapshot[debut:debut + semaines_par_shard])
+                  for i, debut in enumerate(range(0, len(dates_snapshot), semaines_par_shard)))
+
+        prochain_id_stock = 1
+        for stock in self._map_ordonne(_shard_stock, taches):
+            stock['ID_Stock'] = np.arange(prochain_id_stock,
+                                          prochain_id_stock + len(stock), dtype=np.int64)
+            prochain_id_stock += len(stock)
+            yield stock
@@ -0,0 +1,514 @@
+"""
+Écrivains incrémentaux pour l'export des tables de faits par lots.
+
+Chaque écrivain s'utilise comme un context manager :
+
+    with EcrivainCSV(chemin) as ecr:
+        for lot in iter_fait_xxx(...):
+            ecr.ecrire(lot)
+
+Les lots sont écrits dès qu'ils sont produits : la mémoire utilisée dépend de
+la taille d'un lot, pas du volume total de la table.
+Les formats de sortie sont ceux de gen_data.py (CSV ';' utf-8-sig, JSON avec
+payload "sessions", Excel une feuille par table), plus un format colonnaire
+optionnel (Parquet, via pyarrow) pour les chargeurs et les benchmarks.
+
+Les écrivains texte formatent les dates au moment de l'écriture : les
+tables du schéma compact (datetime64) produisent les mêmes fichiers que
+les tables dont les dates sont déjà du texte.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+
+def formater_dates_texte(lot: pd.DataFrame) -> pd.DataFrame:
+    """
+    Colonnes datetime64 -> texte, comme les sources historiques :
+    'AAAA-MM-JJ HH:MM:SS' pour les colonnes DateTime_*, 'AAAA-MM-JJ' sinon.
+    NaT -> None. Sans colonne datetime64, le lot est rendu tel quel.
+    """
+    colonnes = [c for c in lot.columns if pd.api.types.is_datetime64_any_dtype(lot[c].dtype)]
+    if not colonnes:
+        return lot
+    lot = lot.copy(deep=False)
+    for col in colonnes:
+        valeurs = lot[col].to_numpy(dtype='datetime64[s]')
+        if "DateTime" in col:
+            texte = np.char.replace(np.datetime_as_string(valeurs, unit='s'), 'T', ' ')
+        else:
+            texte = np.datetime_as_string(valeurs, unit='D')
+        texte = texte.astype(object)
+        texte[np.isnat(valeurs)] = None
+        lot[col] = texte
+    return lot
+
+
+class EcrivainFlux:
+    """Base commune : ouverture paresseuse, compteur de lignes, context manager."""
+
+    # Format texte : les dates datetime64 sont formatées avant _ecrire
+    texte = True
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.nb_lignes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fermer()
+        return False
+
+    def ecrire(self, lot: pd.DataFrame) -> None:
+        self._ecrire(formater_dates_texte(lot) if self.texte else lot)
+        self.nb_lignes += len(lot)
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def fermer(self) -> None:
+        pass
+
+
+class EcrivainNul(EcrivainFlux):
+    """Compte les lignes sans rien écrire (table générée mais non exportée)."""
+
+    texte = False
+
+    def __init__(self):
+        super().__init__(os.devnull)
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        pass
+
+
+class EcrivainMultiple(EcrivainFlux):
+    """Envoie chaque lot à plusieurs écrivains (ex. CSV + Parquet)."""
+
+    # Chaque écrivain formate (ou non) le lot lui-même
+    texte = False
+
+    def __init__(self, *ecrivains: EcrivainFlux):
+        super().__init__(ecrivains[0].chemin)
+        self.ecrivains = ecrivains
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        for ecrivain in self.ecrivains:
+            ecrivain.ecrire(lot)
+
+    def fermer(self) -> None:
+        for ecrivain in self.ecrivains:
+            ecrivain.fermer()
+
+
+# ============================================
+# CSV (séparateur ; pour Excel FR)
+# ============================================
+
+class EcrivainCSV(EcrivainFlux):
+    """
+    CSV ';' utf-8-sig : en-tête (et BOM) écrits une seule fois, au premier lot.
+    ajout=True : complète un fichier existant (ni BOM ni en-tête).
+    """
+
+    def __init__(self, chemin: str, sep: str = ';', ajout: bool = False):
+        super().__init__(chemin)
+        self.sep = sep
+        self.ajout = ajout
+        self._f = None
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        premier = self._f is None
+        if premier and self.ajout:
+            self._f = open(self.chemin, 'a', encoding='utf-8', newline='')
+        elif premier:
+            self._f = open(self.chemin, 'w', encoding='utf-8-sig', newline='')
+        lot.to_csv(self._f, index=False, sep=self.sep, header=premier and not self.ajout)
+
+    def fermer(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+# ============================================
+# JSON (payload {"generated_at", "sessions": [...]})
+# ============================================
+
+class EcrivainJSONPayload(EcrivainFlux):
+    """
+    Écrit le même document que l'export historique de Fait_Trafic_Web.json :
+    {"generated_at": ..., "<cle>": [ {...}, {...} ]}
+    mais enregistrement par enregistrement, sans construire la liste en mémoire.
+    NaN / NA -> null.
+    """
+
+    def __init__(self, chemin: str, cle: str = 'sessions'):
+        super().__init__(chemin)
+        self.cle = cle
+        self._f = None
+        self._termine = False
+
+    def _ouvrir(self) -> None:
+        genere = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._f = open(self.chemin, 'w', encoding='utf-8')
+        self._f.write('{\n  "generated_at": ' + json.dumps(genere) + ',\n')
+        self._f.write('  ' + json.dumps(self.cle) + ': [')
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        if self._f is None:
+            self._ouvrir()
+        if lot.empty:
+            return
+        # to_json(lines=True) : un objet JSON par ligne, NA -> null
+        lignes = lot.to_json(orient='records', lines=True, force_ascii=False).splitlines()
+        sep = ',\n    ' if self.nb_lignes else '\n    '
+        self._f.write(sep + ',\n    '.join(lignes))
+
+    def fermer(self) -> None:
+        if self._termine:
+            return
+        if self._f is None:
+            # Aucun lot : document valide avec une liste vide
+            self._ouvrir()
+        self._f.write('\n  ]\n}\n' if self.nb_lignes else ']\n}\n')
+        self._f.close()
+        self._termine = True
+
+
+# ============================================
+# NDJSON (un enregistrement JSON par ligne, gzip optionnel)
+# ============================================
+
+# Nombre de lignes sérialisées à la fois (borne la taille des chaînes en mémoire)
+TAILLE_BLOC_NDJSON = 100_000
+
+class EcrivainNDJSON(EcrivainFlux):
+    """
+    JSON délimité par des sauts de ligne : chaque ligne est un objet complet,
+    le fichier s'écrit (et se relit) morceau par morceau. NaN / NA -> null.
+
+    compression : None ou 'gzip' ; par défaut, déduite de l'extension (.gz).
+    """
+
+    def __init__(self, chemin: str, compression: str | None = 'infer'):
+        super().__init__(chemin)
+        if compression == 'infer':
+            compression = 'gzip' if chemin.endswith('.gz') else None
+        self.compression = compression
+        self._f = None
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        if self._f is None:
+            if self.compression == 'gzip':
+                self._f = gzip.open(self.chemin, 'wt', encoding='utf-8')
+            else:
+                self._f = open(self.chemin, 'w', encoding='utf-8')
+        for debut in range(0, len(lot), TAILLE_BLOC_NDJSON):
+            bloc = lot.iloc[debut:debut + TAILLE_BLOC_NDJSON]
+            texte = bloc.to_json(orient='records', lines=True, force_ascii=False)
+            if texte and not texte.endswith('\n'):
+                texte += '\n'
+            self._f.write(texte)
+
+    def fermer(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+# ============================================
+# XML (écriture incrémentale, sans arbre ElementTree)
+# ============================================
+
+def _elements_xml(lot: pd.DataFrame, element: str) -> pd.Series:
+    """
+    Sérialise chaque ligne en <element><col>valeur</col>...</element>,
+    colonne par colonne (pas de SubElement par cellule).
+    Valeur manquante -> balise vide <col />, comme ElementTree.
+    """
+    xml = pd.Series(f'<{element}>', index=lot.index, dtype=object)
+    for col in lot.columns:
+        valeurs = lot[col]
+        manquant = valeurs.isna().to_numpy()
+        texte = valeurs.astype(object).map(lambda v: escape(str(v)))
+        cellule = f'<{col}>' + texte + f'</{col}>'
+        cellule[manquant] = f'<{col} />'
+        xml = xml + cellule
+    return xml + f'</{element}>'
+
+
+class EcrivainXML(EcrivainFlux):
+    """
+    Document XML écrit au fil de l'eau : <racine><element>...</element>...</racine>.
+
+    Produit le même document que ElementTree(...).write(..., xml_declaration=True)
+    pour une table plate, sans garder l'arbre en mémoire. Les noeuds
+    intermédiaires (ex. <villes> dans Referentiel_Geo) s'ouvrent et se ferment
+    avec ouvrir_noeud / fermer_noeud.
+    """
+
+    def __init__(self, chemin: str, racine: str, element: str | None = None):
+        super().__init__(chemin)
+        self.racine = racine
+        self.element = element
+        self._f = open(chemin, 'w', encoding='utf-8')
+        self._f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        self._f.write(f'<{racine}>')
+
+    def ouvrir_noeud(self, tag: str) -> None:
+        self._f.write(f'<{tag}>')
+
+    def fermer_noeud(self, tag: str) -> None:
+        self._f.write(f'</{tag}>')
+
+    def ecrire_feuille(self, tag: str, texte) -> None:
+        self._f.write(f'<{tag}>{escape(str(texte))}</{tag}>')
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        if not lot.empty:
+            self._f.write(''.join(_elements_xml(lot, self.element)))
+
+    def fermer(self) -> None:
+        if not self._f.closed:
+            self._f.write(f'</{self.racine}>')
+            self._f.close()
+
+
+# ============================================
+# EXCEL (openpyxl en mode write-only)
+# ============================================
+
+def _valeurs_python(lot: pd.DataFrame):
+    """Itère les lignes d'un lot en valeurs Python (NA/NaN -> None)."""
+    objets = lot.astype(object)
+    objets = objets.where(lot.notna(), None)
+    return objets.itertuples(index=False, name=None)
+
+
+# Limite d'une feuille Excel : 1 048 576 lignes, en-tête compris
+LIGNES_MAX_EXCEL = 1_048_576
+FEUILLES_PAR_FICHIER = 4
+
+def chemin_manifeste(chemin_xlsx: str) -> str:
+    """Fait_Ventes.xlsx -> Fait_Ventes.manifest.json"""
+    return os.path.splitext(chemin_xlsx)[0] + '.manifest.json'
+
+
+class EcrivainExcel(EcrivainFlux):
+    """
+    Table Excel alimentée ligne à ligne via openpyxl write-only : les lignes
+    sont sérialisées au fil de l'eau au lieu d'être gardées en mémoire.
+
+    Au-delà de `lignes_par_feuille` lignes, la table continue sur une nouvelle
+    feuille (Fait_Ventes, Fait_Ventes_2, ...) ; au-delà de `feuilles_par_fichier`
+    feuilles, sur un nouveau fichier (Fait_Ventes.xlsx, Fait_Ventes_2.xlsx, ...).
+    Un manifeste JSON (Fait_Ventes.manifest.json) liste tous les shards pour
+    l'uploader et Power BI.
+
+    ecrire_table() ajoute une table annexe dans le même classeur
+    (ex. Stats_RFM dans Dim_Client.xlsx), découpée selon les mêmes règles.
+    """
+
+    # Dates formatées dans ecrire_table (aussi utilisée directement)
+    texte = False
+
+    def __init__(self, chemin: str, feuille: str,
+                 lignes_par_feuille: int = LIGNES_MAX_EXCEL - 1,
+                 feuilles_par_fichier: int = FEUILLES_PAR_FICHIER,
+                 manifeste: bool = True):
+        super().__init__(chemin)
+        self.table = feuille
+        self.lignes_par_feuille = int(lignes_par_feuille)
+        self.feuilles_par_fichier = int(feuilles_par_fichier)
+        self.manifeste = manifeste
+        self.shards = []
+        self._wb = None
+        self._ws = None
+        self._num_fichier = 0
+        self._feuilles_fichier = 0
+        self._table_courante = None
+        self._num_feuille = 0
+
+    def _nom_fichier(self) -> str:
+        if self._num_fichier == 1:
+            return self.chemin
+        base, ext = os.path.splitext(self.chemin)
+        return f"{base}_{self._num_fichier}{ext}"
+
+    def _sauver(self) -> None:
+        if self._wb is not None:
+            self._wb.save(self._nom_fichier())
+            self._wb = None
+            self._ws = None
+
+    def _nouvelle_feuille(self, table: str, colonnes) -> None:
+        if self._wb is None or self._feuilles_fichier >= self.feuilles_par_fichier:
+            from openpyxl import Workbook
+
+            self._sauver()
+            self._num_fichier += 1
+            self._wb = Workbook(write_only=True)
+            self._feuilles_fichier = 0
+
+        self._num_feuille += 1
+        nom = table if self._num_feuille == 1 else f"{table}_{self._num_feuille}"
+        self._ws = self._wb.create_sheet(nom[:31])
+        self._ws.append(list(colonnes))
+        self._feuilles_fichier += 1
+        self.shards.append({
+            'table': table,
+            'fichier': os.path.basename(self._nom_fichier()),
+            'feuille': nom[:31],
+            'nb_lignes': 0
+        })
+
+    def ecrire_table(self, table: str, lot: pd.DataFrame) -> None:
+        lot = formater_dates_texte(lot)
+        if table != self._table_courante:
+            self._table_courante = table
+            self._num_feuille = 0
+            self._ws = None
+
+        if self._ws is None:
+            self._nouvelle_feuille(table, lot.columns)
+
+        debut = 0
+        while debut < len(lot):
+            place = self.lignes_par_feuille - self.shards[-1]['nb_lignes']
+            if place <= 0:
+                self._nouvelle_feuille(table, lot.columns)
+                continue
+            bloc = lot.iloc[debut:debut + place]
+            for ligne in _valeurs_python(bloc):
+                self._ws.append(ligne)
+            self.shards[-1]['nb_lignes'] += len(bloc)
+            debut += len(bloc)
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        self.ecrire_table(self.table, lot)
+
+    def fermer(self) -> None:
+        if self._wb is None:
+            return
+        self._sauver()
+        if self.manifeste:
+            with open(chemin_manifeste(self.chemin), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'table': self.table,
+                    'generated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'nb_lignes': self.nb_lignes,
+                    'lignes_par_feuille': self.lignes_par_feuille,
+                    'shards': self.shards
+                }, f, ensure_ascii=False, indent=2)
+
+
+# ============================================
+# PARQUET (colonnaire, optionnel : pyarrow)
+# ============================================
+
+COMPRESSION_PARQUET = 'zstd'
+TAILLE_ROW_GROUP = 1_000_000
+
+# Clés des faits : peuvent dépasser 2^31 aux gros volumes
+COLONNES_ID_64 = {'ID_Vente', 'ID_Session', 'ID_Stock', 'ID_Retour'}
+
+def _importer_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("L'export Parquet nécessite pyarrow : pip install pyarrow") from exc
+    return pa, pq
+
+def type_arrow(col: str, dtype):
+    """Type Arrow d'une colonne (mêmes règles de nommage que _sql_type)."""
+    pa, _ = _importer_pyarrow()
+    if col.startswith('ID_'):
+        return pa.int64() if col in COLONNES_ID_64 else pa.int32()
+    if "DateTime" in col:
+        return pa.timestamp('s')
+    if "Date_" in col or col.startswith("Date"):
+        return pa.date32()
+    if "Heure" in col:
+        return pa.int8()
+    if pd.api.types.is_bool_dtype(dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.int32()
+    if pd.api.types.is_float_dtype(dtype):
+        return pa.float64()
+    # Texte : l'encodage dictionnaire Parquet compresse les colonnes à faible cardinalité
+    return pa.string()
+
+def schema_arrow(df: pd.DataFrame):
+    pa, _ = _importer_pyarrow()
+    return pa.schema([pa.field(c, type_arrow(c, df[c].dtype)) for c in df.columns])
+
+def table_arrow(df: pd.DataFrame, schema):
+    """DataFrame -> pyarrow.Table conforme au schéma (dates texte -> date32, etc.)."""
+    pa, _ = _importer_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table.cast(schema)
+
+
+class EcrivainParquet(EcrivainFlux):
+    """
+    Parquet typé et compressé, alimenté par lots.
+
+    Les lots sont regroupés jusqu'à `taille_row_group` lignes avant écriture :
+    la taille des row groups ne dépend pas de la taille des lots produits.
+    Les datetime64 et catégories du schéma compact sont convertis par Arrow
+    (date32 / timestamp, string), sans passer par du texte.
+    """
+
+    texte = False
+
+    def __init__(self, chemin: str,
+                 compression: str = COMPRESSION_PARQUET,
+                 taille_row_group: int = TAILLE_ROW_GROUP):
+        super().__init__(chemin)
+        self.compression = compression
+        self.taille_row_group = int(taille_row_group)
+        self._writer = None
+        self._schema = None
+        self._tampon = []
+        self._nb_tampon = 0
+
+    def _vider_tampon(self) -> None:
+        if not self._tampon:
+            return
+        pa, _ = _importer_pyarrow()
+        table = pa.concat_tables(self._tampon)
+        self._writer.write_table(table, row_group_size=self.taille_row_group)
+        self._tampon = []
+        self._nb_tampon = 0
+
+    def _ecrire(self, lot: pd.DataFrame) -> None:
+        if self._writer is None:
+            _, pq = _importer_pyarrow()
+            self._schema = schema_arrow(lot)
+            self._writer = pq.ParquetWriter(self.chemin, self._schema, compression=self.compression)
+        self._tampon.append(table_arrow(lot, self._schema))
+        self._nb_tampon += len(lot)
+        if self._nb_tampon >= self.taille_row_group:
+            self._vider_tampon()
+
+    def fermer(self) -> None:
+        if self._writer is not None:
+            self._vider_tampon()
+            self._writer.close()
+            self._writer = None
+
+def ecrire_parquet(df: pd.DataFrame, chemin: str, **options) -> None:
+    """Export Parquet d'une table déjà en mémoire (dimensions, mode non streaming)."""
+    with EcrivainParquet(chemin, **options) as ecrivain:
+        ecrivain.ecrire(df)
@@ -6,33 +6,62 @@ Date : Janvier 2026
 Version corrigée (alignée cahier des charges + tes exigences de formats) :
 - Ajout DateTime_Vente + Heure_Vente (Heatmap Jour x Heure)
 - Dim_Promotion : ajout Date_Debut / Date_Fin
-- Garantie NB_PRODUITS exact (complétion si catalogue insuffisant)
+- Garantie NB_PRODUITS exact (variantes synthétiques si catalogue insuffisant)
 - Nommage DW : Dim_* / Fait_*
 - Clients + Ventes en EXCEL (comme tu veux)
 - Le reste réparti sur différents formats (CSV / XML / JSON / SQL)
 - CSV séparateur ';' (Excel FR)
 - JSON : NaN -> null
 - Objectifs Excel : feuilles 2023 et 2024
+
+Utilisation :
+    python gen_data.py                                    # jeu complet, paramètres par défaut
+    python gen_data.py --mode iteratif                    # ventes / trafic ligne à ligne (d'origine)
+    python gen_data.py --transactions 1000000 --streaming
+    python gen_data.py --sf 10 --sharde                   # facteur d'échelle : volumes x10
+    python gen_data.py --sf 10 --compact                  # tables typées compactes en mémoire
+    python gen_data.py --tables Fait_Trafic_Web --sessions 5000000 --format-trafic ndjson
+    python gen_data.py --help
+
+Depuis l'introduction du moteur vectorisé (défaut), un même seed ne donne
+plus le même jeu qu'auparavant pour Fait_Ventes et Fait_Trafic_Web :
+--mode iteratif reprend leurs générateurs ligne à ligne d'origine. Les
+autres tables ne dépendent pas du mode (Fait_Retours et Fait_Stock sont
+toujours vectorisés, Dim_Produit complète le catalogue par un flux dédié).
+
+Le module n'a aucun effet de bord à l'import : les générateurs
+(generer_dim_temps, generer_dim_clients, ...) s'importent seuls, par
+exemple depuis un benchmark. Les formats lourds (openpyxl, pyarrow,
+multiprocessing) ne sont chargés que s'ils sont utilisés.
 """
 
+import argparse
+import json
 import os
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
 import random
-import json
-import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from moteur_vectorise import (generer_fait_ventes_vectorise, generer_fait_trafic_vectorise,
+                              iter_fait_ventes_vectorise, iter_fait_trafic_vectorise,
+                              generer_fait_retours_lot, generer_fait_stock_vectorise,
+                              synthetiser_variantes_produits, compacter, memoire_mo,
+                              IndexDates, TAUX_RETOUR)
+from exports import (EcrivainCSV, EcrivainJSONPayload, EcrivainNDJSON, EcrivainExcel,
+                     EcrivainMultiple, EcrivainNul, EcrivainParquet, EcrivainXML, ecrire_parquet)
+from rfm import AccumulateurRFM, segmenter_rfm, REGLES_SEUILS, REGLES_SCORES
+from instrumentation import Instrumentation, activer, etape
 
 # ============================================
-# CONFIGURATION GLOBALE
+# CONFIGURATION GLOBALE (valeurs par défaut de la CLI)
 # ============================================
 
 SEED = 42
-random.seed(SEED)
-np.random.seed(SEED)
 
 OUTPUT_PATH = "../02_Donnees/Sources/"
-os.makedirs(OUTPUT_PATH, exist_ok=True)
 
 NB_CLIENTS = 5000
 NB_PRODUITS = 300
@@ -42,16 +71,131 @@ NB_SESSIONS_WEB = 100000
 DATE_DEBUT = datetime(2023, 1, 1)
 DATE_FIN = datetime(2024, 12, 31)
 
-print("🚀 Démarrage génération des données E-Commerce (version multi-formats)...")
+# Facteur d'échelle (--sf, façon TPC-DS SF1/SF10/SF100) : SF1 = volumes ci-dessus,
+# SFn les multiplie tous par n. Les ratios restent fixes : 10 ventes par client,
+# 2 sessions par vente, ~17 clients par produit, retours ~5% des ventes,
+# concentration 80/20, un snapshot de stock par produit et par semaine,
+# doublons (1%) et NULL (4%) de Dim_Client.
+VOLUMES_SF1 = {
+    'nb_clients': NB_CLIENTS,
+    'nb_produits': NB_PRODUITS,
+    'nb_transactions': NB_TRANSACTIONS,
+    'nb_sessions_web': NB_SESSIONS_WEB
+}
+TAUX_DOUBLONS_CLIENTS = 0.01
+TAUX_NULL_CLIENTS = 0.04
+
+TAILLE_CHUNK = 100_000
+
+TABLES_DIMENSIONS = ['Dim_Temps', 'Dim_Client', 'Dim_Produit', 'Dim_Canal', 'Dim_Promotion',
+                     'Dim_Livraison', 'Dim_Motif_Retour', 'Referentiel_Geo', 'Objectifs_Mensuels']
+TABLES_FAITS = ['Fait_Ventes', 'Fait_Retours', 'Fait_Trafic_Web', 'Fait_Stock']
+TABLES = TABLES_DIMENSIONS + TABLES_FAITS
+
+REGLES_RFM = {'seuils': REGLES_SEUILS, 'scores': REGLES_SCORES}
+
+
+@dataclass
+class ParametresGeneration:
+    """Paramètres d'une exécution (tailles, période, graine, sorties, modes)."""
+
+    seed: int = SEED
+    # Facteur d'échelle ayant servi à calculer les volumes (None : volumes explicites)
+    facteur_echelle: float | None = None
+    nb_clients: int = NB_CLIENTS
+    nb_produits: int = NB_PRODUITS
+    nb_transactions: int = NB_TRANSACTIONS
+    nb_sessions_web: int = NB_SESSIONS_WEB
+    date_debut: datetime = DATE_DEBUT
+    date_fin: datetime = DATE_FIN
+    output_path: str = OUTPUT_PATH
+    # Tables exportées (les faits nécessaires aux autres sont générés quand même)
+    tables: list = field(default_factory=lambda: list(TABLES))
+
+    # "vectorise" (défaut) : tirage NumPy par lots (moteur_vectorise.py), adapté aux gros volumes.
+    #     Mêmes distributions que la version d'origine, mais pas les mêmes tirages :
+    #     à seed égal, Fait_Ventes / Fait_Trafic_Web diffèrent des jeux produits avant.
+    # "iteratif" : algorithme d'origine de Fait_Ventes / Fait_Trafic_Web, une itération
+    #     Python par ligne, dans l'ordre de tirage historique (--mode iteratif)
+    mode_generation: str = "vectorise"
+
+    # Streaming : les faits sont générés par lots de taille_chunk lignes et écrits
+    # directement dans les fichiers (mémoire bornée par la taille d'un lot).
+    # Utilise toujours le moteur vectorisé pour Ventes / Retours / Trafic.
+    streaming: bool = False
+    taille_chunk: int = TAILLE_CHUNK
+
+    # Shardé : les faits (ventes, retours, trafic, stock) sont répartis en shards de
+    # taille_chunk lignes sur nb_workers processus. Chaque shard a son propre flux
+    # aléatoire dérivé de seed : résultat identique quel que soit nb_workers.
+    # Implique streaming.
+    sharde: bool = False
+    nb_workers: int = os.cpu_count() or 1
+
+    # Schéma compact (moteur_vectorise.TYPES_COMPACTS) : catégories, dates datetime64,
+    # entiers étroits en mémoire ; les dates ne sont formatées en texte qu'à l'export.
+    # Les fichiers produits sont identiques.
+    schema_compact: bool = False
+
+    # Export colonnaire (Parquet typé + compressé, nécessite pyarrow) en plus des
+    # formats sources, dans output_path/Parquet/
+    export_parquet: bool = False
+
+    # Règles de segmentation RFM : "seuils" (seuils historiques Nb_Achats / CA)
+    # ou "scores" (scores R/F/M par quantiles, avec la récence)
+    regles_rfm: str = "seuils"
+
+    # Fait_Stock incrémental : n'ajoute à Fait_Stock.csv que les snapshots hebdomadaires
+    # postérieurs au dernier écrit (ex. après avoir avancé date_fin)
+    stock_incremental: bool = False
+
+    # Format de Fait_Trafic_Web :
+    # "payload" : Fait_Trafic_Web.json ({"generated_at", "sessions": [...]}, format historique)
+    # "ndjson"  : Fait_Trafic_Web.ndjson, une session par ligne, écrit et relu par lots
+    format_trafic: str = "payload"
+    compression_ndjson: bool = False   # True -> Fait_Trafic_Web.ndjson.gz
+
+    def __post_init__(self):
+        if self.sharde:
+            self.streaming = True
+        inconnues = set(self.tables) - set(TABLES)
+        if inconnues:
+            raise ValueError(f"Tables inconnues : {sorted(inconnues)}")
+
+    @property
+    def parquet_path(self) -> str:
+        return os.path.join(self.output_path, "Parquet")
+
+    @property
+    def fichier_trafic(self) -> str:
+        if self.format_trafic == "ndjson":
+            return 'Fait_Trafic_Web.ndjson.gz' if self.compression_ndjson else 'Fait_Trafic_Web.ndjson'
+        return 'Fait_Trafic_Web.json'
+
+    def chemin(self, fichier: str) -> str:
+        return os.path.join(self.output_path, fichier)
+
+    def exporte(self, *tables: str) -> bool:
+        """Vrai si au moins une des tables est sélectionnée pour l'export."""
+        return any(t in self.tables for t in tables)
+
+
+def volumes_echelle(facteur_echelle: float) -> dict:
+    """Volumes (nb_clients, nb_produits, nb_transactions, nb_sessions_web) du facteur d'échelle."""
+    return {cle: max(1, int(round(volume * facteur_echelle))) for cle, volume in VOLUMES_SF1.items()}
+
+def initialiser_graines(seed: int) -> np.random.Generator:
+    """Graines des générateurs globaux (code itératif) + flux NumPy des moteurs vectorisés."""
+    random.seed(seed)
+    np.random.seed(seed)
+    return np.random.default_rng(seed)
 
 # ============================================
 # 1) DIM_TEMPS
 # ============================================
 
-print("\n📅 Génération Dim_Temps...")
-
-def generer_dim_temps():
-    dates = pd.date_range(start=DATE_DEBUT, end=DATE_FIN, freq='D')
+def generer_dim_temps(date_debut=DATE_DEBUT, date_fin=DATE_FIN):
+    dates = pd.date_range(start=date_debut, end=date_fin, freq='D')
 
     dim_temps = pd.DataFrame({
         'ID_Date': range(1, len(dates) + 1),
@@ -83,15 +227,10 @@ def generer_dim_temps():
     dim_temps['Saison_Commerciale'] = dim_temps['Date_Complete'].apply(get_saison)
     return dim_temps
 
-dim_temps = generer_dim_temps()
-print(f"✅ {len(dim_temps)} jours générés (2023-2024)")
-
 # ============================================
 # 2) DIM_CLIENT
 # ============================================
 
-print("\n👥 Génération Dim_Client...")
-
 prenoms_maroc = ['Ahmed', 'Mohamed', 'Fatima', 'Khadija', 'Hassan', 'Youssef',
                  'Aicha', 'Zineb', 'Omar', 'Salma', 'Karim', 'Laila',
                  'Mehdi', 'Sara', 'Rachid', 'Samira', 'Bilal', 'Nadia']
@@ -104,10 +243,18 @@ villes_maroc = ['Casablanca', 'Rabat', 'Marrakech', 'Fès', 'Tanger',
                 'Agadir', 'Meknès', 'Oujda', 'Kenitra', 'Tétouan',
                 'Salé', 'El Jadida', 'Nador', 'Mohammedia']
 
-def generer_dim_clients():
+# Code postal principal de chaque ville (Dim_Client et Referentiel_Geo)
+codes_postaux = {
+    'Casablanca': '20000', 'Rabat': '10000', 'Marrakech': '40000', 'Fès': '30000',
+    'Tanger': '90000', 'Agadir': '80000', 'Meknès': '50000', 'Oujda': '60000',
+    'Kenitra': '14000', 'Tétouan': '93000', 'Salé': '11000', 'El Jadida': '24000',
+    'Nador': '62000', 'Mohammedia': '28800'
+}
+
+def generer_dim_clients(nb_clients=NB_CLIENTS, date_debut=DATE_DEBUT, date_fin=DATE_FIN, seed=SEED):
     clients = []
 
-    for i in range(1, NB_CLIENTS + 1):
+    for i in range(1, nb_clients + 1):
         prenom = random.choice(prenoms_maroc)
         nom = random.choice(noms_maroc)
         genre = random.choice(['M', 'F'])
@@ -116,8 +263,8 @@ def generer_dim_clients():
         age = max(18, min(70, age))
 
         jours_depuis_debut = int(np.random.exponential(200))
-        jours_depuis_debut = min(jours_depuis_debut, (DATE_FIN - DATE_DEBUT).days)
-        date_inscription = DATE_DEBUT + timedelta(days=jours_depuis_debut)
+        jours_depuis_debut = min(jours_depuis_debut, (date_fin - date_debut).days)
+        date_inscription = date_debut + timedelta(days=jours_depuis_debut)
 
         email = f"{prenom.lower()}.{nom.lower()}{random.randint(1,999)}@email.ma"
         telephone = f"+212{random.choice([6,7])}{random.randint(10000000,99999999)}"
@@ -135,6 +282,7 @@ def generer_dim_clients():
             'Telephone': telephone,
             'Date_Inscription': date_inscription.strftime('%Y-%m-%d'),
             'Ville': ville,
+            'Code_Postal': codes_postaux[ville],
             'Pays': 'Maroc',
             'Age': age,
             'Genre': genre,
@@ -144,27 +292,24 @@ def generer_dim_clients():
 
     df_clients = pd.DataFrame(clients)
 
-    # Doublons volontaires (50) pour ETL
-    doublons = df_clients.sample(50, random_state=SEED).copy()
-    doublons['ID_Client'] = range(NB_CLIENTS + 1, NB_CLIENTS + 51)
+    # Doublons volontaires (1%, soit 50 en SF1) pour ETL
+    doublons = df_clients.sample(int(round(nb_clients * TAUX_DOUBLONS_CLIENTS)), random_state=seed).copy()
+    doublons['ID_Client'] = range(nb_clients + 1, nb_clients + len(doublons) + 1)
     df_clients = pd.concat([df_clients, doublons], ignore_index=True)
 
-    # NULL volontaires
-    null_indices = random.sample(range(len(df_clients)), 200)
-    df_clients.loc[null_indices[:100], 'Telephone'] = None
-    df_clients.loc[null_indices[100:], 'Ville'] = None
+    # NULL volontaires (4%, soit 200 en SF1 : moitié Telephone, moitié Ville ;
+    # le Code_Postal reste renseigné : l'ETL retrouve la ville par le Referentiel_Geo)
+    nb_nulls = int(round(nb_clients * TAUX_NULL_CLIENTS))
+    null_indices = random.sample(range(len(df_clients)), nb_nulls)
+    df_clients.loc[null_indices[:nb_nulls // 2], 'Telephone'] = None
+    df_clients.loc[null_indices[nb_nulls // 2:], 'Ville'] = None
 
     return df_clients
 
-dim_clients = generer_dim_clients()
-print(f"✅ {len(dim_clients)} clients générés (dont 50 doublons à nettoyer)")
-
 # ============================================
 # 3) DIM_PRODUIT
 # ============================================
 
-print("\n📦 Génération Dim_Produit...")
-
 catalogue_produits = {
     'Électronique': {
         'Smartphones': ['iPhone 14', 'Samsung Galaxy S23', 'Xiaomi Redmi Note 12', 'Huawei P60'],
@@ -201,20 +346,20 @@ catalogue_produits = {
 marques = ['Apple', 'Samsung', 'Sony', 'Nike', 'Adidas', 'Zara', 'H&M',
            'Philips', 'Bosch', "L'Oréal", 'Dior', 'Generic']
 
+# Fourchette de Prix_Unitaire (MAD) par catégorie
+prix_par_categorie = {
+    'Électronique': (500, 15000),
+    'Mode': (100, 2000),
+    'Maison': (50, 3000),
+    'Beauté': (50, 800),
+    'Sport': (80, 1500),
+    'Livres': (50, 300)
+}
+
 def _prix_par_categorie(categorie: str) -> float:
-    if categorie == 'Électronique':
-        return round(random.uniform(500, 15000), 2)
-    if categorie == 'Mode':
-        return round(random.uniform(100, 2000), 2)
-    if categorie == 'Maison':
-        return round(random.uniform(50, 3000), 2)
-    if categorie == 'Beauté':
-        return round(random.uniform(50, 800), 2)
-    if categorie == 'Sport':
-        return round(random.uniform(80, 1500), 2)
-    return round(random.uniform(50, 300), 2)
-
-def generer_dim_produits():
+    return round(random.uniform(*prix_par_categorie.get(categorie, (50, 300))), 2)
+
+def generer_dim_produits(nb_produits=NB_PRODUITS, seed=SEED):
     produits = []
     id_prod = 1
 
@@ -243,99 +388,155 @@ def generer_dim_produits():
                     })
 
                     id_prod += 1
-                    if id_prod > NB_PRODUITS:
+                    if id_prod > nb_produits:
                         break
-                if id_prod > NB_PRODUITS:
+                if id_prod > nb_produits:
                     break
-            if id_prod > NB_PRODUITS:
+            if id_prod > nb_produits:
                 break
-        if id_prod > NB_PRODUITS:
+        if id_prod > nb_produits:
             break
 
     df = pd.DataFrame(produits)
 
-    # Complétion si < NB_PRODUITS
-    if len(df) < NB_PRODUITS:
-        manque = NB_PRODUITS - len(df)
-        for k in range(manque):
-            pid = len(df) + 1
-            categorie = random.choice(list(catalogue_produits.keys()))
-            sous_cat = random.choice(list(catalogue_produits[categorie].keys()))
-            marque = random.choice(marques)
-
-            prix = _prix_par_categorie(categorie)
-            cout = round(prix * random.uniform(0.6, 0.8), 2)
-
-            df = pd.concat([df, pd.DataFrame([{
-                'ID_Produit': pid,
-                'SKU': f'SKU{pid:05d}',
-                'Nom_Produit': f"Produit Generic {categorie} {marque} #{k+1}",
-                'Categorie': categorie,
-                'Sous_Categorie': sous_cat,
-                'Marque': marque,
-                'Prix_Unitaire': prix,
-                'Cout_Achat': cout,
-                'Poids_Kg': round(random.uniform(0.1, 5.0), 2),
-                'Actif': 1
-            }])], ignore_index=True)
-
-    if len(df) > NB_PRODUITS:
-        df = df.iloc[:NB_PRODUITS].copy()
+    # Au-delà du catalogue : variantes synthétiques des articles (tirage vectorisé,
+    # flux aléatoire propre à Dim_Produit, dérivé de seed)
+    if len(df) < nb_produits:
+        from execution_parallele import rng_shard
 
-    return df
+        variantes = synthetiser_variantes_produits(rng_shard(seed, 'produits', 0), nb_produits - len(df),
+                                                   catalogue_produits, marques, prix_par_categorie,
+                                                   id_debut=len(df) + 1)
+        df = pd.concat([df, variantes], ignore_index=True)
+
+    if len(df) > nb_produits:
+        df = df.iloc[:nb_produits].copy()
 
-dim_produits = generer_dim_produits()
-print(f"✅ {len(dim_produits)} produits générés dans {dim_produits['Categorie'].nunique()} catégories")
+    return df
 
 # ============================================
 # 4) AUTRES DIMENSIONS
 # ============================================
 
-print("\n🏪 Génération Dim_Canal, Dim_Promotion, Dim_Livraison, Dim_Motif_Retour...")
-
-dim_canal = pd.DataFrame({
-    'ID_Canal': [1, 2, 3],
-    'Nom_Canal': ['Web', 'Mobile', 'Magasin'],
-    'Type': ['Online', 'Online', 'Offline']
-})
-
-promotions = [
-    {'ID_Promotion': 1, 'Code_Promo': 'BIENVENUE10', 'Nom_Campagne': 'Bienvenue nouveaux clients',
-     'Type_Remise': 'Pourcentage', 'Valeur_Remise': 10, 'Date_Debut': '2023-01-01', 'Date_Fin': '2024-12-31'},
-    {'ID_Promotion': 2, 'Code_Promo': 'BLACKFRIDAY', 'Nom_Campagne': 'Black Friday 2024',
-     'Type_Remise': 'Pourcentage', 'Valeur_Remise': 30, 'Date_Debut': '2024-11-01', 'Date_Fin': '2024-11-30'},
-    {'ID_Promotion': 3, 'Code_Promo': 'SOLDES50', 'Nom_Campagne': 'Soldes Été',
-     'Type_Remise': 'Pourcentage', 'Valeur_Remise': 50, 'Date_Debut': '2024-07-01', 'Date_Fin': '2024-08-31'},
-    {'ID_Promotion': 4, 'Code_Promo': 'RAMADAN20', 'Nom_Campagne': 'Promo Ramadan',
-     'Type_Remise': 'Pourcentage', 'Valeur_Remise': 20, 'Date_Debut': '2024-03-01', 'Date_Fin': '2024-04-30'},
-    {'ID_Promotion': 5, 'Code_Promo': None, 'Nom_Campagne': 'Sans promotion',
-     'Type_Remise': None, 'Valeur_Remise': 0, 'Date_Debut': None, 'Date_Fin': None}
-]
-dim_promotion = pd.DataFrame(promotions)
-
-dim_livraison = pd.DataFrame({
-    'ID_Livraison': [1, 2, 3],
-    'Transporteur': ['Amana', 'CTM', 'Chrono Express'],
-    'Type_Livraison': ['Standard', 'Express', 'Standard'],
-    'Delai_Prevu_Jours': [3, 1, 2]
-})
-
-dim_motif_retour = pd.DataFrame({
-    'ID_Motif': range(1, 8),
-    'Motif': ['Produit défectueux', 'Taille incorrecte', 'Couleur différente',
-              "Changement d'avis", 'Livraison tardive', 'Produit endommagé', 'Autre'],
-    'Categorie': ['Qualité', 'Erreur', 'Erreur', 'Client', 'Logistique', 'Logistique', 'Autre']
-})
-
-print("✅ Dimensions simples créées")
+def generer_dim_canal():
+    return pd.DataFrame({
+        'ID_Canal': [1, 2, 3],
+        'Nom_Canal': ['Web', 'Mobile', 'Magasin'],
+        'Type': ['Online', 'Online', 'Offline']
+    })
+
+def generer_dim_promotion():
+    promotions = [
+        {'ID_Promotion': 1, 'Code_Promo': 'BIENVENUE10', 'Nom_Campagne': 'Bienvenue nouveaux clients',
+         'Type_Remise': 'Pourcentage', 'Valeur_Remise': 10, 'Date_Debut': '2023-01-01', 'Date_Fin': '2024-12-31'},
+        {'ID_Promotion': 2, 'Code_Promo': 'BLACKFRIDAY', 'Nom_Campagne': 'Black Friday 2024',
+         'Type_Remise': 'Pourcentage', 'Valeur_Remise': 30, 'Date_Debut': '2024-11-01', 'Date_Fin': '2024-11-30'},
+        {'ID_Promotion': 3, 'Code_Promo': 'SOLDES50', 'Nom_Campagne': 'Soldes Été',
+         'Type_Remise': 'Pourcentage', 'Valeur_Remise': 50, 'Date_Debut': '2024-07-01', 'Date_Fin': '2024-08-31'},
+        {'ID_Promotion': 4, 'Code_Promo': 'RAMADAN20', 'Nom_Campagne': 'Promo Ramadan',
+         'Type_Remise': 'Pourcentage', 'Valeur_Remise': 20, 'Date_Debut': '2024-03-01', 'Date_Fin': '2024-04-30'},
+        {'ID_Promotion': 5, 'Code_Promo': None, 'Nom_Campagne': 'Sans promotion',
+         'Type_Remise': None, 'Valeur_Remise': 0, 'Date_Debut': None, 'Date_Fin': None}
+    ]
+    return pd.DataFrame(promotions)
+
+def generer_dim_livraison():
+    return pd.DataFrame({
+        'ID_Livraison': [1, 2, 3],
+        'Transporteur': ['Amana', 'CTM', 'Chrono Express'],
+        'Type_Livraison': ['Standard', 'Express', 'Standard'],
+        'Delai_Prevu_Jours': [3, 1, 2]
+    })
+
+def generer_dim_motif_retour():
+    return pd.DataFrame({
+        'ID_Motif': range(1, 8),
+        'Motif': ['Produit défectueux', 'Taille incorrecte', 'Couleur différente',
+                  "Changement d'avis", 'Livraison tardive', 'Produit endommagé', 'Autre'],
+        'Categorie': ['Qualité', 'Erreur', 'Erreur', 'Client', 'Logistique', 'Logistique', 'Autre']
+    })
+
+region_map = {
+    'Casablanca': 'Casablanca-Settat',
+    'Mohammedia': 'Casablanca-Settat',
+    'Rabat': 'Rabat-Salé-Kénitra',
+    'Salé': 'Rabat-Salé-Kénitra',
+    'Kenitra': 'Rabat-Salé-Kénitra',
+    'Marrakech': 'Marrakech-Safi',
+    'Agadir': 'Souss-Massa',
+    'Tanger': 'Tanger-Tétouan-Al Hoceïma',
+    'Tétouan': 'Tanger-Tétouan-Al Hoceïma',
+    'Fès': 'Fès-Meknès',
+    'Meknès': 'Fès-Meknès',
+    'Oujda': "L'Oriental",
+    'Nador': "L'Oriental",
+    'El Jadida': 'Casablanca-Settat'
+}
+
+def generer_villes_geo():
+    return pd.DataFrame({
+        'nom': villes_maroc,
+        'code_postal': [codes_postaux[v] for v in villes_maroc],
+        'region': [region_map.get(v, 'Autre') for v in villes_maroc]
+    })
+
+def generer_objectifs_mensuels():
+    """Objectifs 2023 tirés au hasard, 2024 = 2023 x 1.15 ; une colonne Annee."""
+    objectifs_2023 = pd.DataFrame({
+        'Mois': range(1, 13),
+        'Objectif_CA': [random.randint(800000, 1500000) for _ in range(12)],
+        'Budget_Marketing': [random.randint(50000, 100000) for _ in range(12)]
+    })
+    objectifs_2024 = objectifs_2023.copy()
+    objectifs_2024['Objectif_CA'] = (objectifs_2024['Objectif_CA'] * 1.15).astype(int)
+    return pd.concat([objectifs_2023.assign(Annee=2023), objectifs_2024.assign(Annee=2024)],
+                     ignore_index=True)
+
+def generer_dimensions(p: ParametresGeneration) -> dict:
+    """Toutes les dimensions (les faits en dépendent), dans l'ordre historique des tirages."""
+    print("\n📅 Génération Dim_Temps...")
+    with etape('Dim_Temps') as mesure:
+        dim_temps = generer_dim_temps(p.date_debut, p.date_fin)
+        mesure.lignes = len(dim_temps)
+    print(f"✅ {len(dim_temps)} jours générés ({p.date_debut.year}-{p.date_fin.year})")
+
+    print("\n👥 Génération Dim_Client...")
+    with etape('Dim_Client') as mesure:
+        dim_clients = generer_dim_clients(p.nb_clients, p.date_debut, p.date_fin, p.seed)
+        mesure.lignes = len(dim_clients)
+    print(f"✅ {len(dim_clients)} clients générés (dont {len(dim_clients) - p.nb_clients} doublons à nettoyer)")
+
+    print("\n📦 Génération Dim_Produit...")
+    with etape('Dim_Produit') as mesure:
+        dim_produits = generer_dim_produits(p.nb_produits, p.seed)
+        mesure.lignes = len(dim_produits)
+    print(f"✅ {len(dim_produits)} produits générés dans {dim_produits['Categorie'].nunique()} catégories")
+
+    print("\n🏪 Génération Dim_Canal, Dim_Promotion, Dim_Livraison, Dim_Motif_Retour...")
+    with etape('Dimensions simples') as mesure:
+        dimensions = {
+            'Dim_Temps': dim_temps,
+            'Dim_Client': dim_clients,
+            'Dim_Produit': dim_produits,
+            'Dim_Canal': generer_dim_canal(),
+            'Dim_Promotion': generer_dim_promotion(),
+            'Dim_Livraison': generer_dim_livraison(),
+            'Dim_Motif_Retour': generer_dim_motif_retour(),
+            'Referentiel_Geo': generer_villes_geo()
+        }
+        mesure.lignes = sum(len(dimensions[nom]) for nom in ['Dim_Canal', 'Dim_Promotion', 'Dim_Livraison',
+                                                             'Dim_Motif_Retour', 'Referentiel_Geo'])
+    print("✅ Dimensions simples créées")
+
+    if p.schema_compact:
+        with etape('Schéma compact (dimensions)'):
+            dimensions = {nom: compacter(df, nom) for nom, df in dimensions.items()}
+    return dimensions
 
 # ============================================
 # 5) FAIT_VENTES
 # ============================================
 
-print("\n💰 Génération Fait_Ventes...")
-print("⏳ Cela peut prendre 1-2 minutes...")
-
 # Poids horaires (normalisés une seule fois)
 hour_weights = np.array([
     0.02, 0.01, 0.01, 0.01, 0.01, 0.02,  # 00–05
@@ -345,7 +546,7 @@ hour_weights = np.array([
 ])
 hour_weights = hour_weights / hour_weights.sum()
 
-def generer_fait_ventes():
+def generer_fait_ventes(nb_transactions, dim_temps, dim_produits, dim_promotion, nb_clients):
     ventes = []
 
     saison_weights = {
@@ -358,7 +559,7 @@ def generer_fait_ventes():
 
     canal_proba = [0.6, 0.3, 0.1]
 
-    for i in range(1, NB_TRANSACTIONS + 1):
+    for i in range(1, nb_transactions + 1):
         date_row = dim_temps.sample(1, weights=dim_temps['Saison_Commerciale'].map(saison_weights))
         id_date = int(date_row['ID_Date'].values[0])
         d = pd.to_datetime(date_row['Date_Complete'].values[0]).to_pydatetime()
@@ -370,9 +571,9 @@ def generer_fait_ventes():
 
         # Client 80/20
         if random.random() < 0.8:
-            id_client = random.randint(1, int(NB_CLIENTS * 0.2))
+            id_client = random.randint(1, int(nb_clients * 0.2))
         else:
-            id_client = random.randint(1, NB_CLIENTS)
+            id_client = random.randint(1, nb_clients)
 
         id_produit = random.randint(1, len(dim_produits))
         produit = dim_produits.iloc[id_produit - 1]
@@ -437,94 +638,47 @@ def generer_fait_ventes():
         })
 
         if i % 10000 == 0:
-            print(f"   ⏳ {i}/{NB_TRANSACTIONS} ventes générées...")
+            print(f"   ⏳ {i}/{nb_transactions} ventes générées...")
 
     return pd.DataFrame(ventes)
 
-fait_ventes = generer_fait_ventes()
-print(f"✅ {len(fait_ventes)} ventes générées")
-
-# Segmentation RFM
-print("\n📊 Calcul segmentation RFM...")
-ventes_client = fait_ventes.groupby('ID_Client').agg({
-    'ID_Vente': 'count',
-    'Montant_TTC': 'sum',
-    'DateTime_Vente': 'max'
-}).reset_index()
-ventes_client.columns = ['ID_Client', 'Nb_Achats', 'CA_Total', 'Derniere_Vente']
-
-def calculer_rfm(row):
-    if row['Nb_Achats'] >= 8 and row['CA_Total'] >= 5000:
-        return 'Gold'
-    elif row['Nb_Achats'] >= 4:
-        return 'Silver'
-    elif row['Nb_Achats'] >= 1:
-        return 'Bronze'
-    else:
-        return 'Nouveau'
-
-ventes_client['Segment_RFM'] = ventes_client.apply(calculer_rfm, axis=1)
+# Segmentation RFM (scores par quantiles + règles, vectorisés : voir rfm.py)
+def appliquer_segmentation_rfm(dim_clients, ventes_client, regles=REGLES_SEUILS, date_reference=DATE_FIN):
+    ventes_client = segmenter_rfm(ventes_client, regles, date_reference=date_reference)
 
-dim_clients = dim_clients.merge(
-    ventes_client[['ID_Client', 'Segment_RFM']],
-    on='ID_Client',
-    how='left',
-    suffixes=('', '_new')
-)
-dim_clients['Segment_RFM'] = dim_clients['Segment_RFM_new'].fillna('Nouveau')
-dim_clients = dim_clients.drop('Segment_RFM_new', axis=1)
+    dim_clients = dim_clients.merge(
+        ventes_client[['ID_Client', 'Segment_RFM']],
+        on='ID_Client',
+        how='left',
+        suffixes=('', '_new')
+    )
+    dim_clients['Segment_RFM'] = dim_clients['Segment_RFM_new'].fillna('Nouveau')
+    dim_clients = dim_clients.drop('Segment_RFM_new', axis=1)
 
-print(f"   Distribution RFM: {dim_clients['Segment_RFM'].value_counts().to_dict()}")
+    print(f"   Distribution RFM: {dim_clients['Segment_RFM'].value_counts().to_dict()}")
+    return dim_clients, ventes_client
 
 # ============================================
 # 6) FAIT_RETOURS
 # ============================================
 
-print("\n↩️ Génération Fait_Retours...")
-
-def generer_fait_retours():
-    nb_retours = int(NB_TRANSACTIONS * 0.05)
-    ventes_retournees = fait_ventes.sample(nb_retours, random_state=SEED)
-
-    retours = []
-    for i, (_, vente) in enumerate(ventes_retournees.iterrows(), 1):
-        date_vente = pd.to_datetime(vente['Date_Vente'])
-        delai_retour = random.randint(1, 14)
-        date_retour = date_vente + timedelta(days=delai_retour)
-
-        id_date_retour = dim_temps.loc[dim_temps['Date_Complete'] == date_retour, 'ID_Date'].values
-        if len(id_date_retour) == 0:
-            continue
-
-        retours.append({
-            'ID_Retour': i,
-            'ID_Vente': int(vente['ID_Vente']),
-            'ID_Date_Retour': int(id_date_retour[0]),
-            'Date_Retour': date_retour.strftime('%Y-%m-%d'),
-            'ID_Motif': random.randint(1, 7),
-            'Montant_Rembourse': float(vente['Montant_TTC']),
-            'Delai_Retour_Jours': delai_retour
-        })
-
-    return pd.DataFrame(retours)
-
-fait_retours = generer_fait_retours()
-print(f"✅ {len(fait_retours)} retours générés")
+def generer_fait_retours(rng, fait_ventes, dim_temps, index_dates=None, compact=False):
+    # Tirages vectorisés + résolution des dates par index_dates
+    # (au lieu d'un scan de dim_temps par retour)
+    return generer_fait_retours_lot(rng, fait_ventes, dim_temps, index_dates=index_dates, compact=compact)
 
 # ============================================
 # 7) FAIT_TRAFIC_WEB
 # ============================================
 
-print("\n🌐 Génération Fait_Trafic_Web...")
-
-def generer_fait_trafic():
+def generer_fait_trafic(nb_sessions_web, dim_temps, nb_clients):
     sessions = []
 
-    for i in range(1, NB_SESSIONS_WEB + 1):
+    for i in range(1, nb_sessions_web + 1):
         date_row = dim_temps.sample(1)
         id_date = int(date_row['ID_Date'].values[0])
 
-        id_client = random.randint(1, NB_CLIENTS) if random.random() < 0.5 else None
+        id_client = random.randint(1, nb_clients) if random.random() < 0.5 else None
 
         pages_vues = int(np.random.poisson(3)) + 1
         duree_session = int(np.random.exponential(180))
@@ -543,168 +697,424 @@ def generer_fait_trafic():
         })
 
         if i % 20000 == 0:
-            print(f"   ⏳ {i}/{NB_SESSIONS_WEB} sessions générées...")
+            print(f"   ⏳ {i}/{nb_sessions_web} sessions générées...")
 
     return pd.DataFrame(sessions)
 
-fait_trafic = generer_fait_trafic()
-print(f"✅ {len(fait_trafic)} sessions web générées")
-
 # ============================================
 # 8) FAIT_STOCK
 # ============================================
 
-print("\n📦 Génération Fait_Stock...")
-
-def generer_fait_stock():
-    stocks = []
-    id_stock = 1
-
-    dates_snapshot = pd.date_range(start=DATE_DEBUT, end=DATE_FIN, freq='W')
-
-    for dt in dates_snapshot:
-        id_date = dim_temps.loc[dim_temps['Date_Complete'] == dt, 'ID_Date'].values
-        if len(id_date) == 0:
-            continue
-        id_date = int(id_date[0])
+def dates_snapshot_stock(date_debut=DATE_DEBUT, date_fin=DATE_FIN, apres=None):
+    """Snapshots hebdomadaires (dimanches) de la période, éventuellement après une date."""
+    dates = pd.date_range(start=date_debut, end=date_fin, freq='W')
+    return dates if apres is None else dates[dates > pd.Timestamp(apres)]
+
+def iter_fait_stock(rng, dates_snapshot, dim_temps, dim_produits, index_dates=None,
+                    taille_chunk=TAILLE_CHUNK, id_debut=1, compact=False):
+    """
+    Fait_Stock par groupes de semaines (~taille_chunk lignes par lot) :
+    chaque lot est une matrice semaines x produits générée par broadcast.
+    """
+    semaines_par_lot = max(1, taille_chunk // len(dim_produits))
+
+    for debut in range(0, len(dates_snapshot), semaines_par_lot):
+        lot = generer_fait_stock_vectorise(rng, dates_snapshot[debut:debut + semaines_par_lot],
+                                           dim_temps, dim_produits, id_debut=id_debut,
+                                           index_dates=index_dates, compact=compact)
+        id_debut += len(lot)
+        yield lot
+
+def generer_fait_stock(rng, dates_snapshot, dim_temps, dim_produits, index_dates=None, compact=False):
+    return generer_fait_stock_vectorise(rng, dates_snapshot, dim_temps, dim_produits,
+                                        index_dates=index_dates, compact=compact)
+
+def ajouter_snapshots_stock(p: ParametresGeneration, dim_temps, dim_produits, index_dates=None):
+    """
+    Mode incrémental : ajoute à Fait_Stock.csv uniquement les semaines
+    postérieures au dernier snapshot déjà écrit (au lieu de régénérer
+    tout l'historique). Sans fichier existant, génère tout l'historique.
+    Les nouvelles semaines utilisent un flux aléatoire dérivé de seed et de
+    la date du premier nouveau snapshot : une reprise est reproductible.
+    Retourne le nombre de lignes ajoutées.
+    """
+    from execution_parallele import rng_shard
+    from lectures import derniere_ligne_csv
+
+    chemin = p.chemin('Fait_Stock.csv')
+    dernier = derniere_ligne_csv(chemin)
+
+    if dernier is None:
+        nouvelles_dates, id_debut = dates_snapshot_stock(p.date_debut, p.date_fin), 1
+    else:
+        nouvelles_dates = dates_snapshot_stock(p.date_debut, p.date_fin, apres=dernier['Date_Snapshot'])
+        id_debut = int(dernier['ID_Stock']) + 1
+        print(f"   Dernier snapshot existant : {dernier['Date_Snapshot']} (ID_Stock {dernier['ID_Stock']})")
+
+    if len(nouvelles_dates) == 0:
+        print("✅ Fait_Stock déjà à jour, aucun snapshot ajouté")
+        return 0
+
+    rng_stock = rng_shard(p.seed, 'stock', int(nouvelles_dates[0].strftime('%Y%m%d')))
+    with EcrivainCSV(chemin, ajout=dernier is not None) as ecr:
+        for lot in iter_fait_stock(rng_stock, nouvelles_dates, dim_temps, dim_produits, index_dates,
+                                   p.taille_chunk, id_debut=id_debut, compact=p.schema_compact):
+            ecr.ecrire(lot)
+    print(f"✅ {len(nouvelles_dates)} semaine(s), {ecr.nb_lignes} enregistrements stock ajoutés")
+    return ecr.nb_lignes
 
-        for id_produit in range(1, len(dim_produits) + 1):
-            produit = dim_produits.iloc[id_produit - 1]
-            qte_dispo = random.randint(0, 500)
-            qte_reservee = random.randint(0, min(50, qte_dispo))
-            valeur_stock = qte_dispo * float(produit['Prix_Unitaire'])
+# ============================================
+# 8bis) MODE STREAMING : génération + export des faits par lots
+# ============================================
 
-            stocks.append({
-                'ID_Stock': id_stock,
-                'ID_Produit': id_produit,
-                'ID_Date': id_date,
-                'Date_Snapshot': dt.strftime('%Y-%m-%d'),
-                'Quantite_Disponible': qte_dispo,
-                'Quantite_Reservee': qte_reservee,
-                'Valeur_Stock': round(valeur_stock, 2)
-            })
-            id_stock += 1
+def ecrivain_fait(p: ParametresGeneration, nom_table, creer_ecrivain):
+    """
+    Écrivain de la table (creer_ecrivain() n'est appelé que si la table est
+    exportée), doublé de l'écrivain Parquet si export_parquet est actif.
+    """
+    if not p.exporte(nom_table):
+        return EcrivainNul()
+    ecrivain = creer_ecrivain()
+    if not p.export_parquet:
+        return ecrivain
+    return EcrivainMultiple(ecrivain, EcrivainParquet(os.path.join(p.parquet_path, f"{nom_table}.parquet")))
+
+def ecrivain_trafic(p: ParametresGeneration):
+    chemin = p.chemin(p.fichier_trafic)
+    if p.format_trafic == "ndjson":
+        return EcrivainNDJSON(chemin)
+    return EcrivainJSONPayload(chemin, 'sessions')
+
+def sources_faits_sequentielles(p: ParametresGeneration, rng, dims, index_dates):
+    """Lots (ventes, retours), lots de trafic et lots de stock, sur un seul cœur."""
+    dim_temps, dim_produits = dims['Dim_Temps'], dims['Dim_Produit']
+
+    def ventes_et_retours():
+        prochain_id_retour = 1
+        for lot in iter_fait_ventes_vectorise(rng, p.nb_transactions, dim_temps, dim_produits,
+                                              dims['Dim_Promotion'], p.nb_clients,
+                                              taille_lot=p.taille_chunk, compact=p.schema_compact):
+            retours = generer_fait_retours_lot(rng, lot, dim_temps, id_debut=prochain_id_retour,
+                                               index_dates=index_dates, compact=p.schema_compact)
+            prochain_id_retour += len(retours)
+            yield lot, retours
+
+    trafic = iter_fait_trafic_vectorise(rng, p.nb_sessions_web, dim_temps, p.nb_clients,
+                                        taille_lot=p.taille_chunk, compact=p.schema_compact)
+    stock = iter_fait_stock(rng, dates_snapshot_stock(p.date_debut, p.date_fin), dim_temps,
+                            dim_produits, index_dates, p.taille_chunk, compact=p.schema_compact)
+    return ventes_et_retours(), trafic, stock
+
+def generer_faits_en_flux(p: ParametresGeneration, lots_ventes_retours, lots_trafic, lots_stock):
+    """
+    Écrit chaque lot de faits directement dans son fichier (une source à None
+    n'est pas générée, ex. Fait_Stock en mode incrémental) :
+    - Fait_Ventes -> Fait_Ventes.xlsx + accumulation RFM
+    - Fait_Retours -> Fait_Retours.csv
+    - Fait_Trafic_Web -> Fait_Trafic_Web.json (ou .ndjson selon format_trafic)
+    - Fait_Stock -> Fait_Stock.csv
+    Retourne (ventes_client, schemas) où schemas contient la structure
+    (DataFrame vide) de chaque fait généré, pour le script SQL.
+    """
+    schemas = {}
+    ventes_client = None
+
+    if lots_ventes_retours is not None:
+        accumulateur_rfm = AccumulateurRFM(nb_clients=p.nb_clients)
+        print(f"\n💰 Génération Fait_Ventes + Fait_Retours (lots de {p.taille_chunk})...")
+        with etape('Fait_Ventes + Fait_Retours', dossier=p.output_path) as mesure, \
+                ecrivain_fait(p, 'Fait_Ventes',
+                           lambda: EcrivainExcel(p.chemin('Fait_Ventes.xlsx'), 'Fait_Ventes')) as ecr_ventes, \
+                ecrivain_fait(p, 'Fait_Retours',
+                              lambda: EcrivainCSV(p.chemin('Fait_Retours.csv'))) as ecr_retours:
+            for lot, retours in lots_ventes_retours:
+                ecr_ventes.ecrire(lot)
+                ecr_retours.ecrire(retours)
+                accumulateur_rfm.ajouter(lot)
+                schemas['Fait_Ventes'] = lot.head(0)
+                schemas['Fait_Retours'] = retours.head(0)
+                print(f"   ⏳ {ecr_ventes.nb_lignes}/{p.nb_transactions} ventes écrites...")
+            mesure.lignes = ecr_ventes.nb_lignes + ecr_retours.nb_lignes
+        print(f"✅ {ecr_ventes.nb_lignes} ventes, {ecr_retours.nb_lignes} retours générés")
+        ventes_client = accumulateur_rfm.resultat()
+
+    if lots_trafic is not None:
+        print(f"\n🌐 Génération Fait_Trafic_Web (lots de {p.taille_chunk})...")
+        with etape('Fait_Trafic_Web', dossier=p.output_path) as mesure, \
+                ecrivain_fait(p, 'Fait_Trafic_Web', lambda: ecrivain_trafic(p)) as ecr:
+            for lot in lots_trafic:
+                ecr.ecrire(lot)
+                schemas['Fait_Trafic_Web'] = lot.head(0)
+            mesure.lignes = ecr.nb_lignes
+        print(f"✅ {ecr.nb_lignes} sessions web générées")
+
+    if lots_stock is not None:
+        print("\n📦 Génération Fait_Stock (par groupes de semaines)...")
+        with etape('Fait_Stock', dossier=p.output_path) as mesure, \
+                ecrivain_fait(p, 'Fait_Stock', lambda: EcrivainCSV(p.chemin('Fait_Stock.csv'))) as ecr:
+            for lot in lots_stock:
+                ecr.ecrire(lot)
+                schemas['Fait_Stock'] = lot.head(0)
+            mesure.lignes = ecr.nb_lignes
+        print(f"✅ {ecr.nb_lignes} enregistrements stock générés")
+
+    return ventes_client, schemas
+
+def schemas_faits_vides(p: ParametresGeneration, dims, index_dates) -> dict:
+    """
+    Structure (DataFrame vide) de chaque fait, sans le générer : une ligne
+    tirée sur un flux à part, puis head(0). Sert au script SQL quand une
+    table n'est pas sélectionnée.
+    """
+    rng_schema = np.random.default_rng(p.seed)
+    dim_temps, dim_produits = dims['Dim_Temps'], dims['Dim_Produit']
+    compact = p.schema_compact
+    ventes = generer_fait_ventes_vectorise(rng_schema, 1, dim_temps, dim_produits,
+                                           dims['Dim_Promotion'], p.nb_clients, compact=compact)
+    return {
+        'Fait_Ventes': ventes.head(0),
+        'Fait_Retours': generer_fait_retours_lot(rng_schema, ventes, dim_temps,
+                                                 index_dates=index_dates, compact=compact).head(0),
+        'Fait_Trafic_Web': generer_fait_trafic_vectorise(rng_schema, 1, dim_temps, p.nb_clients,
+                                                         compact=compact).head(0),
+        'Fait_Stock': generer_fait_stock_vectorise(rng_schema, dates_snapshot_stock(p.date_debut, p.date_fin)[:0],
+                                                   dim_temps, dim_produits, index_dates=index_dates,
+                                                   compact=compact)
+    }
 
-    return pd.DataFrame(stocks)
+# ============================================
+# ORCHESTRATION DE LA GÉNÉRATION
+# ============================================
 
-fait_stock = generer_fait_stock()
-print(f"✅ {len(fait_stock)} enregistrements stock générés")
+def generer_faits(p: ParametresGeneration, rng, donnees: dict, index_dates):
+    """
+    Génère les faits nécessaires aux tables sélectionnées (Fait_Ventes aussi
+    pour Fait_Retours et pour la segmentation RFM de Dim_Client), en mémoire
+    ou en flux. Complète `donnees` ; retourne les schémas des faits.
+    """
+    avec_ventes = p.exporte('Fait_Ventes', 'Fait_Retours', 'Dim_Client')
+    avec_trafic = p.exporte('Fait_Trafic_Web')
+    avec_stock = p.exporte('Fait_Stock') and not p.stock_incremental
+    dim_temps, dim_produits = donnees['Dim_Temps'], donnees['Dim_Produit']
+    ventes_client = None
+
+    if p.sharde:
+        from execution_parallele import GenerateurParallele
+
+        print(f"\n🧵 Mode shardé : {p.nb_workers} workers, shards de {p.taille_chunk} lignes")
+        with GenerateurParallele(p.seed, dim_temps, dim_produits, donnees['Dim_Promotion'], p.nb_clients,
+                                 nb_workers=p.nb_workers, taille_shard=p.taille_chunk,
+                                 compact=p.schema_compact) as generateur:
+            ventes_client, schemas = generer_faits_en_flux(
+                p,
+                generateur.iter_ventes(p.nb_transactions) if avec_ventes else None,
+                generateur.iter_trafic(p.nb_sessions_web) if avec_trafic else None,
+                generateur.iter_stock(dates_snapshot_stock(p.date_debut, p.date_fin)) if avec_stock else None
+            )
+    elif p.streaming:
+        ventes, trafic, stock = sources_faits_sequentielles(p, rng, donnees, index_dates)
+        ventes_client, schemas = generer_faits_en_flux(p,
+                                                       ventes if avec_ventes else None,
+                                                       trafic if avec_trafic else None,
+                                                       stock if avec_stock else None)
+    else:
+        schemas = {}
+        if avec_ventes:
+            print("\n💰 Génération Fait_Ventes...")
+            with etape('Fait_Ventes') as mesure:
+                if p.mode_generation == "vectorise":
+                    fait_ventes = generer_fait_ventes_vectorise(rng, p.nb_transactions, dim_temps, dim_produits,
+                                                                donnees['Dim_Promotion'], p.nb_clients,
+                                                                compact=p.schema_compact)
+                else:
+                    print("⏳ Cela peut prendre 1-2 minutes...")
+                    fait_ventes = generer_fait_ventes(p.nb_transactions, dim_temps, dim_produits,
+                                                      donnees['Dim_Promotion'], p.nb_clients)
+                    if p.schema_compact:
+                        fait_ventes = compacter(fait_ventes, 'Fait_Ventes')
+                mesure.lignes = len(fait_ventes)
+            print(f"✅ {len(fait_ventes)} ventes générées")
+
+            with etape('Agrégat RFM', lignes=len(fait_ventes)):
+                accumulateur_rfm = AccumulateurRFM(nb_clients=p.nb_clients)
+                accumulateur_rfm.ajouter(fait_ventes)
+                ventes_client = accumulateur_rfm.resultat()
+
+            print("\n↩️ Génération Fait_Retours...")
+            with etape('Fait_Retours') as mesure:
+                fait_retours = generer_fait_retours(rng, fait_ventes, dim_temps, index_dates,
+                                                    compact=p.schema_compact)
+                mesure.lignes = len(fait_retours)
+            print(f"✅ {len(fait_retours)} retours générés")
+            donnees.update({'Fait_Ventes': fait_ventes, 'Fait_Retours': fait_retours})
+
+        if avec_trafic:
+            print("\n🌐 Génération Fait_Trafic_Web...")
+            with etape('Fait_Trafic_Web') as mesure:
+                if p.mode_generation == "vectorise":
+                    fait_trafic = generer_fait_trafic_vectorise(rng, p.nb_sessions_web, dim_temps, p.nb_clients,
+                                                                compact=p.schema_compact)
+                else:
+                    fait_trafic = generer_fait_trafic(p.nb_sessions_web, dim_temps, p.nb_clients)
+                    if p.schema_compact:
+                        fait_trafic = compacter(fait_trafic, 'Fait_Trafic_Web')
+                mesure.lignes = len(fait_trafic)
+            print(f"✅ {len(fait_trafic)} sessions web générées")
+            donnees['Fait_Trafic_Web'] = fait_trafic
+
+        if avec_stock:
+            print("\n📦 Génération Fait_Stock...")
+            with etape('Fait_Stock') as mesure:
+                fait_stock = generer_fait_stock(rng, dates_snapshot_stock(p.date_debut, p.date_fin),
+                                                dim_temps, dim_produits, index_dates, compact=p.schema_compact)
+                mesure.lignes = len(fait_stock)
+            print(f"✅ {len(fait_stock)} enregistrements stock générés")
+            donnees['Fait_Stock'] = fait_stock
+
+        schemas = {nom: donnees[nom].head(0) for nom in TABLES_FAITS if nom in donnees}
+
+    if p.stock_incremental and p.exporte('Fait_Stock'):
+        print("\n📦 Fait_Stock incrémental...")
+        chemin_stock = p.chemin('Fait_Stock.csv')
+        taille_avant = os.path.getsize(chemin_stock) if os.path.exists(chemin_stock) else 0
+        with etape('Fait_Stock (incrémental)') as mesure:
+            mesure.lignes = ajouter_snapshots_stock(p, dim_temps, dim_produits, index_dates)
+            # octets ajoutés, pas la taille de tout le fichier
+            mesure.octets = os.path.getsize(chemin_stock) - taille_avant if os.path.exists(chemin_stock) else 0
+
+    if ventes_client is not None:
+        print("\n📊 Calcul segmentation RFM...")
+        with etape('Segmentation RFM', lignes=len(ventes_client)):
+            donnees['Dim_Client'], donnees['Stats_RFM'] = appliquer_segmentation_rfm(
+                donnees['Dim_Client'], ventes_client, REGLES_RFM[p.regles_rfm], date_reference=p.date_fin)
+            if p.schema_compact:
+                donnees['Dim_Client'] = compacter(donnees['Dim_Client'], 'Dim_Client')
+
+    return dict(schemas_faits_vides(p, donnees, index_dates), **schemas)
 
 # ============================================
 # 9) EXPORT MULTI-SOURCES (TES EXIGENCES)
 # ============================================
 
-print("\n💾 Export multi-sources...")
-
-# ---- EXCEL : Clients + Ventes (comme tu veux)
-print("   📗 Export Excel : Dim_Client.xlsx + Fait_Ventes.xlsx + Objectifs_Mensuels.xlsx")
-
-with pd.ExcelWriter(os.path.join(OUTPUT_PATH, 'Dim_Client.xlsx'), engine='openpyxl') as writer:
-    dim_clients.to_excel(writer, sheet_name='Dim_Client', index=False)
-    ventes_client.to_excel(writer, sheet_name='Stats_RFM', index=False)
-
-with pd.ExcelWriter(os.path.join(OUTPUT_PATH, 'Fait_Ventes.xlsx'), engine='openpyxl') as writer:
-    fait_ventes.to_excel(writer, sheet_name='Fait_Ventes', index=False)
-
-objectifs_2023 = pd.DataFrame({
-    'Mois': range(1, 13),
-    'Objectif_CA': [random.randint(800000, 1500000) for _ in range(12)],
-    'Budget_Marketing': [random.randint(50000, 100000) for _ in range(12)]
-})
-objectifs_2024 = objectifs_2023.copy()
-objectifs_2024['Objectif_CA'] = (objectifs_2024['Objectif_CA'] * 1.15).astype(int)
-
-with pd.ExcelWriter(os.path.join(OUTPUT_PATH, 'Objectifs_Mensuels.xlsx'), engine='openpyxl') as writer:
-    objectifs_2023.to_excel(writer, sheet_name='2023', index=False)
-    objectifs_2024.to_excel(writer, sheet_name='2024', index=False)
-
-# ---- CSV : seulement certains (séparateur ; pour Excel FR)
-print("   📄 Export CSV : Dim_Temps, Dim_Promotion, Fait_Stock, Fait_Retours")
-
-dim_temps.to_csv(os.path.join(OUTPUT_PATH, 'Dim_Temps.csv'), index=False, encoding='utf-8-sig', sep=';')
-dim_promotion.to_csv(os.path.join(OUTPUT_PATH, 'Dim_Promotion.csv'), index=False, encoding='utf-8-sig', sep=';')
-fait_stock.to_csv(os.path.join(OUTPUT_PATH, 'Fait_Stock.csv'), index=False, encoding='utf-8-sig', sep=';')
-fait_retours.to_csv(os.path.join(OUTPUT_PATH, 'Fait_Retours.csv'), index=False, encoding='utf-8-sig', sep=';')
-
-# ---- JSON : Dim_Canal + Dim_Livraison + Fait_Trafic_Web (NaN -> null)
-print("   🧾 Export JSON : Dim_Canal, Dim_Livraison, Fait_Trafic_Web")
-
-with open(os.path.join(OUTPUT_PATH, 'Dim_Canal.json'), 'w', encoding='utf-8') as f:
-    json.dump(dim_canal.to_dict(orient="records"), f, ensure_ascii=False, indent=2)
-
-with open(os.path.join(OUTPUT_PATH, 'Dim_Livraison.json'), 'w', encoding='utf-8') as f:
-    json.dump(dim_livraison.to_dict(orient="records"), f, ensure_ascii=False, indent=2)
-
-fait_trafic_json = fait_trafic.replace({np.nan: None})
-payload_trafic = {
-    "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    "sessions": fait_trafic_json.to_dict(orient="records")
-}
-with open(os.path.join(OUTPUT_PATH, 'Fait_Trafic_Web.json'), 'w', encoding='utf-8') as f:
-    json.dump(payload_trafic, f, ensure_ascii=False, indent=2)
-
-# ---- XML : Dim_Produit + Referentiel_Geo + Dim_Motif_Retour
-print("   🧩 Export XML : Dim_Produit, Referentiel_Geo, Dim_Motif_Retour")
-
-# Dim_Produit.xml
-root_prod = ET.Element('Dim_Produit')
-for _, row in dim_produits.iterrows():
-    p = ET.SubElement(root_prod, 'Produit')
-    for col in ['ID_Produit', 'SKU', 'Nom_Produit', 'Categorie', 'Sous_Categorie', 'Marque',
-                'Prix_Unitaire', 'Cout_Achat', 'Poids_Kg', 'Actif']:
-        child = ET.SubElement(p, col)
-        child.text = "" if pd.isna(row[col]) else str(row[col])
-ET.ElementTree(root_prod).write(os.path.join(OUTPUT_PATH, 'Dim_Produit.xml'),
-                                encoding='utf-8', xml_declaration=True)
-
-# Referentiel_Geo.xml
-root_geo = ET.Element('Referentiel_Geo')
-regions = ET.SubElement(root_geo, 'regions')
-
-region_map = {
-    'Casablanca': 'Casablanca-Settat',
-    'Mohammedia': 'Casablanca-Settat',
-    'Rabat': 'Rabat-Salé-Kénitra',
-    'Salé': 'Rabat-Salé-Kénitra',
-    'Kenitra': 'Rabat-Salé-Kénitra',
-    'Marrakech': 'Marrakech-Safi',
-    'Agadir': 'Souss-Massa',
-    'Tanger': 'Tanger-Tétouan-Al Hoceïma',
-    'Tétouan': 'Tanger-Tétouan-Al Hoceïma',
-    'Fès': 'Fès-Meknès',
-    'Meknès': 'Fès-Meknès',
-    'Oujda': "L'Oriental",
-    'Nador': "L'Oriental",
-    'El Jadida': 'Casablanca-Settat'
-}
-
-for r in sorted(set(region_map.values())):
-    ET.SubElement(regions, 'region').text = r
-
-villes_node = ET.SubElement(root_geo, 'villes')
-for v in villes_maroc:
-    ville_node = ET.SubElement(villes_node, 'ville')
-    ET.SubElement(ville_node, 'nom').text = v
-    ET.SubElement(ville_node, 'region').text = region_map.get(v, 'Autre')
-
-ET.ElementTree(root_geo).write(os.path.join(OUTPUT_PATH, 'Referentiel_Geo.xml'),
-                               encoding='utf-8', xml_declaration=True)
-
-# Dim_Motif_Retour.xml
-root_motif = ET.Element('Dim_Motif_Retour')
-for _, row in dim_motif_retour.iterrows():
-    m = ET.SubElement(root_motif, 'Motif')
-    for col in ['ID_Motif', 'Motif', 'Categorie']:
-        child = ET.SubElement(m, col)
-        child.text = "" if pd.isna(row[col]) else str(row[col])
-
-ET.ElementTree(root_motif).write(os.path.join(OUTPUT_PATH, 'Dim_Motif_Retour.xml'),
-                                 encoding='utf-8', xml_declaration=True)
-
-# ---- SQL : script CREATE TABLE (optionnel mais utile)
-print("   🗃️ Export SQL : base_ventes.sql")
-
-def _sql_type(col: str, dtype) -> str:
+def exporter_excel(p: ParametresGeneration, donnees: dict):
+    # openpyxl write-only ; au-delà de 1 048 576 lignes, découpage en feuilles/fichiers
+    # décrit par <fichier>.manifest.json
+    if p.exporte('Dim_Client'):
+        with EcrivainExcel(p.chemin('Dim_Client.xlsx'), 'Dim_Client') as ecr:
+            ecr.ecrire(donnees['Dim_Client'])
+            ecr.ecrire_table('Stats_RFM', donnees['Stats_RFM'])
+
+    if 'Fait_Ventes' in donnees and p.exporte('Fait_Ventes'):
+        fait_ventes = donnees['Fait_Ventes']
+        with EcrivainExcel(p.chemin('Fait_Ventes.xlsx'), 'Fait_Ventes') as ecr:
+            for debut in range(0, len(fait_ventes), p.taille_chunk):
+                ecr.ecrire(fait_ventes.iloc[debut:debut + p.taille_chunk])
+
+    if p.exporte('Objectifs_Mensuels'):
+        with pd.ExcelWriter(p.chemin('Objectifs_Mensuels.xlsx'), engine='openpyxl') as writer:
+            for annee, objectifs in donnees['Objectifs_Mensuels'].groupby('Annee'):
+                objectifs.drop(columns='Annee').to_excel(writer, sheet_name=str(annee), index=False)
+
+def exporter_csv(p: ParametresGeneration, donnees: dict):
+    # En streaming, Fait_Stock / Fait_Retours sont déjà écrits lot par lot.
+    # Par tranches de taille_chunk : les dates du schéma compact ne sont
+    # formatées en texte que tranche par tranche.
+    for nom_table in ['Dim_Temps', 'Dim_Promotion', 'Fait_Stock', 'Fait_Retours']:
+        if nom_table in donnees and p.exporte(nom_table):
+            table = donnees[nom_table]
+            with EcrivainCSV(p.chemin(f'{nom_table}.csv')) as ecr:
+                for debut in range(0, max(len(table), 1), p.taille_chunk):
+                    ecr.ecrire(table.iloc[debut:debut + p.taille_chunk])
+
+def exporter_json(p: ParametresGeneration, donnees: dict):
+    for nom_table in ['Dim_Canal', 'Dim_Livraison']:
+        if p.exporte(nom_table):
+            with open(p.chemin(f'{nom_table}.json'), 'w', encoding='utf-8') as f:
+                json.dump(donnees[nom_table].to_dict(orient="records"), f, ensure_ascii=False, indent=2)
+
+    if 'Fait_Trafic_Web' not in donnees or not p.exporte('Fait_Trafic_Web'):
+        return
+    fait_trafic = donnees['Fait_Trafic_Web']
+    if p.format_trafic == "ndjson":
+        with ecrivain_trafic(p) as ecr:
+            ecr.ecrire(fait_trafic)
+    else:
+        fait_trafic_json = fait_trafic.replace({np.nan: None})
+        payload_trafic = {
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "sessions": fait_trafic_json.to_dict(orient="records")
+        }
+        with open(p.chemin('Fait_Trafic_Web.json'), 'w', encoding='utf-8') as f:
+            json.dump(payload_trafic, f, ensure_ascii=False, indent=2)
+
+def exporter_xml(p: ParametresGeneration, donnees: dict):
+    # Écriture incrémentale (EcrivainXML) : les éléments sont émis lot par lot,
+    # sans construire d'arbre ElementTree en mémoire.
+
+    # Dim_Produit.xml
+    if p.exporte('Dim_Produit'):
+        colonnes_produit = ['ID_Produit', 'SKU', 'Nom_Produit', 'Categorie', 'Sous_Categorie', 'Marque',
+                            'Prix_Unitaire', 'Cout_Achat', 'Poids_Kg', 'Actif']
+        dim_produits = donnees['Dim_Produit']
+        with EcrivainXML(p.chemin('Dim_Produit.xml'), 'Dim_Produit', 'Produit') as ecr:
+            for debut in range(0, len(dim_produits), p.taille_chunk):
+                ecr.ecrire(dim_produits[colonnes_produit].iloc[debut:debut + p.taille_chunk])
+
+    # Referentiel_Geo.xml
+    if p.exporte('Referentiel_Geo'):
+        villes_geo = donnees['Referentiel_Geo']
+        with EcrivainXML(p.chemin('Referentiel_Geo.xml'), 'Referentiel_Geo', 'ville') as ecr:
+            ecr.ouvrir_noeud('regions')
+            for r in sorted(set(villes_geo['region'])):
+                ecr.ecrire_feuille('region', r)
+            ecr.fermer_noeud('regions')
+
+            ecr.ouvrir_noeud('villes')
+            ecr.ecrire(villes_geo)
+            ecr.fermer_noeud('villes')
+
+    # Dim_Motif_Retour.xml
+    if p.exporte('Dim_Motif_Retour'):
+        with EcrivainXML(p.chemin('Dim_Motif_Retour.xml'), 'Dim_Motif_Retour', 'Motif') as ecr:
+            ecr.ecrire(donnees['Dim_Motif_Retour'][['ID_Motif', 'Motif', 'Categorie']])
+
+def exporter_parquet(p: ParametresGeneration, donnees: dict):
+    # En streaming, les faits sont déjà écrits lot par lot ; en incrémental,
+    # seul Fait_Stock.csv est complété
+    for nom_table in TABLES:
+        if nom_table in donnees and nom_table != 'Referentiel_Geo' and p.exporte(nom_table):
+            ecrire_parquet(donnees[nom_table], os.path.join(p.parquet_path, f"{nom_table}.parquet"))
+
+# Longueurs VARCHAR des attributs texte (doublées tant que les données
+# générées n'ont pas 2x de marge) ; les autres colonnes texte : VARCHAR(64)
+LONGUEURS_VARCHAR = {'Genre': 8, 'Code_Client': 16, 'Code_Postal': 16, 'SKU': 16, 'Telephone': 20, 'Code_Promo': 32,
+                     'Email': 128, 'Nom_Complet': 128, 'Nom_Produit': 128, 'Nom_Campagne': 128}
+LONGUEUR_VARCHAR_DEFAUT = 64
+
+# Faits partitionnés par plage d'ID_Date (une partition par année de Dim_Temps)
+PARTITIONS_FAITS = {'Fait_Ventes': 'ID_Date', 'Fait_Trafic_Web': 'ID_Date', 'Fait_Stock': 'ID_Date'}
+
+# Plus grande valeur d'une colonne INT (signée) : au-delà, clés en BIGINT
+INT_MAX = 2**31 - 1
+
+def ids_max_faits(p: ParametresGeneration, dim_produits: pd.DataFrame) -> dict:
+    """Borne haute des clés primaires des faits (et des ID_* qui les référencent) d'après les volumes."""
+    nb_semaines = len(dates_snapshot_stock(p.date_debut, p.date_fin))
+    return {'ID_Vente': p.nb_transactions, 'ID_Retour': p.nb_transactions,
+            'ID_Session': p.nb_sessions_web, 'ID_Stock': nb_semaines * len(dim_produits)}
+
+def _longueur_varchar(col: str, serie: pd.Series) -> int:
+    longueur = LONGUEURS_VARCHAR.get(col, LONGUEUR_VARCHAR_DEFAUT)
+    valeurs = serie.dropna()
+    observee = int(valeurs.astype(str).str.len().max()) if len(valeurs) else 0
+    while longueur < 2 * observee:
+        longueur *= 2
+    return longueur
+
+def _sql_type(col: str, serie: pd.Series, cles_bigint=()) -> str:
+    dtype = serie.dtype
+    if col in cles_bigint:
+        return "BIGINT"
     if col.startswith('ID_'):
         return "INT"
     if "DateTime" in col:
@@ -717,41 +1127,264 @@ def _sql_type(col: str, dtype) -> str:
         return "INT"
     if pd.api.types.is_float_dtype(dtype):
         return "NUMERIC(12,2)"
-    return "TEXT"
-
-def _create_table_sql(table_name: str, df: pd.DataFrame, pk: str | None):
-    cols = [f"  {c} {_sql_type(c, df[c].dtype)}" for c in df.columns]
+    return f"VARCHAR({_longueur_varchar(col, serie)})"
+
+def _partition_sql(colonne: str, dim_temps: pd.DataFrame) -> str:
+    """PARTITION BY RANGE (colonne) : une partition par année de Dim_Temps + une pour la suite."""
+    debuts = dim_temps.groupby('Annee')['ID_Date'].min().sort_index()
+    partitions = [f"  PARTITION p{int(annee)} VALUES LESS THAN ({int(debut)})"
+                  for annee, debut in zip(debuts.index[:-1], debuts.to_numpy()[1:])]
+    if len(debuts):
+        partitions.append(f"  PARTITION p{int(debuts.index[-1])} VALUES LESS THAN MAXVALUE")
+    return f"PARTITION BY RANGE ({colonne}) (\n" + ",\n".join(partitions) + "\n)"
+
+def _create_table_sql(table_name: str, df: pd.DataFrame, pk: str | None,
+                      partition: str | None = None, dim_temps: pd.DataFrame | None = None,
+                      cles_bigint=()):
+    """
+    CREATE TABLE (types déduits des colonnes, VARCHAR dimensionnés sur les
+    données de `df`). partition : colonne de partitionnement par année de
+    `dim_temps` ; MySQL impose qu'elle fasse partie de la clé primaire.
+    cles_bigint : colonnes ID_* dont les valeurs dépassent INT_MAX.
+    """
+    cols = [f"  {c} {_sql_type(c, df[c], cles_bigint)}" for c in df.columns]
     if pk and pk in df.columns:
-        cols.append(f"  PRIMARY KEY ({pk})")
-    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n" + ",\n".join(cols) + "\n);\n"
-
-sql_path = os.path.join(OUTPUT_PATH, 'base_ventes.sql')
-with open(sql_path, 'w', encoding='utf-8') as f:
-    f.write("-- Script SQL auto-généré (projet E-Commerce Power BI)\n")
-    f.write(f"-- Generated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-
-    # Dimensions (structure)
-    f.write(_create_table_sql("Dim_Client", dim_clients.head(0), "ID_Client"))
-    f.write(_create_table_sql("Dim_Produit", dim_produits.head(0), "ID_Produit"))
-    f.write(_create_table_sql("Dim_Temps", dim_temps.head(0), "ID_Date"))
-    f.write(_create_table_sql("Dim_Canal", dim_canal.head(0), "ID_Canal"))
-    f.write(_create_table_sql("Dim_Promotion", dim_promotion.head(0), "ID_Promotion"))
-    f.write(_create_table_sql("Dim_Livraison", dim_livraison.head(0), "ID_Livraison"))
-    f.write(_create_table_sql("Dim_Motif_Retour", dim_motif_retour.head(0), "ID_Motif"))
-
-    # Faits (structure)
-    f.write(_create_table_sql("Fait_Ventes", fait_ventes.head(0), "ID_Vente"))
-    f.write(_create_table_sql("Fait_Retours", fait_retours.head(0), "ID_Retour"))
-    f.write(_create_table_sql("Fait_Trafic_Web", fait_trafic.head(0), "ID_Session"))
-    f.write(_create_table_sql("Fait_Stock", fait_stock.head(0), "ID_Stock"))
-
-    f.write("\n-- NOTE: Inserts non inclus (volumes élevés). Charge via Power Query (Excel/CSV/JSON/XML).\n")
-
-print("\n✅ Export terminé !")
-print("📁 Dossier :", OUTPUT_PATH)
-print("📗 Excel : Dim_Client.xlsx, Fait_Ventes.xlsx, Objectifs_Mensuels.xlsx")
-print("📄 CSV   : Dim_Temps.csv, Dim_Promotion.csv, Fait_Stock.csv, Fait_Retours.csv")
-print("🧾 JSON  : Dim_Canal.json, Dim_Livraison.json, Fait_Trafic_Web.json")
-print("🧩 XML   : Dim_Produit.xml, Referentiel_Geo.xml, Dim_Motif_Retour.xml")
-print("🗃️ SQL   : base_ventes.sql")
-print("\n🎉 Fin du script.")
\ No newline at end of file
+        cles = [pk, partition] if partition else [pk]
+        cols.append(f"  PRIMARY KEY ({', '.join(cles)})")
+    sql = f"CREATE TABLE IF NOT EXISTS {table_name} (\n" + ",\n".join(cols) + "\n)"
+    if partition:
+        sql += "\n" + _partition_sql(partition, dim_temps)
+    return sql + ";\n"
+
+def _create_index_sql(table_name: str, df: pd.DataFrame, pk: str | None) -> str:
+    """Index secondaires : clés étrangères ID_* et colonnes de date."""
+    index = [c for c in df.columns
+             if c != pk and (c.startswith('ID_') or _sql_type(c, df[c].head(0)) in ("DATE", "TIMESTAMP"))]
+    return "".join(f"CREATE INDEX idx_{table_name}_{c} ON {table_name} ({c});\n" for c in index)
+
+def exporter_sql(p: ParametresGeneration, donnees: dict, schemas_faits: dict):
+    dimensions = [("Dim_Client", "ID_Client"), ("Dim_Produit", "ID_Produit"), ("Dim_Temps", "ID_Date"),
+                  ("Dim_Canal", "ID_Canal"), ("Dim_Promotion", "ID_Promotion"),
+                  ("Dim_Livraison", "ID_Livraison"), ("Dim_Motif_Retour", "ID_Motif")]
+    faits = [("Fait_Ventes", "ID_Vente"), ("Fait_Retours", "ID_Retour"),
+             ("Fait_Trafic_Web", "ID_Session"), ("Fait_Stock", "ID_Stock")]
+    tables = [(nom, donnees[nom], pk) for nom, pk in dimensions] + \
+             [(nom, schemas_faits[nom], pk) for nom, pk in faits]
+    # clés des faits (et ID_Vente de Fait_Retours) en BIGINT si le volume dépasse INT
+    cles_bigint = {cle for cle, maximum in ids_max_faits(p, donnees['Dim_Produit']).items()
+                   if maximum > INT_MAX}
+
+    with open(p.chemin('base_ventes.sql'), 'w', encoding='utf-8') as f:
+        f.write("-- Script SQL auto-généré (projet E-Commerce Power BI)\n")
+        f.write(f"-- Generated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write("-- Clés étrangères non déclarées : MySQL refuse les FOREIGN KEY sur les tables\n"
+                "-- partitionnées (Fait_Ventes, Fait_Trafic_Web, Fait_Stock). L'intégrité est\n"
+                "-- contrôlée avant chargement (validation.py) puis après (orphelins, upload_to_sql.py).\n\n")
+
+        # Dimensions puis faits (structure) ; gros faits partitionnés par année
+        for nom, df, pk in tables:
+            f.write(_create_table_sql(nom, df, pk, PARTITIONS_FAITS.get(nom), donnees['Dim_Temps'],
+                                      cles_bigint))
+
+        # Index secondaires : créés par upload_to_sql.py après le chargement en masse
+        f.write("\n-- INDEX (après chargement)\n")
+        for nom, df, pk in tables:
+            f.write(_create_index_sql(nom, df, pk))
+
+        f.write("\n-- NOTE: Inserts non inclus (volumes élevés). Charge via Power Query (Excel/CSV/JSON/XML).\n")
+
+# Exporteurs (hors SQL) et tables qu'ils écrivent : nom d'étape -> (fonction, tables)
+EXPORTEURS = {
+    'Export_Excel': (exporter_excel, ['Dim_Client', 'Stats_RFM', 'Fait_Ventes', 'Objectifs_Mensuels']),
+    'Export_CSV': (exporter_csv, ['Dim_Temps', 'Dim_Promotion', 'Fait_Stock', 'Fait_Retours']),
+    'Export_JSON': (exporter_json, ['Dim_Canal', 'Dim_Livraison', 'Fait_Trafic_Web']),
+    'Export_XML': (exporter_xml, ['Dim_Produit', 'Referentiel_Geo', 'Dim_Motif_Retour']),
+    'Export_Parquet': (exporter_parquet, [t for t in TABLES if t != 'Referentiel_Geo']),
+}
+
+def lignes_exportees(p: ParametresGeneration, donnees: dict, tables) -> int:
+    """Lignes en mémoire écrites par un exporteur (Stats_RFM suit Dim_Client)."""
+    return sum(len(donnees[t]) for t in tables
+               if t in donnees and p.exporte('Dim_Client' if t == 'Stats_RFM' else t))
+
+def fichiers_par_format(p: ParametresGeneration) -> dict:
+    """Fichiers sources des tables sélectionnées, par format (pour le récapitulatif)."""
+    formats = {
+        '📗 Excel': [('Dim_Client', 'Dim_Client.xlsx'),
+                    ('Fait_Ventes', 'Fait_Ventes.xlsx (+ .manifest.json)'),
+                    ('Objectifs_Mensuels', 'Objectifs_Mensuels.xlsx')],
+        '📄 CSV  ': [('Dim_Temps', 'Dim_Temps.csv'), ('Dim_Promotion', 'Dim_Promotion.csv'),
+                    ('Fait_Stock', 'Fait_Stock.csv'), ('Fait_Retours', 'Fait_Retours.csv')],
+        '🧾 JSON ': [('Dim_Canal', 'Dim_Canal.json'), ('Dim_Livraison', 'Dim_Livraison.json'),
+                    ('Fait_Trafic_Web', p.fichier_trafic)],
+        '🧩 XML  ': [('Dim_Produit', 'Dim_Produit.xml'), ('Referentiel_Geo', 'Referentiel_Geo.xml'),
+                    ('Dim_Motif_Retour', 'Dim_Motif_Retour.xml')],
+    }
+    return {fmt: [fichier for table, fichier in fichiers if p.exporte(table)]
+            for fmt, fichiers in formats.items()}
+
+def exporter(p: ParametresGeneration, donnees: dict, schemas_faits: dict):
+    print("\n💾 Export multi-sources...")
+    fichiers = fichiers_par_format(p)
+
+    def exporter_etape(nom_etape):
+        fonction, tables = EXPORTEURS[nom_etape]
+        # octets : fichiers créés ou modifiés dans le dossier de sortie pendant l'étape
+        with etape(nom_etape, lignes=lignes_exportees(p, donnees, tables), dossier=p.output_path):
+            fonction(p, donnees)
+
+    print(f"   📗 Export Excel : {', '.join(fichiers['📗 Excel']) or '-'}")
+    exporter_etape('Export_Excel')
+
+    print(f"   📄 Export CSV : {', '.join(fichiers['📄 CSV  ']) or '-'}")
+    exporter_etape('Export_CSV')
+
+    print(f"   🧾 Export JSON : {', '.join(fichiers['🧾 JSON ']) or '-'}")
+    exporter_etape('Export_JSON')
+
+    print(f"   🧩 Export XML : {', '.join(fichiers['🧩 XML  ']) or '-'}")
+    exporter_etape('Export_XML')
+
+    if p.export_parquet:
+        print("   🧱 Export Parquet : Dim_* + Fait_* (zstd, schémas typés)")
+        exporter_etape('Export_Parquet')
+
+    print("   🗃️ Export SQL : base_ventes.sql")
+    with etape('Export_SQL') as mesure:
+        exporter_sql(p, donnees, schemas_faits)
+        mesure.ajouter_fichiers(p.chemin('base_ventes.sql'))
+
+    print("\n✅ Export terminé !")
+    print("📁 Dossier :", p.output_path)
+    for fmt, noms in fichiers.items():
+        if noms:
+            print(f"{fmt} : {', '.join(noms)}")
+    print("🗃️ SQL   : base_ventes.sql")
+    if p.export_parquet:
+        print("🧱 Parquet : Parquet/<Table>.parquet (Dim_* + Fait_*)")
+
+def executer(p: ParametresGeneration, instrumentation: Instrumentation | None = None) -> dict:
+    """
+    Exécution complète : dimensions, faits, segmentation RFM, exports.
+    Retourne les tables gardées en mémoire (les faits écrits en flux n'y sont pas).
+
+    Chaque étape est mesurée par `instrumentation` (une Instrumentation
+    'gen_data' est créée sinon) : rapport via instrumentation.rapport().
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation('gen_data')
+    instrumentation.parametres = asdict(p)
+    with activer(instrumentation):
+        return _executer(p)
+
+def _executer(p: ParametresGeneration) -> dict:
+    print("🚀 Démarrage génération des données E-Commerce (version multi-formats)...")
+    os.makedirs(p.output_path, exist_ok=True)
+    if p.export_parquet:
+        os.makedirs(p.parquet_path, exist_ok=True)
+
+    if p.facteur_echelle is not None:
+        nb_semaines = len(dates_snapshot_stock(p.date_debut, p.date_fin))
+        print(f"📏 SF{p.facteur_echelle:g} : {p.nb_clients} clients, {p.nb_produits} produits, "
+              f"{p.nb_transactions} ventes (~{int(p.nb_transactions * TAUX_RETOUR)} retours), "
+              f"{p.nb_sessions_web} sessions, {nb_semaines * p.nb_produits} lignes de stock")
+
+    rng = initialiser_graines(p.seed)
+    donnees = generer_dimensions(p)
+    # Index Date <-> ID_Date réutilisé par Fait_Retours et Fait_Stock
+    index_dates = IndexDates(donnees['Dim_Temps'])
+
+    schemas_faits = generer_faits(p, rng, donnees, index_dates)
+    with etape('Objectifs_Mensuels') as mesure:
+        donnees['Objectifs_Mensuels'] = generer_objectifs_mensuels()
+        mesure.lignes = len(donnees['Objectifs_Mensuels'])
+    if p.schema_compact:
+        print(f"\n🗜️ Schéma compact : {sum(memoire_mo(df) for df in donnees.values()):.1f} Mo "
+              f"de tables en mémoire")
+
+    exporter(p, donnees, schemas_faits)
+    print("\n🎉 Fin du script.")
+    return donnees
+
+# ============================================
+# LIGNE DE COMMANDE
+# ============================================
+
+def _date(texte: str) -> datetime:
+    return datetime.strptime(texte, '%Y-%m-%d')
+
+def construire_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Génération des sources E-Commerce (Dim_* / Fait_*).")
+    defaut = ParametresGeneration()
+
+    tailles = parser.add_argument_group("tailles et période",
+                                        "volumes par défaut : ceux du facteur d'échelle (SF1 sans --sf)")
+    tailles.add_argument('--sf', type=float, dest='facteur_echelle',
+                         help="facteur d'échelle : SF1 = 5000 clients, 300 produits, 50000 ventes, "
+                              "100000 sessions ; SF10 = x10, etc.")
+    tailles.add_argument('--clients', type=int, dest='nb_clients')
+    tailles.add_argument('--produits', type=int, dest='nb_produits')
+    tailles.add_argument('--transactions', type=int, dest='nb_transactions')
+    tailles.add_argument('--sessions', type=int, dest='nb_sessions_web')
+    tailles.add_argument('--date-debut', type=_date, default=defaut.date_debut, help="AAAA-MM-JJ")
+    tailles.add_argument('--date-fin', type=_date, default=defaut.date_fin, help="AAAA-MM-JJ")
+    tailles.add_argument('--seed', type=int, default=defaut.seed)
+
+    sorties = parser.add_argument_group("sorties")
+    sorties.add_argument('--sortie', default=defaut.output_path, dest='output_path',
+                         help="dossier de sortie (défaut : %(default)s)")
+    sorties.add_argument('--tables', nargs='+', choices=TABLES, default=defaut.tables, metavar='TABLE',
+                         help="tables à exporter (défaut : toutes) : " + ", ".join(TABLES))
+    sorties.add_argument('--format-trafic', choices=['payload', 'ndjson'], default=defaut.format_trafic)
+    sorties.add_argument('--gzip', action='store_true', dest='compression_ndjson',
+                         help="Fait_Trafic_Web.ndjson.gz (avec --format-trafic ndjson)")
+    sorties.add_argument('--parquet', action='store_true', dest='export_parquet',
+                         help="export Parquet en plus (nécessite pyarrow)")
+
+    modes = parser.add_argument_group("modes d'exécution")
+    modes.add_argument('--mode', choices=['vectorise', 'iteratif'], default=defaut.mode_generation,
+                       dest='mode_generation',
+                       help="moteur de Fait_Ventes / Fait_Trafic_Web (défaut : %(default)s). "
+                            "Le moteur vectorisé ne fait pas les mêmes tirages que la version "
+                            "d'origine : à seed égal, le jeu diffère. --mode iteratif reprend "
+                            "l'algorithme ligne à ligne d'origine (lent)")
+    modes.add_argument('--streaming', action='store_true', help="faits générés et écrits par lots")
+    modes.add_argument('--taille-chunk', type=int, default=defaut.taille_chunk)
+    modes.add_argument('--sharde', action='store_true', help="faits générés par shards sur --workers processus")
+    modes.add_argument('--workers', type=int, default=defaut.nb_workers, dest='nb_workers')
+    modes.add_argument('--compact', action='store_true', dest='schema_compact',
+                       help="schéma compact en mémoire (catégories, datetime64, entiers étroits)")
+    modes.add_argument('--regles-rfm', choices=sorted(REGLES_RFM), default=defaut.regles_rfm)
+    modes.add_argument('--stock-incremental', action='store_true',
+                       help="complète Fait_Stock.csv avec les seules semaines manquantes")
+
+    mesures = parser.add_argument_group("instrumentation")
+    mesures.add_argument('--rapport', metavar='FICHIER.json',
+                         help="rapport d'exécution : durée, CPU, lignes, octets, pic mémoire par étape")
+    mesures.add_argument('--profil', metavar='DOSSIER',
+                         help="profil cProfile de chaque étape (<DOSSIER>/<étape>.prof)")
+    mesures.add_argument('--suivi-memoire', action='store_true',
+                         help="pic mémoire Python par étape (tracemalloc, ralentit l'exécution)")
+    return parser
+
+def main(argv=None):
+    arguments = vars(construire_parser().parse_args(argv))
+    rapport = arguments.pop('rapport')
+    instrumentation = Instrumentation('gen_data', dossier_profil=arguments.pop('profil'),
+                                      suivi_memoire=arguments.pop('suivi_memoire'))
+    # Volumes non précisés : ceux du facteur d'échelle (SF1 par défaut)
+    facteur = arguments['facteur_echelle']
+    for cle, volume in volumes_echelle(1 if facteur is None else facteur).items():
+        if arguments[cle] is None:
+            arguments[cle] = volume
+
+    donnees = executer(ParametresGeneration(**arguments), instrumentation)
+    instrumentation.afficher_resume()
+    if rapport:
+        instrumentation.ecrire_rapport(rapport)
+        print(f"📝 Rapport d'exécution : {rapport}")
+    return donnees
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Instrumentation légère des étapes du pipeline génération -> chargement.
+
+Chaque étape mesurée enregistre : durée (murale et CPU), lignes, octets
+écrits ou lus, pic mémoire (RSS du processus ; tracemalloc en option), et
+éventuellement un profil cProfile (<dossier_profil>/<étape>.prof).
+cProfile et tracemalloc ne sont importés que si l'option correspondante
+est demandée.
+
+    instr = Instrumentation('gen_data', dossier_profil='profils')
+    with activer(instr):
+        with etape('Dim_Client') as mesure:
+            dim_clients = generer_dim_clients(...)
+            mesure.lignes = len(dim_clients)
+    instr.ecrire_rapport('rapport_gen_data.json')
+
+Sans instrumentation active, etape() et @instrumente ne mesurent rien :
+le coût est négligeable pour les appels depuis un test ou un benchmark.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows : pas de ru_maxrss
+    resource = None
+
+
+def rss_pic_mo() -> float | None:
+    """Pic de mémoire résidente du processus (Mo) ; None si indisponible."""
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Ko sous Linux, octets sous macOS
+    return round(pic / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def environnement() -> dict:
+    import numpy as np
+    import pandas as pd
+
+    return {
+        'python': platform.python_version(),
+        'plateforme': platform.platform(),
+        'processeurs': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__
+    }
+
+def _tailles_fichiers(dossier: str) -> dict:
+    """{chemin: (taille, mtime)} des fichiers du dossier (récursif)."""
+    tailles = {}
+    for racine, _, fichiers in os.walk(dossier):
+        for nom in fichiers:
+            chemin = os.path.join(racine, nom)
+            try:
+                infos = os.stat(chemin)
+            except OSError:
+                continue
+            tailles[chemin] = (infos.st_size, infos.st_mtime)
+    return tailles
+
+
+class Mesure:
+    """Mesure d'une étape ; lignes / octets peuvent être renseignés pendant l'étape."""
+
+    def __init__(self, nom: str, lignes: int | None = None, octets: int | None = None):
+        self.nom = nom
+        self.lignes = lignes
+        self.octets = octets
+        self.fichiers = []
+        self.dossiers = []
+
+    def ajouter_fichiers(self, *chemins: str) -> None:
+        """Fichiers lus ou écrits : leur taille est comptée dans `octets`."""
+        self.fichiers.extend(chemins)
+
+    def surveiller_dossier(self, dossier: str) -> None:
+        """Compte dans `octets` les fichiers du dossier créés ou modifiés pendant l'étape."""
+        self.dossiers.append((dossier, _tailles_fichiers(dossier) if os.path.isdir(dossier) else {}))
+
+    def _octets_fichiers(self) -> int | None:
+        if not self.fichiers and not self.dossiers:
+            return None
+        total = sum(os.path.getsize(f) for f in self.fichiers if os.path.exists(f))
+        for dossier, avant in self.dossiers:
+            if not os.path.isdir(dossier):
+                continue
+            for chemin, apres in _tailles_fichiers(dossier).items():
+                if avant.get(chemin) != apres:
+                    total += apres[0]
+        return total
+
+
+class Instrumentation:
+    """Enregistre les étapes d'une exécution et produit le rapport JSON."""
+
+    def __init__(self, script: str, dossier_profil: str | None = None, suivi_memoire: bool = False):
+        self.script = script
+        self.dossier_profil = dossier_profil
+        self.suivi_memoire = suivi_memoire
+        self.parametres = {}
+        self.etapes = []
+        self._verrou = threading.Lock()
+        self._local = threading.local()
+        self._debut = datetime.now()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        if dossier_profil:
+            os.makedirs(dossier_profil, exist_ok=True)
+        if suivi_memoire:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextlib.contextmanager
+    def etape(self, nom: str, lignes: int | None = None, dossier: str | None = None):
+        """
+        Mesure le bloc. `dossier` : les fichiers qui y sont créés ou modifiés
+        comptent dans les octets de l'étape. Les étapes imbriquées sont
+        enregistrées, mais seule l'étape englobante est profilée (un seul
+        profileur actif par thread).
+        """
+        mesure = Mesure(nom, lignes)
+        if dossier:
+            mesure.surveiller_dossier(dossier)
+
+        profondeur = getattr(self._local, 'profondeur', 0)
+        self._local.profondeur = profondeur + 1
+        profileur = None
+        if self.dossier_profil and profondeur == 0:
+            import cProfile
+            profileur = cProfile.Profile()
+        if self.suivi_memoire and profondeur == 0:
+            import tracemalloc
+            tracemalloc.reset_peak()
+
+        rss_avant = rss_pic_mo()
+        debut = time.perf_counter()
+        cpu_debut = time.process_time()
+        erreur = None
+        if profileur:
+            try:
+                profileur.enable()
+            except ValueError:
+                # Python 3.12+ : un seul profileur actif à la fois (étapes en threads)
+                profileur = None
+        try:
+            yield mesure
+        except BaseException as exc:
+            erreur = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            if profileur:
+                profileur.disable()
+            duree = time.perf_counter() - debut
+            self._local.profondeur = profondeur
+            self._enregistrer(mesure, debut, duree, time.process_time() - cpu_debut,
+                              rss_avant, profileur, erreur)
+
+    def _enregistrer(self, mesure, debut, duree, cpu, rss_avant, profileur, erreur) -> None:
+        octets = mesure.octets if mesure.octets is not None else mesure._octets_fichiers()
+        resultat = {
+            'nom': mesure.nom,
+            'debut_s': round(debut - self._t0, 4),
+            'duree_s': round(duree, 4),
+            'cpu_s': round(cpu, 4),
+            'lignes': mesure.lignes,
+            'lignes_par_sec': round(mesure.lignes / duree, 1) if mesure.lignes and duree > 0 else None,
+            'octets': octets,
+            'mo_par_sec': round(octets / duree / 1e6, 2) if octets and duree > 0 else None,
+            'rss_pic_avant_mo': rss_avant,
+            'rss_pic_mo': rss_pic_mo(),
+            'thread': threading.current_thread().name
+        }
+        if self.suivi_memoire:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                resultat['memoire_pic_mo'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        if profileur:
+            nom_fichier = re.sub(r'[^\w.-]+', '_', mesure.nom) + '.prof'
+            resultat['profil'] = os.path.join(self.dossier_profil, nom_fichier)
+            profileur.dump_stats(resultat['profil'])
+        if erreur:
+            resultat['erreur'] = erreur
+        with self._verrou:
+            self.etapes.append(resultat)
+
+    def rapport(self) -> dict:
+        return {
+            'script': self.script,
+            'debut': self._debut.strftime("%Y-%m-%d %H:%M:%S"),
+            'duree_s': round(time.perf_counter() - self._t0, 4),
+            'cpu_s': round(time.process_time() - self._cpu0, 4),
+            'rss_pic_mo': rss_pic_mo(),
+            'environnement': environnement(),
+            'parametres': self.parametres,
+            'etapes': self.etapes
+        }
+
+    def ecrire_rapport(self, chemin: str) -> None:
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(self.rapport(), f, ensure_ascii=False, indent=2, default=str)
+
+    def afficher_resume(self) -> None:
+        print(f"\n⏱️ Étapes ({self.script}) :")
+        for e in self.etapes:
+            lignes = f"{e['lignes']:>11,} lignes" if e['lignes'] is not None else " " * 18
+            debit = f"{e['lignes_par_sec']:>13,.0f} l/s" if e['lignes_par_sec'] else " " * 17
+            octets = f"{e['octets'] / 1e6:>9.1f} Mo" if e['octets'] else " " * 12
+            print(f"   {e['nom']:<28} {e['duree_s']:>9.3f} s {lignes} {debit} {octets}"
+                  f"  RSS {e['rss_pic_mo']} Mo")
+
+
+# ============================================
+# INSTRUMENTATION ACTIVE (une par processus)
+# ============================================
+
+_ACTIVE = None
+
+@contextlib.contextmanager
+def activer(instrumentation: Instrumentation):
+    """Rend `instrumentation` active pour etape() et @instrumente le temps du bloc."""
+    global _ACTIVE
+    precedente, _ACTIVE = _ACTIVE, instrumentation
+    try:
+        yield instrumentation
+    finally:
+        _ACTIVE = precedente
+
+def instrumentation_active() -> Instrumentation | None:
+    return _ACTIVE
+
+def etape(nom: str, lignes: int | None = None, dossier: str | None = None):
+    """etape() de l'instrumentation active ; sinon une Mesure non enregistrée."""
+    if _ACTIVE is None:
+        return contextlib.nullcontext(Mesure(nom, lignes))
+    return _ACTIVE.etape(nom, lignes, dossier)
+
+def instrumente(nom: str | None = None, lignes=None, octets=None, cible=None):
+    """
+    Décorateur : chaque appel de la fonction devient une étape.
+    lignes / octets : fonctions (resultat, arguments) -> int, où `arguments`
+    est le dict des arguments liés (ex. lambda r, a: len(a['df'])).
+    cible : fonction (arguments) -> str, ajoutée au nom (ex. upload_df[Dim_Client]).
+    """
+    def decorateur(fonction):
+        signature = inspect.signature(fonction)
+        nom_etape = nom or fonction.__name__
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if _ACTIVE is None:
+                return fonction(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            arguments = arguments.arguments
+            libelle = f"{nom_etape}[{cible(arguments)}]" if cible else nom_etape
+            with _ACTIVE.etape(libelle) as mesure:
+                resultat = fonction(*args, **kwargs)
+                if lignes:
+                    mesure.lignes = lignes(resultat, arguments)
+                if octets:
+                    mesure.octets = octets(resultat, arguments)
+            return resultat
+        return enveloppe
+    return decorateur
@@ -0,0 +1,209 @@
+"""
+Lecteurs par lots des fichiers sources (pour le chargement et les benchmarks).
+
+Chaque lecteur est un générateur de DataFrames de taille bornée :
+le fichier n'est jamais chargé en entier en mémoire.
+"""
+
+import json
+import os
+
+import pandas as pd
+
+TAILLE_LOT_LECTURE = 100_000
+
+
+def _typer_ids(lot: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes ID_* en entiers nullables (un NULL JSON ne doit pas produire un float)."""
+    for col in lot.columns:
+        if col.startswith('ID_'):
+            lot[col] = lot[col].astype('Int64')
+    return lot
+
+
+# ============================================
+# CSV (séparateur ;)
+# ============================================
+
+def derniere_ligne_csv(chemin: str, sep: str = ';') -> dict | None:
+    """
+    En-tête + dernière ligne d'un CSV, sans lire le fichier en entier
+    (lecture à rebours depuis la fin). None si le fichier est absent ou vide.
+    Sert au mode incrémental de Fait_Stock (dernier snapshot écrit).
+    """
+    if not os.path.exists(chemin):
+        return None
+
+    with open(chemin, 'rb') as f:
+        entete = f.readline().decode('utf-8-sig').rstrip('\r\n')
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        fin = b''
+        while position > 0 and fin.count(b'\n') < 2:
+            pas = min(4096, position)
+            position -= pas
+            f.seek(position)
+            fin = f.read(pas) + fin
+
+    lignes = [l for l in fin.decode('utf-8-sig').splitlines() if l.strip()]
+    if not lignes or lignes[-1] == entete:
+        return None
+    return dict(zip(entete.split(sep), lignes[-1].split(sep)))
+
+
+def lire_csv_par_lots(chemin: str, sep: str = ';', taille_lot: int = TAILLE_LOT_LECTURE):
+    """Lit un CSV de gen_data.py (';', utf-8-sig) par lots de `taille_lot` lignes."""
+    with pd.read_csv(chemin, sep=sep, encoding='utf-8-sig', chunksize=taille_lot) as lecteur:
+        for lot in lecteur:
+            yield _typer_ids(lot)
+
+
+# ============================================
+# JSON (liste d'enregistrements ou payload {"<cle>": [...]})
+# ============================================
+
+def lire_json_par_lots(chemin: str, cle: str | None = None, taille_lot: int = TAILLE_LOT_LECTURE):
+    """
+    Lit un JSON de gen_data.py : liste d'enregistrements (Dim_Canal.json) ou
+    payload dont la liste est sous `cle` (Fait_Trafic_Web.json : "sessions").
+    Le document est chargé en entier (format non découpable) ; pour les gros
+    volumes, préférer le NDJSON (lire_ndjson_par_lots).
+    """
+    with open(chemin, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    enregistrements = document[cle] if cle else document
+    del document
+    for debut in range(0, len(enregistrements), taille_lot):
+        yield _typer_ids(pd.DataFrame.from_records(enregistrements[debut:debut + taille_lot]))
+
+
+# ============================================
+# NDJSON (ex. Fait_Trafic_Web.ndjson / .ndjson.gz)
+# ============================================
+
+def lire_ndjson_par_lots(chemin: str, taille_lot: int = TAILLE_LOT_LECTURE):
+    """
+    Lit un fichier NDJSON (gzip détecté par l'extension) par lots
+    de `taille_lot` enregistrements.
+    """
+    with pd.read_json(chemin, lines=True, chunksize=taille_lot,
+                      compression='infer', dtype=False) as lecteur:
+        for lot in lecteur:
+            yield _typer_ids(lot)
+
+
+# ============================================
+# XML (iterparse, mémoire constante)
+# ============================================
+
+def _convertir_colonnes(lot: pd.DataFrame) -> pd.DataFrame:
+    """Texte XML -> nombres quand toute la colonne est numérique, "" -> NULL."""
+    lot = lot.replace({'': None})
+    for col in lot.columns:
+        try:
+            lot[col] = pd.to_numeric(lot[col])
+        except (ValueError, TypeError):
+            pass
+    return _typer_ids(lot)
+
+def lire_xml_par_lots(chemin: str, element: str, taille_lot: int = TAILLE_LOT_LECTURE):
+    """
+    Lit les enregistrements <element><col>valeur</col>...</element> d'un XML
+    par lots de `taille_lot` lignes, avec ET.iterparse.
+
+    Chaque élément traité est détaché de son parent : l'arbre ne grossit pas,
+    la mémoire reste constante quelle que soit la taille du fichier
+    (ex. Dim_Produit.xml avec un catalogue d'un million de SKU).
+    """
+    import xml.etree.ElementTree as ET
+
+    parents = []
+    lignes = []
+    for evenement, noeud in ET.iterparse(chemin, events=('start', 'end')):
+        if evenement == 'start':
+            parents.append(noeud)
+            continue
+
+        parents.pop()
+        # enregistrements = enfants directs de la racine (<Motif> contient aussi une colonne Motif)
+        if noeud.tag != element or len(parents) != 1:
+            continue
+
+        lignes.append({enfant.tag: (enfant.text or '') for enfant in noeud})
+        if parents:
+            parents[-1].remove(noeud)
+        noeud.clear()
+
+        if len(lignes) >= taille_lot:
+            yield _convertir_colonnes(pd.DataFrame(lignes))
+            lignes = []
+
+    if lignes:
+        yield _convertir_colonnes(pd.DataFrame(lignes))
+
+
+# ============================================
+# EXCEL (shards décrits par <table>.manifest.json)
+# ============================================
+
+def _typer_lot_excel(lot: pd.DataFrame, types: dict | None = None) -> pd.DataFrame:
+    """
+    Colonnes numériques au type du schéma cible (`types`, {colonne: dtype},
+    ex. "Int64" pour un INT, "float64" pour un NUMERIC) : même dtype pour
+    tous les lots d'une feuille, où que tombent les cellules vides (NULL).
+    Sans type connu, seules les ID_* sont typées (Int64).
+    """
+    for col, dtype in (types or {}).items():
+        if col in lot.columns:
+            lot[col] = pd.to_numeric(lot[col]).astype(dtype)
+    return _typer_ids(lot)
+
+def lire_excel_par_lots(chemin: str, feuille: str, taille_lot: int = TAILLE_LOT_LECTURE,
+                        types: dict | None = None):
+    """
+    Lit une feuille Excel (1re ligne = en-tête) par lots de `taille_lot`
+    lignes, avec openpyxl en lecture seule : les lignes sont lues au fil
+    du XML de la feuille, la mémoire reste bornée par le lot quelle que
+    soit la taille du classeur (ex. Fait_Ventes.xlsx). Les textes restent
+    des textes (Telephone "+212..." n'est pas converti en nombre).
+    types : dtype des colonnes numériques d'après le schéma cible (_typer_lot_excel).
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(chemin, read_only=True, data_only=True)
+    try:
+        lignes_feuille = wb[feuille].iter_rows(values_only=True)
+        entete = next(lignes_feuille, None)
+        if entete is None:
+            return
+        entete = [col for col in entete if col is not None]
+
+        lignes = []
+        for ligne in lignes_feuille:
+            lignes.append(ligne[:len(entete)])
+            if len(lignes) >= taille_lot:
+                yield _typer_lot_excel(pd.DataFrame.from_records(lignes, columns=entete), types)
+                lignes = []
+        if lignes:
+            yield _typer_lot_excel(pd.DataFrame.from_records(lignes, columns=entete), types)
+    finally:
+        wb.close()
+
+
+def shards_excel(chemin_xlsx: str, table: str) -> list[tuple[str, str]]:
+    """
+    Liste des (fichier, feuille) qui contiennent `table`.
+
+    Si gen_data.py a découpé la table (limite de 1 048 576 lignes par
+    feuille), le manifeste <base>.manifest.json donne tous les shards ;
+    sinon, la table est dans une seule feuille du fichier.
+    """
+    manifeste = os.path.splitext(chemin_xlsx)[0] + '.manifest.json'
+    if not os.path.exists(manifeste):
+        return [(chemin_xlsx, table)]
+
+    with open(manifeste, 'r', encoding='utf-8') as f:
+        contenu = json.load(f)
+    dossier = os.path.dirname(chemin_xlsx)
+    return [(os.path.join(dossier, shard['fichier']), shard['feuille'])
+            for shard in contenu['shards'] if shard['table'] == table]
@@ -0,0 +1,550 @@
+"""
+Moteur de génération vectorisé (NumPy) pour les tables de faits.
+
+Les générateurs historiques de gen_data.py tirent une ligne à la fois en Python
+(dim_temps.sample(1), dim_produits.iloc[...], filtre sur dim_promotion...).
+Ici, toutes les colonnes d'un lot sont tirées en une seule passe avec un
+numpy.random.Generator, puis les montants sont calculés par expressions
+vectorielles.
+
+Les distributions restent celles de la version itérative :
+- clients 80/20 (80% des ventes sur les 20% premiers clients)
+- poids de saison (Black Friday x2.5, Ramadan x1.4, ...)
+- poids horaires (pics 18h-19h)
+- mix de quantités par canal, promotion selon la saison, livraison selon le canal
+
+Avec compact=True, les générateurs produisent le schéma compact
+(TYPES_COMPACTS) : dates en datetime64, clés en entiers étroits ; le
+formatage texte des dates n'a lieu qu'à l'export (exports.py).
+
+Ce module n'a aucun effet de bord à l'import : il peut être utilisé depuis
+gen_data.py, un test ou un benchmark.
+"""
+
+import numpy as np
+import pandas as pd
+
+# ============================================
+# PARAMÈTRES DES DISTRIBUTIONS
+# ============================================
+
+POIDS_SAISON = {
+    'Normal': 1.0,
+    'Soldes Hiver': 1.3,
+    'Soldes Été': 1.2,
+    'Ramadan': 1.4,
+    'Black Friday': 2.5
+}
+
+# Poids horaires (normalisés une seule fois)
+POIDS_HORAIRES = np.array([
+    0.02, 0.01, 0.01, 0.01, 0.01, 0.02,  # 00–05
+    0.03, 0.04, 0.05, 0.06, 0.06, 0.06,  # 06–11
+    0.06, 0.06, 0.06, 0.06, 0.06, 0.06,  # 12–17
+    0.07, 0.07, 0.06, 0.05, 0.04, 0.03   # 18–23
+])
+POIDS_HORAIRES = POIDS_HORAIRES / POIDS_HORAIRES.sum()
+
+CANAUX = np.array([1, 2, 3])
+CANAL_PROBA = [0.6, 0.3, 0.1]
+
+# Quantités par canal : Web (1), Mobile (2) = toujours 1, Magasin (3)
+QUANTITES_WEB = ([1, 2, 3], [0.7, 0.2, 0.1])
+QUANTITES_MAGASIN = ([1, 2, 3, 4], [0.5, 0.3, 0.15, 0.05])
+
+# Promotion imposée par la saison (sinon BIENVENUE10 à 10%, ou "Sans promotion")
+PROMO_PAR_SAISON = {
+    'Black Friday': 2,
+    'Soldes Hiver': 3,
+    'Soldes Été': 3,
+    'Ramadan': 4
+}
+ID_PROMO_BIENVENUE = 1
+ID_PROMO_AUCUNE = 5
+PROBA_BIENVENUE = 0.1
+
+LIVRAISONS = np.array([1, 2, 3])
+LIVRAISON_PROBA = [0.7, 0.2, 0.1]
+
+PART_CLIENTS_FIDELES = 0.2
+PROBA_CLIENT_FIDELE = 0.8
+
+TAUX_TVA = 1.20
+
+# Fait_Trafic_Web : proportions du tunnel utilisées par le dashboard conversion
+PROBA_SESSION_IDENTIFIEE = 0.5
+PROBA_ACHAT = 0.5
+PROBA_ABANDON_PANIER = 0.3   # parmi les sessions sans achat
+PAGES_VUES_LAMBDA = 3
+DUREE_SESSION_MOYENNE_SEC = 180
+
+# Fait_Retours : ~5% des ventes, retour entre 1 et 14 jours après la vente
+TAUX_RETOUR = 0.05
+DELAI_RETOUR_MAX_JOURS = 14
+NB_MOTIFS_RETOUR = 7
+
+# Fait_Stock : snapshot hebdomadaire par produit
+QTE_STOCK_MAX = 500
+QTE_RESERVEE_MAX = 50
+
+# Taille de lot par défaut : borne la mémoire quel que soit le volume total
+TAILLE_LOT = 1_000_000
+
+COLONNES_VENTES = [
+    'ID_Vente', 'ID_Client', 'ID_Produit', 'ID_Date', 'Date_Vente', 'Heure_Vente',
+    'DateTime_Vente', 'ID_Canal', 'ID_Promotion', 'ID_Livraison', 'Quantite',
+    'Montant_HT', 'Montant_TTC', 'Cout_Produit', 'Marge', 'Remise_Appliquee'
+]
+
+
+# ============================================
+# UTILITAIRES
+# ============================================
+
+def _table_par_id(ids, valeurs, defaut=0.0) -> np.ndarray:
+    """
+    Construit un tableau de correspondance indexé directement par l'ID
+    (ID -> valeur), pour remplacer les filtres booléens par ligne.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    table = np.full(int(ids.max()) + 1, defaut, dtype=float)
+    table[ids] = np.asarray(valeurs, dtype=float)
+    return table
+
+def _tirage_par_masque(rng: np.random.Generator, masque: np.ndarray,
+                       valeurs, poids, sortie: np.ndarray) -> None:
+    """Tire `valeurs` selon `poids` uniquement pour les lignes du masque."""
+    n = int(masque.sum())
+    if n:
+        sortie[masque] = rng.choice(valeurs, size=n, p=poids)
+
+def iter_lots(nb_total: int, taille_lot: int = TAILLE_LOT):
+    """Découpe `nb_total` lignes en lots : yield (id_debut, nb_lignes)."""
+    id_debut = 1
+    while id_debut <= nb_total:
+        n = min(taille_lot, nb_total - id_debut + 1)
+        yield id_debut, n
+        id_debut += n
+
+class IndexDates:
+    """
+    Index réutilisable Date <-> ID_Date sur Dim_Temps, sans scan ni jointure.
+
+    - date -> ID_Date : tableau indexé par le décalage en jours depuis le
+      premier jour de Dim_Temps (DATE_DEBUT) ;
+    - ID_Date -> date : tableau indexé par ID_Date.
+    Les deux sens sont des accès tableau O(1) vectorisés.
+    """
+
+    def __init__(self, dim_temps: pd.DataFrame):
+        jours = dim_temps['Date_Complete'].to_numpy().astype('datetime64[D]')
+        ids = dim_temps['ID_Date'].to_numpy(dtype=np.int64)
+
+        self.premier_jour = jours.min()
+        decalages = (jours - self.premier_jour).astype(np.int64)
+        self._id_par_decalage = np.zeros(int(decalages.max()) + 1, dtype=np.int64)
+        self._id_par_decalage[decalages] = ids
+
+        self._jour_par_id = np.full(int(ids.max()) + 1, np.datetime64('NaT'), dtype='datetime64[D]')
+        self._jour_par_id[ids] = jours
+
+    def ids(self, dates) -> np.ndarray:
+        """ID_Date des dates données ; 0 si la date est hors de Dim_Temps."""
+        decalages = (np.asarray(dates, dtype='datetime64[D]') - self.premier_jour).astype(np.int64)
+        dans = (decalages >= 0) & (decalages < len(self._id_par_decalage))
+        ids = np.zeros(len(decalages), dtype=np.int64)
+        ids[dans] = self._id_par_decalage[decalages[dans]]
+        return ids
+
+    def jours(self, id_dates) -> np.ndarray:
+        """Dates (datetime64[D]) correspondant aux ID_Date donnés."""
+        return self._jour_par_id[np.asarray(id_dates, dtype=np.int64)]
+
+def formater_dates(dates: np.ndarray) -> np.ndarray:
+    """datetime64 -> 'YYYY-MM-DD' (vectorisé)."""
+    return np.datetime_as_string(dates.astype('datetime64[D]'), unit='D')
+
+def formater_datetimes(dts: np.ndarray) -> np.ndarray:
+    """datetime64 -> 'YYYY-MM-DD HH:MM:SS' (vectorisé)."""
+    txt = np.datetime_as_string(dts.astype('datetime64[s]'), unit='s')
+    return np.char.replace(txt, 'T', ' ')
+
+
+# ============================================
+# SCHÉMA COMPACT
+# ============================================
+
+# Types en mémoire du schéma compact : texte à faible cardinalité en
+# catégories, dates en datetime64 (texte produit à l'export seulement),
+# clés étrangères et petits compteurs en entiers étroits, NULL en entiers
+# nullables. Les clés primaires des faits restent en int64 (> 2^31 aux gros
+# volumes) et les montants en float64 (arrondis au centime).
+TYPES_COMPACTS = {
+    'Dim_Temps': {
+        'ID_Date': 'int32', 'Annee': 'int16', 'Trimestre': 'int8', 'Mois': 'int8',
+        'Mois_Nom': 'category', 'Semaine': 'int8', 'Jour': 'int8', 'Jour_Semaine': 'category',
+        'Est_Weekend': 'int8', 'Est_Ferie': 'int8', 'Saison_Commerciale': 'category'
+    },
+    'Dim_Client': {
+        'ID_Client': 'int32', 'Date_Inscription': 'datetime64[s]', 'Ville': 'category',
+        'Code_Postal': 'category', 'Pays': 'category', 'Age': 'int8', 'Genre': 'category', 'Segment_RFM': 'category',
+        'Score_Fidelite': 'int16'
+    },
+    'Dim_Produit': {
+        'ID_Produit': 'int32', 'Categorie': 'category', 'Sous_Categorie': 'category',
+        'Marque': 'category', 'Actif': 'int8'
+    },
+    'Dim_Promotion': {
+        'ID_Promotion': 'int8', 'Type_Remise': 'category',
+        'Date_Debut': 'datetime64[s]', 'Date_Fin': 'datetime64[s]'
+    },
+    'Fait_Ventes': {
+        'ID_Client': 'int32', 'ID_Produit': 'int32', 'ID_Date': 'int32', 'Date_Vente': 'datetime64[s]',
+        'Heure_Vente': 'int8', 'DateTime_Vente': 'datetime64[s]', 'ID_Canal': 'int8',
+        'ID_Promotion': 'int8', 'ID_Livraison': 'Int8', 'Quantite': 'int8'
+    },
+    'Fait_Retours': {
+        'ID_Date_Retour': 'int32', 'Date_Retour': 'datetime64[s]', 'ID_Motif': 'int8',
+        'Delai_Retour_Jours': 'int8'
+    },
+    'Fait_Trafic_Web': {
+        'ID_Client': 'Int32', 'ID_Date': 'int32', 'Pages_Vues': 'int16', 'Duree_Session_Sec': 'int32',
+        'A_Achete': 'int8', 'Panier_Abandonne': 'int8'
+    },
+    'Fait_Stock': {
+        'ID_Produit': 'int32', 'ID_Date': 'int32', 'Date_Snapshot': 'datetime64[s]',
+        'Quantite_Disponible': 'int16', 'Quantite_Reservee': 'int16'
+    }
+}
+
+def compacter(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Convertit les colonnes de `table` présentes dans df vers TYPES_COMPACTS[table]."""
+    types = {col: type_compact for col, type_compact in TYPES_COMPACTS.get(table, {}).items()
+             if col in df.columns and df[col].dtype != type_compact}
+    return df.astype(types) if types else df
+
+def memoire_mo(df: pd.DataFrame) -> float:
+    """Empreinte mémoire d'une table (Mo), texte compris."""
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+# ============================================
+# FAIT_VENTES
+# ============================================
+
+def generer_fait_ventes_vectorise(rng: np.random.Generator,
+                                  nb_ventes: int,
+                                  dim_temps: pd.DataFrame,
+                                  dim_produits: pd.DataFrame,
+                                  dim_promotion: pd.DataFrame,
+                                  nb_clients: int,
+                                  id_debut: int = 1,
+                                  compact: bool = False) -> pd.DataFrame:
+    """
+    Génère `nb_ventes` lignes de Fait_Ventes en une seule passe NumPy.
+
+    - rng : générateur NumPy (np.random.default_rng(SEED))
+    - id_debut : premier ID_Vente du lot (permet d'enchaîner plusieurs lots)
+    - compact : schéma compact (dates datetime64, entiers étroits)
+
+    Les colonnes et leur ordre sont identiques à generer_fait_ventes().
+    """
+    n = int(nb_ventes)
+
+    # ---- Dates (pondérées par saison) + heure
+    saisons_temps = dim_temps['Saison_Commerciale'].to_numpy()
+    poids_dates = dim_temps['Saison_Commerciale'].map(POIDS_SAISON).to_numpy(dtype=float)
+    poids_dates = poids_dates / poids_dates.sum()
+
+    idx_date = rng.choice(len(dim_temps), size=n, p=poids_dates)
+    id_date = dim_temps['ID_Date'].to_numpy()[idx_date]
+    jours = dim_temps['Date_Complete'].to_numpy().astype('datetime64[D]')[idx_date]
+    saisons = saisons_temps[idx_date]
+
+    heure = rng.choice(24, size=n, p=POIDS_HORAIRES)
+    minute = rng.integers(0, 60, size=n)
+    seconde = rng.integers(0, 60, size=n)
+    datetime_vente = (jours.astype('datetime64[s]')
+                      + (heure * 3600 + minute * 60 + seconde).astype('timedelta64[s]'))
+
+    # ---- Client 80/20
+    nb_fideles = max(1, int(nb_clients * PART_CLIENTS_FIDELES))
+    fidele = rng.random(n) < PROBA_CLIENT_FIDELE
+    id_client = np.where(fidele,
+                         rng.integers(1, nb_fideles + 1, size=n),
+                         rng.integers(1, nb_clients + 1, size=n))
+
+    # ---- Produit (ID_Produit = position + 1, comme dim_produits.iloc[id - 1])
+    id_produit = rng.integers(1, len(dim_produits) + 1, size=n)
+    prix_unitaire = dim_produits['Prix_Unitaire'].to_numpy(dtype=float)[id_produit - 1]
+    cout_unitaire = dim_produits['Cout_Achat'].to_numpy(dtype=float)[id_produit - 1]
+
+    # ---- Canal + quantité selon le canal
+    id_canal = rng.choice(CANAUX, size=n, p=CANAL_PROBA)
+
+    quantite = np.ones(n, dtype=np.int64)
+    _tirage_par_masque(rng, id_canal == 1, *QUANTITES_WEB, quantite)
+    _tirage_par_masque(rng, id_canal == 3, *QUANTITES_MAGASIN, quantite)
+
+    # ---- Promotion selon la saison
+    id_promo = np.full(n, ID_PROMO_AUCUNE, dtype=np.int64)
+    for saison, promo in PROMO_PAR_SAISON.items():
+        id_promo[saisons == saison] = promo
+    hors_saison = ~np.isin(saisons, list(PROMO_PAR_SAISON))
+    bienvenue = rng.random(n) < PROBA_BIENVENUE
+    id_promo[hors_saison & bienvenue] = ID_PROMO_BIENVENUE
+
+    remises = _table_par_id(dim_promotion['ID_Promotion'],
+                            dim_promotion['Valeur_Remise'].fillna(0))
+    remise_pct = remises[id_promo]
+
+    # ---- Montants (expressions vectorielles)
+    montant_ht = prix_unitaire * quantite
+    remise_appliquee = montant_ht * (remise_pct / 100.0)
+    montant_ht_final = montant_ht - remise_appliquee
+    montant_ttc = montant_ht_final * TAUX_TVA
+
+    cout_total = cout_unitaire * quantite
+    marge = montant_ht_final - cout_total
+
+    # ---- Livraison (canaux en ligne uniquement)
+    en_ligne = id_canal != 3
+    id_livraison = np.zeros(n, dtype=np.int64)
+    _tirage_par_masque(rng, en_ligne, LIVRAISONS, LIVRAISON_PROBA, id_livraison)
+    id_livraison = pd.array(id_livraison, dtype='Int64')
+    id_livraison[~en_ligne] = pd.NA
+
+    ventes = pd.DataFrame({
+        'ID_Vente': np.arange(id_debut, id_debut + n, dtype=np.int64),
+        'ID_Client': id_client,
+        'ID_Produit': id_produit,
+        'ID_Date': id_date,
+        'Date_Vente': jours if compact else formater_dates(jours),
+        'Heure_Vente': heure,
+        'DateTime_Vente': datetime_vente if compact else formater_datetimes(datetime_vente),
+        'ID_Canal': id_canal,
+        'ID_Promotion': id_promo,
+        'ID_Livraison': id_livraison,
+        'Quantite': quantite,
+        'Montant_HT': np.round(montant_ht, 2),
+        'Montant_TTC': np.round(montant_ttc, 2),
+        'Cout_Produit': np.round(cout_total, 2),
+        'Marge': np.round(marge, 2),
+        'Remise_Appliquee': np.round(remise_appliquee, 2)
+    }, columns=COLONNES_VENTES)
+    return compacter(ventes, 'Fait_Ventes') if compact else ventes
+
+def iter_fait_ventes_vectorise(rng: np.random.Generator,
+                               nb_ventes: int,
+                               dim_temps: pd.DataFrame,
+                               dim_produits: pd.DataFrame,
+                               dim_promotion: pd.DataFrame,
+                               nb_clients: int,
+                               taille_lot: int = TAILLE_LOT,
+                               compact: bool = False):
+    """Génère Fait_Ventes par lots de `taille_lot` ventes (yield DataFrame)."""
+    for id_debut, n in iter_lots(nb_ventes, taille_lot):
+        yield generer_fait_ventes_vectorise(rng, n, dim_temps, dim_produits, dim_promotion,
+                                            nb_clients, id_debut=id_debut, compact=compact)
+
+
+# ============================================
+# FAIT_RETOURS
+# ============================================
+
+def generer_fait_retours_lot(rng: np.random.Generator,
+                             ventes: pd.DataFrame,
+                             dim_temps: pd.DataFrame,
+                             id_debut: int = 1,
+                             taux_retour: float = TAUX_RETOUR,
+                             index_dates: IndexDates | None = None,
+                             compact: bool = False) -> pd.DataFrame:
+    """
+    Génère les retours d'un lot de ventes : `taux_retour` des ventes du lot
+    sont retournées 1 à 14 jours plus tard.
+
+    Délais et motifs sont tirés pour tout le lot ; la date de vente et
+    l'ID_Date du retour sont résolus par IndexDates (accès tableau).
+    Les retours dont la date dépasse la fin de Dim_Temps sont ignorés.
+    """
+    if index_dates is None:
+        index_dates = IndexDates(dim_temps)
+
+    nb = int(len(ventes) * taux_retour)
+    idx = rng.choice(len(ventes), size=nb, replace=False)
+    ventes_retournees = ventes.iloc[idx]
+
+    delai_retour = rng.integers(1, DELAI_RETOUR_MAX_JOURS + 1, size=nb)
+    id_motif = rng.integers(1, NB_MOTIFS_RETOUR + 1, size=nb)
+    date_vente = index_dates.jours(ventes_retournees['ID_Date'].to_numpy())
+    date_retour = date_vente + delai_retour.astype('timedelta64[D]')
+
+    id_date_retour = index_dates.ids(date_retour)
+    garde = id_date_retour > 0
+
+    retours = pd.DataFrame({
+        'ID_Retour': np.arange(id_debut, id_debut + int(garde.sum()), dtype=np.int64),
+        'ID_Vente': ventes_retournees['ID_Vente'].to_numpy()[garde],
+        'ID_Date_Retour': id_date_retour[garde],
+        'Date_Retour': date_retour[garde] if compact else formater_dates(date_retour[garde]),
+        'ID_Motif': id_motif[garde],
+        'Montant_Rembourse': ventes_retournees['Montant_TTC'].to_numpy(dtype=float)[garde],
+        'Delai_Retour_Jours': delai_retour[garde]
+    })
+    return compacter(retours, 'Fait_Retours') if compact else retours
+
+
+# ============================================
+# FAIT_TRAFIC_WEB
+# ============================================
+
+def generer_fait_trafic_vectorise(rng: np.random.Generator,
+                                  nb_sessions: int,
+                                  dim_temps: pd.DataFrame,
+                                  nb_clients: int,
+                                  id_debut: int = 1,
+                                  compact: bool = False) -> pd.DataFrame:
+    """
+    Génère `nb_sessions` lignes de Fait_Trafic_Web en une seule passe NumPy.
+
+    Colonnes typées (au lieu d'objets Python) :
+    - ID_Client : entier nullable (Int32), NULL = visiteur anonyme
+    - Pages_Vues (int16), Duree_Session_Sec (int32)
+    - A_Achete / Panier_Abandonne (int8), abandon uniquement si pas d'achat
+    """
+    n = int(nb_sessions)
+
+    id_date = rng.choice(dim_temps['ID_Date'].to_numpy(), size=n)
+
+    identifiee = rng.random(n) < PROBA_SESSION_IDENTIFIEE
+    id_client = pd.array(rng.integers(1, nb_clients + 1, size=n), dtype='Int32')
+    id_client[~identifiee] = pd.NA
+
+    pages_vues = rng.poisson(PAGES_VUES_LAMBDA, size=n) + 1
+    duree_session = rng.exponential(DUREE_SESSION_MOYENNE_SEC, size=n)
+
+    a_achete = rng.random(n) < PROBA_ACHAT
+    panier_abandonne = ~a_achete & (rng.random(n) < PROBA_ABANDON_PANIER)
+
+    trafic = pd.DataFrame({
+        'ID_Session': np.arange(id_debut, id_debut + n, dtype=np.int64),
+        'ID_Client': id_client,
+        'ID_Date': id_date.astype(np.int32),
+        'Pages_Vues': pages_vues.astype(np.int16),
+        'Duree_Session_Sec': duree_session.astype(np.int32),
+        'A_Achete': a_achete.astype(np.int8),
+        'Panier_Abandonne': panier_abandonne.astype(np.int8)
+    })
+    return compacter(trafic, 'Fait_Trafic_Web') if compact else trafic
+
+def iter_fait_trafic_vectorise(rng: np.random.Generator,
+                               nb_sessions: int,
+                               dim_temps: pd.DataFrame,
+                               nb_clients: int,
+                               taille_lot: int = TAILLE_LOT,
+                               compact: bool = False):
+    """
+    Génère Fait_Trafic_Web par lots de `taille_lot` sessions (yield DataFrame).
+
+    La mémoire reste bornée par la taille du lot : des centaines de millions
+    de sessions peuvent être produites et exportées lot par lot.
+    """
+    for id_debut, n in iter_lots(nb_sessions, taille_lot):
+        yield generer_fait_trafic_vectorise(rng, n, dim_temps, nb_clients, id_debut=id_debut,
+                                            compact=compact)
+
+
+# ============================================
+# FAIT_STOCK
+# ============================================
+
+def generer_fait_stock_vectorise(rng: np.random.Generator,
+                                 dates_snapshot,
+                                 dim_temps: pd.DataFrame,
+                                 dim_produits: pd.DataFrame,
+                                 id_debut: int = 1,
+                                 index_dates: IndexDates | None = None,
+                                 compact: bool = False) -> pd.DataFrame:
+    """
+    Génère les snapshots de stock (semaines x produits) en une seule passe :
+    les quantités sont tirées sous forme de matrice (nb_semaines, nb_produits)
+    et la valeur du stock est obtenue par broadcast du Prix_Unitaire.
+
+    Ordre des lignes identique à generer_fait_stock() : semaine par semaine,
+    puis produit par produit. Les dates absentes de Dim_Temps sont ignorées.
+    """
+    if index_dates is None:
+        index_dates = IndexDates(dim_temps)
+    dates = np.asarray(pd.DatetimeIndex(dates_snapshot).to_numpy(), dtype='datetime64[D]')
+    id_dates = index_dates.ids(dates)
+    dates, id_dates = dates[id_dates > 0], id_dates[id_dates > 0]
+
+    nb_semaines, nb_produits = len(dates), len(dim_produits)
+    prix = dim_produits['Prix_Unitaire'].to_numpy(dtype=float)
+
+    qte_dispo = rng.integers(0, QTE_STOCK_MAX + 1, size=(nb_semaines, nb_produits))
+    qte_reservee = rng.integers(0, np.minimum(QTE_RESERVEE_MAX, qte_dispo) + 1)
+    valeur_stock = qte_dispo * prix[np.newaxis, :]
+
+    stock = pd.DataFrame({
+        'ID_Stock': np.arange(id_debut, id_debut + nb_semaines * nb_produits, dtype=np.int64),
+        'ID_Produit': np.tile(dim_produits['ID_Produit'].to_numpy(), nb_semaines),
+        'ID_Date': np.repeat(id_dates, nb_produits),
+        'Date_Snapshot': np.repeat(dates if compact else formater_dates(dates), nb_produits),
+        'Quantite_Disponible': qte_dispo.ravel(),
+        'Quantite_Reservee': qte_reservee.ravel(),
+        'Valeur_Stock': np.round(valeur_stock.ravel(), 2)
+    })
+    return compacter(stock, 'Fait_Stock') if compact else stock
+
+
+# ============================================
+# DIM_PRODUIT : VARIANTES SYNTHÉTIQUES
+# ============================================
+
+# Le catalogue écrit à la main s'arrête à la variante v3 d'un article
+NUMERO_VARIANTE_MIN = 4
+MARGE_COUT = (0.6, 0.8)      # Cout_Achat = Prix_Unitaire x U(0.6, 0.8)
+POIDS_KG = (0.1, 5.0)
+
+def synthetiser_variantes_produits(rng: np.random.Generator,
+                                   nb_produits: int,
+                                   catalogue: dict,
+                                   marques: list,
+                                   prix_par_categorie: dict,
+                                   id_debut: int = 1) -> pd.DataFrame:
+    """
+    nb_produits variantes d'articles du catalogue ({categorie: {sous_cat: [articles]}}),
+    tirées en une passe : article et marque uniformes, prix dans la fourchette
+    de la catégorie. Nom "<article> <marque> v<n>", n croissant par article
+    à partir de NUMERO_VARIANTE_MIN (pas de collision avec le catalogue).
+    """
+    articles = pd.DataFrame([(categorie, sous_cat, article)
+                             for categorie, sous_cats in catalogue.items()
+                             for sous_cat, liste in sous_cats.items()
+                             for article in liste],
+                            columns=['Categorie', 'Sous_Categorie', 'Article'])
+
+    choix = rng.integers(0, len(articles), nb_produits)
+    produits = articles.iloc[choix].reset_index(drop=True)
+    marque = np.asarray(marques, dtype=object)[rng.integers(0, len(marques), nb_produits)]
+    numero = produits.groupby('Article').cumcount().to_numpy() + NUMERO_VARIANTE_MIN
+
+    prix_min = produits['Categorie'].map({c: b[0] for c, b in prix_par_categorie.items()}).to_numpy(float)
+    prix_max = produits['Categorie'].map({c: b[1] for c, b in prix_par_categorie.items()}).to_numpy(float)
+    prix = np.round(rng.uniform(prix_min, prix_max), 2)
+    cout = np.round(prix * rng.uniform(*MARGE_COUT, nb_produits), 2)
+
+    ids = np.arange(id_debut, id_debut + nb_produits, dtype=np.int64)
+    return pd.DataFrame({
+        'ID_Produit': ids,
+        'SKU': np.char.add('SKU', np.char.zfill(ids.astype(str), 5)),
+        'Nom_Produit': produits['Article'] + ' ' + marque + ' v' + numero.astype(str),
+        'Categorie': produits['Categorie'],
+        'Sous_Categorie': produits['Sous_Categorie'],
+        'Marque': marque,
+        'Prix_Unitaire': prix,
+        'Cout_Achat': cout,
+        'Poids_Kg': np.round(rng.uniform(*POIDS_KG, nb_produits), 2),
+        'Actif': 1
+    })
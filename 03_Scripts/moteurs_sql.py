@@ -0,0 +1,211 @@
+"""
+Moteurs SQL cibles de upload_to_sql.py : MySQL (serveur) ou SQLite
+(fichier local, sans serveur : CI, poste de développement, benchmarks).
+
+Chaque moteur fournit la traduction de base_ventes.sql dans son dialecte
+et les quelques requêtes qui diffèrent d'un SGBD à l'autre (upsert,
+table de staging, bascule de tables, index existants). Le chargement, les
+vérifications et les agrégats sont communs.
+
+    moteur = creer_moteur("sqlite", chemin="entrepot.db")
+    engine = moteur.creer_engine(nb_connexions=1)
+"""
+
+import os
+import re
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+
+# ============================================
+# TRADUCTION DU DDL (base_ventes.sql)
+# ============================================
+
+def sans_commentaires(sql: str) -> str:
+    return re.sub(r"--.*", "", sql)
+
+def _fin_parenthese(sql: str, ouvrante: int) -> int:
+    """Position de la parenthèse fermante associée à celle en `ouvrante`."""
+    profondeur = 0
+    for i in range(ouvrante, len(sql)):
+        if sql[i] == "(":
+            profondeur += 1
+        elif sql[i] == ")":
+            profondeur -= 1
+            if profondeur == 0:
+                return i
+    raise ValueError("Parenthèse non fermée dans le DDL")
+
+def sans_partitions(sql: str) -> str:
+    """Retire les clauses PARTITION BY ... ( ... ) qui suivent la liste des colonnes des CREATE TABLE."""
+    while debut := re.search(r"\)\s*PARTITION\s+BY\b", sql, flags=re.IGNORECASE):
+        clause = sql.index("(", debut.end())                              # PARTITION BY RANGE (col)
+        definitions = sql.index("(", _fin_parenthese(sql, clause) + 1)    # (PARTITION p2023 ..., ...)
+        sql = sql[:debut.start() + 1] + sql[_fin_parenthese(sql, definitions) + 1:]
+    return sql
+
+def normalize_schema_for_mysql(sql: str) -> str:
+    """
+    Rend le SQL plus compatible MySQL.
+    - supprime commentaires
+    - remplace NUMERIC(x,y) -> DECIMAL(x,y)
+    - TEXT ok, INT ok, DATE ok, TIMESTAMP ok
+    """
+    # remove -- comments
+    sql = sans_commentaires(sql)
+
+    # numeric -> decimal
+    sql = re.sub(r"\bNUMERIC\(", "DECIMAL(", sql, flags=re.IGNORECASE)
+
+    # optionnel : IF NOT EXISTS ok, PRIMARY KEY ok
+    return sql
+
+
+# ============================================
+# MOTEURS
+# ============================================
+
+class MoteurSQL:
+    """Interface commune ; les sous-classes adaptent le dialecte."""
+
+    nom = "SQL"
+    # LOAD DATA LOCAL INFILE disponible (sinon : INSERT)
+    chargement_fichier = False
+    # méthode pandas.to_sql du chemin INSERT ("multi" : INSERT multi-lignes)
+    methode_insert = "multi"
+    # nombre maximal de connexions qui écrivent en parallèle
+    ecrivains_max = None
+    # les index des tables de staging peuvent être créés avant la bascule
+    # (faux si les noms d'index sont globaux à la base)
+    index_avant_bascule = True
+
+    def creer_base(self) -> None:
+        pass
+
+    def creer_engine(self, nb_connexions: int) -> Engine:
+        raise NotImplementedError
+
+    def traduire_schema(self, sql: str) -> str:
+        raise NotImplementedError
+
+    def sql_staging(self, staging: str, table: str) -> str:
+        """Crée `staging`, vide, avec les colonnes de `table`."""
+        return f"CREATE TABLE {staging} LIKE {table};"
+
+    def sql_upsert(self, table: str, colonnes: list[str], source: str) -> str:
+        """INSERT des lignes de `source` (table ou sous-requête) ; mise à jour si la clé existe."""
+        raise NotImplementedError
+
+    def sql_bascule(self, renommages: list[tuple[str, str]]) -> list[str]:
+        """Renommages (ancien nom, nouveau nom) exécutés d'un bloc."""
+        return [f"RENAME TABLE {', '.join(f'{a} TO {b}' for a, b in renommages)};"]
+
+    def index_existe(self, conn, table: str, nom: str) -> bool:
+        raise NotImplementedError
+
+
+class MoteurMySQL(MoteurSQL):
+    """MySQL via PyMySQL ; chargement en masse par LOAD DATA LOCAL INFILE."""
+
+    nom = "MySQL"
+    chargement_fichier = True
+
+    def __init__(self, url: str, url_serveur: str, base: str):
+        self.url = url
+        self.url_serveur = url_serveur
+        self.base = base
+
+    def creer_base(self) -> None:
+        """
+        Création de la base si elle n'existe pas.
+        On se connecte au serveur sans DB, puis CREATE DATABASE.
+        """
+        engine_server = create_engine(self.url_serveur, future=True)
+
+        with engine_server.begin() as conn:
+            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {self.base} CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;"))
+
+    def creer_engine(self, nb_connexions: int) -> Engine:
+        # local_infile : autorise LOAD DATA LOCAL INFILE côté client (PyMySQL)
+        # pool : une connexion par table chargée en parallèle (+ marge pour les contrôles)
+        return create_engine(self.url, future=True, connect_args={"local_infile": True},
+                             pool_size=nb_connexions, max_overflow=2, pool_pre_ping=True)
+
+    def traduire_schema(self, sql: str) -> str:
+        return normalize_schema_for_mysql(sql)
+
+    def sql_upsert(self, table: str, colonnes: list[str], source: str) -> str:
+        liste = ", ".join(f"`{c}`" for c in colonnes)
+        maj = ", ".join(f"`{c}` = m.`{c}`" for c in colonnes)
+        return f"INSERT INTO {table} ({liste}) SELECT {liste} FROM {source} AS m ON DUPLICATE KEY UPDATE {maj};"
+
+    def index_existe(self, conn, table: str, nom: str) -> bool:
+        return bool(conn.execute(text("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = :t AND index_name = :i;
+        """), {"t": table, "i": nom}).scalar_one())
+
+
+class MoteurSQLite(MoteurSQL):
+    """
+    SQLite (fichier local). Un seul écrivain à la fois ; le DDL est
+    transactionnel (BEGIN explicite), la bascule des tables reste atomique.
+    Pas de partitionnement : la clause PARTITION BY est retirée du DDL.
+    """
+
+    nom = "SQLite"
+    # executemany : le multi-lignes dépasserait la limite de variables par requête
+    methode_insert = None
+    ecrivains_max = 1
+    # noms d'index globaux à la base : index créés après la bascule
+    index_avant_bascule = False
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+
+    def creer_base(self) -> None:
+        dossier = os.path.dirname(os.path.abspath(self.chemin))
+        os.makedirs(dossier, exist_ok=True)
+
+    def creer_engine(self, nb_connexions: int) -> Engine:
+        engine = create_engine(f"sqlite:///{self.chemin}", future=True,
+                               connect_args={"timeout": 60, "check_same_thread": False})
+
+        # Transactions gérées par SQLAlchemy (y compris pour le DDL) plutôt que par pysqlite
+        @event.listens_for(engine, "connect")
+        def _connexion(dbapi_connection, _):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _debut(conn):
+            conn.exec_driver_sql("BEGIN")
+
+        return engine
+
+    def traduire_schema(self, sql: str) -> str:
+        return sans_partitions(sans_commentaires(sql))
+
+    def sql_staging(self, staging: str, table: str) -> str:
+        return f"CREATE TABLE {staging} AS SELECT * FROM {table} WHERE 0;"
+
+    def sql_upsert(self, table: str, colonnes: list[str], source: str) -> str:
+        liste = ", ".join(f'"{c}"' for c in colonnes)
+        return f"INSERT OR REPLACE INTO {table} ({liste}) SELECT {liste} FROM {source} AS m;"
+
+    def sql_bascule(self, renommages: list[tuple[str, str]]) -> list[str]:
+        return [f"ALTER TABLE {a} RENAME TO {b};" for a, b in renommages]
+
+    def index_existe(self, conn, table: str, nom: str) -> bool:
+        return bool(conn.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = :i;"),
+            {"i": nom},
+        ).scalar_one())
+
+
+MOTEURS = {"mysql": MoteurMySQL, "sqlite": MoteurSQLite}
+
+def creer_moteur(nom: str, **parametres) -> MoteurSQL:
+    if nom not in MOTEURS:
+        raise ValueError(f"Moteur SQL inconnu : {nom} (attendus : {', '.join(MOTEURS)})")
+    return MOTEURS[nom](**parametres)
@@ -0,0 +1,282 @@
+"""
+Nettoyage des sources avant chargement (ex-étape Power Query) : les tables
+arrivent propres dans l'entrepôt et Power BI n'a plus qu'à les lire.
+
+Règles (vectorisées, appliquées lot par lot) :
+- textes : espaces superflus retirés, chaînes vides -> NULL ;
+- dates : colonnes Date_* / DateTime_* au format ISO ;
+- doublons (Dim_Client) : clients de même empreinte d'identité
+  (validation.empreintes_identite) fusionnés ; le survivant est la fiche
+  la plus complète (puis le plus petit ID_Client), ses NULL sont complétés
+  par les autres fiches du groupe ;
+- clients_fusionnes : ID_Client des faits redirigés vers le survivant ;
+- emails : minuscules ;
+- telephones : format international +212XXXXXXXXX ;
+- villes : orthographe du Referentiel_Geo ("fes", "FÈS " -> "Fès") ;
+- villes_imputees : Ville NULL retrouvée par le Referentiel_Geo d'après
+  le Code_Postal du client (colonne de Dim_Client ajoutée aux sources pour
+  cette règle par gen_data.py ; absente des sources plus anciennes) ;
+- villes_manquantes : Ville encore NULL (ni doublon, ni code postal
+  exploitable) -> VILLE_INCONNUE, en dernier recours ;
+- valeurs_par_defaut : NULL métier (promotion "aucune") remplacés.
+
+Le rapport compte les lignes modifiées par règle et par table.
+
+Chargement : upload_to_sql.py nettoie chaque lot avant contrôle et envoi
+(NETTOYAGE=non pour charger les sources brutes). Utilisation autonome
+(rapport seul, sans rien charger) :
+    python nettoyage.py [--rapport rapport_nettoyage.json]
+"""
+
+import argparse
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from validation import empreintes_identite, normaliser_texte
+
+VILLE_INCONNUE = "Inconnue"
+INDICATIF_PAYS = "212"
+
+# NULL porteurs de sens (ligne "sans promotion") : valeur explicite
+VALEURS_PAR_DEFAUT = {
+    'Dim_Promotion': {'Code_Promo': 'AUCUN', 'Type_Remise': 'Aucune'},
+}
+
+
+# ============================================
+# RÉFÉRENTIEL GÉOGRAPHIQUE
+# ============================================
+
+def lire_referentiel_geo(chemin: str) -> pd.DataFrame:
+    """(Ville, Code_Postal) des villes de Referentiel_Geo.xml (Code_Postal NULL si absent)."""
+    villes = [(ville.findtext('nom'), ville.findtext('code_postal'))
+              for ville in ET.parse(chemin).getroot().iter('ville')]
+    return pd.DataFrame(villes, columns=['Ville', 'Code_Postal'])
+
+
+# ============================================
+# RÈGLES
+# ============================================
+
+def lignes_modifiees(avant: pd.DataFrame | pd.Series, apres: pd.DataFrame | pd.Series) -> int:
+    """Nombre de lignes dont au moins une valeur a changé (NULL == NULL)."""
+    egales = (avant == apres).fillna(False) | (avant.isna() & apres.isna())
+    if isinstance(egales, pd.DataFrame):
+        egales = egales.all(axis=1)
+    return int((~egales).sum())
+
+def standardiser_textes(lot: pd.DataFrame) -> pd.DataFrame:
+    """Espaces de début/fin retirés, espaces multiples réduits, chaînes vides -> NULL."""
+    colonnes = [c for c in lot.columns if pd.api.types.is_string_dtype(lot[c])]
+    if not colonnes:
+        return lot
+    lot = lot.copy()
+    for col in colonnes:
+        texte = lot[col].str.strip().str.replace(r'\s{2,}', ' ', regex=True)
+        lot[col] = texte.mask(texte == '')
+    return lot
+
+def standardiser_dates(lot: pd.DataFrame) -> pd.DataFrame:
+    """Date_* -> AAAA-MM-JJ, DateTime_* -> AAAA-MM-JJ HH:MM:SS ; valeurs illisibles inchangées."""
+    colonnes = [c for c in lot.columns if c.startswith('Date')
+                and not pd.api.types.is_numeric_dtype(lot[c])]
+    if not colonnes:
+        return lot
+    lot = lot.copy()
+    for col in colonnes:
+        dates = pd.to_datetime(lot[col], errors='coerce', format='ISO8601')
+        format_sortie = '%Y-%m-%d %H:%M:%S' if col.startswith('DateTime') else '%Y-%m-%d'
+        lot[col] = dates.dt.strftime(format_sortie).where(dates.notna(), lot[col])
+    return lot
+
+def normaliser_telephones(serie: pd.Series) -> pd.Series:
+    """+212XXXXXXXXX depuis 0612..., 00212..., 212... ; numéros non reconnus inchangés."""
+    if pd.api.types.is_numeric_dtype(serie):
+        serie = serie.astype('Int64')
+    chiffres = serie.astype('string').str.replace(r'\D', '', regex=True)
+    chiffres = chiffres.str.replace(r'^00', '', regex=True)
+    locaux = (chiffres.str.len() == 10) & chiffres.str.startswith('0')
+    chiffres = chiffres.mask(locaux, INDICATIF_PAYS + chiffres.str[1:])
+    valides = (chiffres.str.len() == 12) & chiffres.str.startswith(INDICATIF_PAYS)
+    return ('+' + chiffres).where(valides.fillna(False), serie.astype('string'))
+
+def dedoublonner_clients(clients: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Un client par empreinte d'identité : la fiche la plus complète survit
+    (à égalité, le plus petit ID_Client) et ses NULL sont complétés par les
+    autres fiches. Retourne (clients, {ID_Client fusionné: ID_Client survivant}).
+    """
+    tri = clients.assign(_empreinte=empreintes_identite(clients).to_numpy(),
+                         _completude=clients.notna().sum(axis=1).to_numpy())
+    tri = tri.sort_values(['_completude', 'ID_Client'], ascending=[False, True], kind='stable')
+    groupes = tri.groupby('_empreinte', sort=False)
+
+    # first() : première valeur non NULL de chaque colonne, dans l'ordre de préférence
+    survivants = groupes.first().reset_index(drop=True).drop(columns='_completude')
+    survivants = survivants.sort_values('ID_Client', ignore_index=True)[clients.columns]
+
+    survivant = groupes['ID_Client'].transform('first')
+    fusionnes = tri['ID_Client'] != survivant
+    correspondance = pd.Series(survivant[fusionnes].to_numpy(), index=tri['ID_Client'][fusionnes].to_numpy())
+    return survivants, correspondance
+
+
+# ============================================
+# NETTOYEUR (état partagé entre les tables)
+# ============================================
+
+class Nettoyeur:
+    """
+    Applique les règles aux lots de chaque table et compte les lignes
+    modifiées. Dim_Client doit être nettoyée avant les faits qui la
+    référencent (correspondance des clients fusionnés).
+
+    cles_etrangeres : liste de (table, colonne, table référencée, clé).
+    referentiel_geo : DataFrame (Ville, Code_Postal) ou None.
+    """
+
+    def __init__(self, cles_etrangeres: list, referentiel_geo: pd.DataFrame | None = None):
+        self.colonnes_clients = {fait: colonne for fait, colonne, ref, _ in cles_etrangeres
+                                 if ref == 'Dim_Client'}
+        self.villes = {}              # ville normalisée -> orthographe du référentiel
+        self.villes_par_code = {}     # code postal -> ville
+        if referentiel_geo is not None:
+            self.villes = dict(zip(normaliser_texte(referentiel_geo['Ville']), referentiel_geo['Ville']))
+            codes = referentiel_geo.dropna(subset=['Code_Postal'])
+            self.villes_par_code = dict(zip(codes['Code_Postal'].str.strip(), codes['Ville']))
+        self.correspondance_clients = pd.Series([], dtype='Int64')
+        self.rapport = {}         # {table: {règle: lignes modifiées}}
+        self._verrou = threading.Lock()
+
+    def _compter(self, table: str, regle: str, nb: int) -> None:
+        with self._verrou:
+            regles = self.rapport.setdefault(table, {})
+            regles[regle] = regles.get(regle, 0) + nb
+
+    def _appliquer(self, table: str, regle: str, lot: pd.DataFrame, fonction) -> pd.DataFrame:
+        resultat = fonction(lot)
+        self._compter(table, regle, lignes_modifiees(lot, resultat))
+        return resultat
+
+    def nettoyer(self, table: str, lots):
+        """Lots nettoyés de `table` ; Dim_Client est dédoublonnée sur la table entière."""
+        if table == 'Dim_Client':
+            lots = list(lots)
+            if not lots:
+                return
+            clients = self.nettoyer_lot(table, pd.concat(lots, ignore_index=True))
+            survivants, self.correspondance_clients = dedoublonner_clients(clients)
+            self._compter(table, 'doublons', len(self.correspondance_clients))
+            # survivants dont des NULL ont été complétés par une autre fiche
+            avant = clients.set_index('ID_Client').loc[survivants['ID_Client']]
+            self._compter(table, 'completes_par_doublon',
+                          lignes_modifiees(avant.reset_index(), survivants))
+            clients = survivants
+            yield self._clients(clients)
+            return
+        for lot in lots:
+            yield self.nettoyer_lot(table, lot)
+
+    def nettoyer_lot(self, table: str, lot: pd.DataFrame) -> pd.DataFrame:
+        """Règles communes (textes, dates, valeurs par défaut, clients fusionnés)."""
+        lot = self._appliquer(table, 'textes', lot, standardiser_textes)
+        lot = self._appliquer(table, 'dates', lot, standardiser_dates)
+
+        if table in VALEURS_PAR_DEFAUT:
+            lot = self._appliquer(table, 'valeurs_par_defaut', lot,
+                                  lambda df: df.fillna(VALEURS_PAR_DEFAUT[table]))
+
+        colonne = self.colonnes_clients.get(table)
+        if colonne in lot.columns and len(self.correspondance_clients):
+            fusionnes = lot[colonne].isin(self.correspondance_clients.index)
+            if fusionnes.any():
+                lot = lot.copy()
+                lot.loc[fusionnes, colonne] = lot.loc[fusionnes, colonne].map(self.correspondance_clients)
+            self._compter(table, 'clients_fusionnes', int(fusionnes.sum()))
+        return lot
+
+    def _clients(self, clients: pd.DataFrame) -> pd.DataFrame:
+        """Règles propres à Dim_Client, après fusion des doublons."""
+        table = 'Dim_Client'
+        if 'Email' in clients.columns:
+            clients = self._appliquer(table, 'emails', clients,
+                                      lambda df: df.assign(Email=df['Email'].str.lower()))
+        if 'Telephone' in clients.columns:
+            clients = self._appliquer(table, 'telephones', clients,
+                                      lambda df: df.assign(Telephone=normaliser_telephones(df['Telephone'])))
+        if 'Ville' in clients.columns:
+            if self.villes:
+                officielles = normaliser_texte(clients['Ville']).map(self.villes)
+                clients = self._appliquer(table, 'villes', clients,
+                                          lambda df: df.assign(Ville=officielles.fillna(df['Ville'])))
+                hors = clients['Ville'].notna() & officielles.isna()
+                self._compter(table, 'villes_hors_referentiel', int(hors.sum()))
+            clients = self._appliquer(table, 'villes_imputees', clients, self._imputer_villes)
+            clients = self._appliquer(table, 'villes_manquantes', clients,
+                                      lambda df: df.assign(Ville=df['Ville'].fillna(VILLE_INCONNUE)))
+        return clients
+
+    def _imputer_villes(self, clients: pd.DataFrame) -> pd.DataFrame:
+        """Ville NULL d'après le Code_Postal du client (Referentiel_Geo)."""
+        if 'Code_Postal' not in clients.columns or not self.villes_par_code:
+            return clients
+        codes = clients['Code_Postal'].astype('string').str.strip()
+        return clients.assign(Ville=clients['Ville'].fillna(codes.map(self.villes_par_code)))
+
+    def resume(self) -> None:
+        total = sum(sum(regles.values()) for regles in self.rapport.values())
+        print(f"🧹 Nettoyage : {total} lignes modifiées")
+        for table, regles in self.rapport.items():
+            detail = ", ".join(f"{regle} {nb}" for regle, nb in regles.items() if nb)
+            if detail:
+                print(f"   - {table} : {detail}")
+
+    def ecrire_rapport(self, chemin: str) -> None:
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(self.rapport, f, ensure_ascii=False, indent=2)
+
+
+def creer_nettoyeur(cles_etrangeres: list, dossier_sources: str) -> Nettoyeur:
+    """Nettoyeur avec le Referentiel_Geo.xml de `dossier_sources` (s'il existe)."""
+    chemin = os.path.join(dossier_sources, "Referentiel_Geo.xml")
+    if not os.path.exists(chemin):
+        print(f"   ⚠️ {chemin} introuvable : villes non normalisées")
+        return Nettoyeur(cles_etrangeres)
+    return Nettoyeur(cles_etrangeres, lire_referentiel_geo(chemin))
+
+
+# ============================================
+# MAIN : rapport de nettoyage sans chargement
+# ============================================
+
+def main():
+    from upload_to_sql import CLES_ETRANGERES, NB_CONNEXIONS, SOURCES_DIR, TABLES, lire_source
+
+    parser = argparse.ArgumentParser(description="Nettoyage des sources (rapport seul, sans chargement).")
+    parser.add_argument('--rapport', help="fichier JSON des lignes modifiées par règle")
+    args = parser.parse_args()
+
+    nettoyeur = creer_nettoyeur(CLES_ETRANGERES, SOURCES_DIR)
+
+    def nettoyer_table(table: str) -> int:
+        return sum(len(lot) for lot in nettoyeur.nettoyer(table, lire_source(table)))
+
+    # Dim_Client d'abord (correspondance des doublons), puis les autres tables en parallèle
+    print(f"   ✅ Dim_Client : {nettoyer_table('Dim_Client')} lignes")
+    autres = [t for t in TABLES if t != 'Dim_Client']
+    with ThreadPoolExecutor(max_workers=NB_CONNEXIONS, thread_name_prefix="nettoyage") as executor:
+        for table, nb in zip(autres, executor.map(nettoyer_table, autres)):
+            print(f"   ✅ {table} : {nb} lignes")
+
+    nettoyeur.resume()
+    if args.rapport:
+        nettoyeur.ecrire_rapport(args.rapport)
+        print(f"📝 Rapport de nettoyage : {args.rapport}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Agrégation et segmentation RFM (Récence / Fréquence / Montant) par client.
+
+L'agrégat est alimenté lot par lot : seule la table par client reste en
+mémoire (une ligne par client), pas l'historique des ventes.
+
+La segmentation est entièrement vectorisée : scores R, F et M par
+quantiles (1 à 5), puis segments attribués par règles (np.select),
+sans appel Python par client.
+"""
+
+import numpy as np
+import pandas as pd
+
+from moteur_vectorise import formater_datetimes
+
+COLONNES_STATS = ['ID_Client', 'Nb_Achats', 'CA_Total', 'Derniere_Vente']
+COLONNES_SCORES = ['Recence_Jours', 'R_Score', 'F_Score', 'M_Score', 'Score_RFM']
+
+NB_CLASSES_RFM = 5
+SEGMENT_PAR_DEFAUT = 'Nouveau'
+
+# Règles de segmentation : (segment, {colonne: seuil minimal}), évaluées dans
+# l'ordre, la première satisfaite l'emporte. Les colonnes utilisables sont
+# celles de COLONNES_STATS et COLONNES_SCORES.
+
+# Seuils historiques de gen_data.py (volume d'achats et CA)
+REGLES_SEUILS = [
+    ('Gold',   {'Nb_Achats': 8, 'CA_Total': 5000}),
+    ('Silver', {'Nb_Achats': 4}),
+    ('Bronze', {'Nb_Achats': 1}),
+]
+
+# Variante par scores : tient compte de la récence
+REGLES_SCORES = [
+    ('Gold',   {'R_Score': 4, 'F_Score': 4, 'M_Score': 4}),
+    ('Silver', {'R_Score': 3, 'F_Score': 3}),
+    ('Bronze', {'Nb_Achats': 1}),
+]
+
+
+# ============================================
+# AGRÉGATION PAR LOTS
+# ============================================
+
+class AccumulateurRFM:
+    """
+    Cumule Nb_Achats, CA_Total et Derniere_Vente par ID_Client
+    à partir de lots de Fait_Ventes.
+
+        acc = AccumulateurRFM(nb_clients=NB_CLIENTS)
+        for lot in lots_ventes:
+            acc.ajouter(lot)
+        ventes_client = acc.resultat()
+
+    Avec nb_clients (ID_Client de 1 à nb_clients), les cumuls sont des
+    tableaux NumPy indexés par ID_Client (np.bincount / np.maximum.at) :
+    coût proportionnel à la taille du lot, pas au nombre de clients.
+    Sans nb_clients, les cumuls passent par un groupby pandas.
+    """
+
+    def __init__(self, nb_clients: int | None = None):
+        self.nb_clients = nb_clients
+        self._stats = None
+        if nb_clients is not None:
+            self._nb_achats = np.zeros(nb_clients + 1, dtype=np.int64)
+            self._ca_total = np.zeros(nb_clients + 1, dtype=np.float64)
+            self._derniere = np.full(nb_clients + 1, np.datetime64('NaT'), dtype='datetime64[s]')
+
+    def ajouter(self, lot: pd.DataFrame) -> None:
+        if self.nb_clients is not None:
+            self._ajouter_dense(lot)
+            return
+
+        partiel = lot.groupby('ID_Client').agg(
+            Nb_Achats=('ID_Vente', 'count'),
+            CA_Total=('Montant_TTC', 'sum'),
+            Derniere_Vente=('DateTime_Vente', 'max')
+        )
+        if self._stats is None:
+            self._stats = partiel
+            return
+        self._stats = pd.concat([self._stats, partiel]).groupby(level=0).agg({
+            'Nb_Achats': 'sum',
+            'CA_Total': 'sum',
+            'Derniere_Vente': 'max'
+        })
+
+    def _ajouter_dense(self, lot: pd.DataFrame) -> None:
+        ids = lot['ID_Client'].to_numpy(dtype=np.int64)
+        taille = self.nb_clients + 1
+        self._nb_achats += np.bincount(ids, minlength=taille)
+        self._ca_total += np.bincount(ids, weights=lot['Montant_TTC'].to_numpy(dtype=np.float64),
+                                      minlength=taille)
+
+        dates = pd.to_datetime(lot['DateTime_Vente']).to_numpy(dtype='datetime64[s]')
+        # NaT ne se compare pas : on passe par des entiers (NaT = minimum int64)
+        derniere = self._derniere.view(np.int64)
+        np.maximum.at(derniere, ids, dates.view(np.int64))
+
+    def resultat(self) -> pd.DataFrame:
+        """Même structure que le groupby historique de gen_data.py."""
+        if self.nb_clients is not None:
+            ids = np.flatnonzero(self._nb_achats)
+            return pd.DataFrame({
+                'ID_Client': ids,
+                'Nb_Achats': self._nb_achats[ids],
+                'CA_Total': self._ca_total[ids],
+                'Derniere_Vente': formater_datetimes(self._derniere[ids])
+            })
+
+        if self._stats is None:
+            return pd.DataFrame(columns=COLONNES_STATS)
+        return self._stats.rename_axis('ID_Client').reset_index()[COLONNES_STATS]
+
+
+# ============================================
+# SCORES ET SEGMENTS
+# ============================================
+
+def scores_quantiles(valeurs, nb_classes: int = NB_CLASSES_RFM,
+                     croissant: bool = True) -> np.ndarray:
+    """
+    Score de 1 à nb_classes par quantiles (rang centile), vectorisé.
+    Les ex aequo reçoivent le même score. croissant=False : les plus
+    petites valeurs obtiennent le meilleur score (ex. récence en jours).
+    """
+    rangs = pd.Series(valeurs).rank(method='max', pct=True, ascending=croissant).to_numpy()
+    scores = np.ceil(rangs * nb_classes)
+    return np.clip(np.nan_to_num(scores, nan=1), 1, nb_classes).astype(np.int8)
+
+def appliquer_regles(stats: pd.DataFrame, regles=REGLES_SEUILS,
+                     par_defaut: str = SEGMENT_PAR_DEFAUT) -> np.ndarray:
+    """Segment de chaque ligne selon la première règle satisfaite (np.select)."""
+    conditions = []
+    for _, seuils in regles:
+        condition = np.ones(len(stats), dtype=bool)
+        for colonne, seuil in seuils.items():
+            condition &= stats[colonne].to_numpy() >= seuil
+        conditions.append(condition)
+    return np.select(conditions, [segment for segment, _ in regles], default=par_defaut)
+
+def segmenter_rfm(stats: pd.DataFrame, regles=REGLES_SEUILS,
+                  date_reference=None, nb_classes: int = NB_CLASSES_RFM) -> pd.DataFrame:
+    """
+    Ajoute à la table par client (AccumulateurRFM.resultat()) :
+    Recence_Jours, R_Score, F_Score, M_Score, Score_RFM (ex. 545 pour R=5, F=4, M=5)
+    et Segment_RFM.
+
+    date_reference : date d'observation de la récence (par défaut,
+    la dernière vente de l'historique).
+    """
+    stats = stats.copy()
+    derniere = pd.to_datetime(stats['Derniere_Vente'])
+    reference = derniere.max() if date_reference is None else pd.Timestamp(date_reference)
+
+    stats['Recence_Jours'] = (reference - derniere).dt.days.astype('Int64')
+    stats['R_Score'] = scores_quantiles(stats['Recence_Jours'].astype('float64'), nb_classes,
+                                        croissant=False)
+    stats['F_Score'] = scores_quantiles(stats['Nb_Achats'], nb_classes)
+    stats['M_Score'] = scores_quantiles(stats['CA_Total'], nb_classes)
+    stats['Score_RFM'] = (stats['R_Score'].to_numpy(np.int16) * 100
+                          + stats['F_Score'].to_numpy(np.int16) * 10
+                          + stats['M_Score'].to_numpy(np.int16))
+    stats['Segment_RFM'] = appliquer_regles(stats, regles)
+    return stats
@@ -1,9 +1,22 @@
 import os
 import re
-import pandas as pd
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import numpy as np
-from sqlalchemy import create_engine, text
+import pandas as pd
+from sqlalchemy import inspect, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from agregats import maintenir_agregats
+from instrumentation import Instrumentation, activer, instrumente
+from lectures import (lire_csv_par_lots, lire_excel_par_lots, lire_json_par_lots,
+                      lire_ndjson_par_lots, lire_xml_par_lots, shards_excel)
+from moteurs_sql import creer_moteur
+from nettoyage import Nettoyeur, creer_nettoyeur
+from validation import ErreurIntegrite, ValidateurIntegrite
 
 # ============================================
 # CONFIG (à adapter)
@@ -11,9 +24,14 @@ from sqlalchemy.engine import Engine
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Chemins vers tes fichiers générés
-SQL_SCHEMA_PATH = os.path.join(BASE_DIR, "..", "02_Donnees", "Sources", "base_ventes.sql")
-DIM_CLIENT_XLSX = os.path.join(BASE_DIR, "..", "02_Donnees", "Sources", "Dim_Client.xlsx")
-FAIT_VENTES_XLSX = os.path.join(BASE_DIR, "..", "02_Donnees", "Sources", "Fait_Ventes.xlsx")
+SOURCES_DIR = os.getenv("SOURCES_DIR", os.path.join(BASE_DIR, "..", "02_Donnees", "Sources"))
+SQL_SCHEMA_PATH = os.path.join(SOURCES_DIR, "base_ventes.sql")
+
+# Moteur cible : "mysql" (serveur, variables DB_*) ou "sqlite" (fichier local SQLITE_PATH,
+# sans serveur : CI, poste de développement, benchmarks)
+# $env:DB_BACKEND="sqlite"; $env:SQLITE_PATH="entrepot.db"
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(BASE_DIR, "..", "02_Donnees", "entrepot.db"))
 
 # Connexion MySQL (recommandé: variables d'environnement)
 # PowerShell (exemple) :
@@ -26,18 +44,140 @@ DB_PASS = os.getenv("DB_PASS", "")
 
 # Driver PyMySQL
 DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
-
-# Tables cibles (doivent correspondre aux noms dans base_ventes.sql)
-T_DIM_CLIENT = "Dim_Client"
-T_FAIT_VENTES = "Fait_Ventes"
+SERVER_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/?charset=utf8mb4"
+
+if DB_BACKEND == "sqlite":
+    MOTEUR = creer_moteur("sqlite", chemin=SQLITE_PATH)
+else:
+    MOTEUR = creer_moteur(DB_BACKEND, url=DATABASE_URL, url_serveur=SERVER_URL, base=DB_NAME)
+
+# Mode de chargement :
+# "bulk"   : LOAD DATA LOCAL INFILE par lots de TAILLE_LOT_BULK lignes (fichiers temporaires)
+#            -> nécessite local_infile=ON côté serveur ; sinon repli automatique sur "insert"
+# "insert" : INSERT multi-lignes via pandas.to_sql (chemin historique)
+MODE_CHARGEMENT = os.getenv("MODE_CHARGEMENT", "bulk")
+TAILLE_LOT_BULK = 200_000
+
+# Codes MySQL d'un LOAD DATA LOCAL refusé (local_infile désactivé côté serveur ou client)
+ERREURS_LOCAL_INFILE = {1148, 2068, 3948}
+
+# Rafraîchissement :
+# "complet"     (défaut) : rechargement intégral dans des tables <table>_nouv puis bascule
+#                 atomique (RENAME TABLE) : les tableaux de bord ne voient jamais de table vide
+# "incremental" : seules les nouveautés sont chargées — dimensions en upsert (INSERT ... ON
+#                 DUPLICATE KEY UPDATE), faits en ajout seul au-delà de leur filigrane.
+#                 gen_data.py renumérote les faits à partir de 1 : une source régénérée
+#                 (maximum sous le filigrane) déclenche un rechargement complet
+# $env:MODE_RAFRAICHISSEMENT="incremental"
+MODE_RAFRAICHISSEMENT = os.getenv("MODE_RAFRAICHISSEMENT", "complet")
+SUFFIXE_STAGING = "_nouv"
+SUFFIXE_ANCIEN = "_ancien"
+SUFFIXE_MAJ = "_maj"
+
+# Chargement parallèle : nombre de tables chargées en même temps (= taille du pool de connexions)
+NB_CONNEXIONS = int(os.getenv("NB_CONNEXIONS", "4"))
+
+# Tables cibles (doivent correspondre aux noms dans base_ventes.sql) et leur fichier source :
+# liste de (fichier, format, option) ; le premier fichier présent est utilisé.
+# option : feuille Excel, élément XML ou clé de la liste JSON.
+SOURCES = {
+    'Dim_Client': [('Dim_Client.xlsx', 'xlsx', 'Dim_Client')],
+    'Dim_Produit': [('Dim_Produit.xml', 'xml', 'Produit')],
+    'Dim_Temps': [('Dim_Temps.csv', 'csv', None)],
+    'Dim_Canal': [('Dim_Canal.json', 'json', None)],
+    'Dim_Promotion': [('Dim_Promotion.csv', 'csv', None)],
+    'Dim_Livraison': [('Dim_Livraison.json', 'json', None)],
+    'Dim_Motif_Retour': [('Dim_Motif_Retour.xml', 'xml', 'Motif')],
+    'Fait_Ventes': [('Fait_Ventes.xlsx', 'xlsx', 'Fait_Ventes')],
+    'Fait_Retours': [('Fait_Retours.csv', 'csv', None)],
+    'Fait_Trafic_Web': [('Fait_Trafic_Web.json', 'json', 'sessions'),
+                        ('Fait_Trafic_Web.ndjson', 'ndjson', None),
+                        ('Fait_Trafic_Web.ndjson.gz', 'ndjson', None)],
+    'Fait_Stock': [('Fait_Stock.csv', 'csv', None)],
+}
+TABLES = list(SOURCES)
+
+# Clés étrangères logiques (fait, colonne, table référencée, clé) :
+# ordre de chargement (une table attend celles qu'elle référence) et contrôle des orphelins
+CLES_ETRANGERES = [
+    ('Fait_Ventes', 'ID_Client', 'Dim_Client', 'ID_Client'),
+    ('Fait_Ventes', 'ID_Produit', 'Dim_Produit', 'ID_Produit'),
+    ('Fait_Ventes', 'ID_Date', 'Dim_Temps', 'ID_Date'),
+    ('Fait_Ventes', 'ID_Canal', 'Dim_Canal', 'ID_Canal'),
+    ('Fait_Ventes', 'ID_Promotion', 'Dim_Promotion', 'ID_Promotion'),
+    ('Fait_Ventes', 'ID_Livraison', 'Dim_Livraison', 'ID_Livraison'),
+    ('Fait_Retours', 'ID_Vente', 'Fait_Ventes', 'ID_Vente'),
+    ('Fait_Retours', 'ID_Date_Retour', 'Dim_Temps', 'ID_Date'),
+    ('Fait_Retours', 'ID_Motif', 'Dim_Motif_Retour', 'ID_Motif'),
+    ('Fait_Trafic_Web', 'ID_Client', 'Dim_Client', 'ID_Client'),
+    ('Fait_Trafic_Web', 'ID_Date', 'Dim_Temps', 'ID_Date'),
+    ('Fait_Stock', 'ID_Produit', 'Dim_Produit', 'ID_Produit'),
+    ('Fait_Stock', 'ID_Date', 'Dim_Temps', 'ID_Date'),
+]
+
+# Clé d'unicité contrôlée avant chargement (sans ID_Date, ajouté aux PK
+# des faits partitionnés)
+CLES_PRIMAIRES = {
+    'Dim_Client': 'ID_Client',
+    'Dim_Produit': 'ID_Produit',
+    'Dim_Temps': 'ID_Date',
+    'Dim_Canal': 'ID_Canal',
+    'Dim_Promotion': 'ID_Promotion',
+    'Dim_Livraison': 'ID_Livraison',
+    'Dim_Motif_Retour': 'ID_Motif',
+    'Fait_Ventes': 'ID_Vente',
+    'Fait_Retours': 'ID_Retour',
+    'Fait_Trafic_Web': 'ID_Session',
+    'Fait_Stock': 'ID_Stock',
+}
+
+# Contrôles d'intégrité de chaque lot avant chargement (validation.py) :
+# - "bloquer" (défaut) : un lot avec clé étrangère orpheline ou clé primaire
+#   en double arrête le chargement avant d'être envoyé (en mode complet, la
+#   bascule n'a pas lieu : les tables en service restent intactes)
+# - "signaler" : anomalies affichées, chargement poursuivi
+# - "aucune" : pas de contrôle
+VALIDATION = os.getenv("VALIDATION", "bloquer")
+
+# Nettoyage des lots avant contrôle et envoi (nettoyage.py : doublons clients
+# fusionnés, NULL complétés, textes/dates/téléphones/villes standardisés) ;
+# "non" : sources chargées telles quelles
+NETTOYAGE = os.getenv("NETTOYAGE", "oui")
+
+# Filigranes (high-water marks) des faits, conservés dans Etat_Chargement :
+# la première colonne filtre les lignes nouvelles, les suivantes sont informatives.
+# Avec la première colonne est conservée l'empreinte (EmpreinteSource) des lignes
+# chargées : en incrémental, les lignes de la source en deçà du filigrane doivent
+# la reproduire, sinon la source a été régénérée (rechargement complet)
+FILIGRANES = {
+    'Fait_Ventes': ['ID_Vente', 'DateTime_Vente'],
+    'Fait_Retours': ['ID_Retour'],
+    'Fait_Trafic_Web': ['ID_Session'],
+    'Fait_Stock': ['Date_Snapshot'],
+}
+DDL_ETAT_CHARGEMENT = """
+CREATE TABLE IF NOT EXISTS Etat_Chargement (
+  Nom_Table VARCHAR(64),
+  Colonne VARCHAR(64),
+  Filigrane VARCHAR(32),
+  Date_Chargement DATETIME,
+  Empreinte VARCHAR(40),
+  PRIMARY KEY (Nom_Table, Colonne)
+)"""
+
+# Instrumentation (optionnelle) : rapport JSON des étapes (durée, CPU, lignes,
+# octets, pic mémoire) et profils cProfile (<dossier>/<étape>.prof)
+# $env:RAPPORT_UPLOAD="rapport_upload.json"; $env:PROFIL_UPLOAD="profils_upload"
+RAPPORT_UPLOAD = os.getenv("RAPPORT_UPLOAD")
+PROFIL_UPLOAD = os.getenv("PROFIL_UPLOAD")
 
 
 # ============================================
 # UTILITAIRES
 # ============================================
 
-def make_engine() -> Engine:
-    return create_engine(DATABASE_URL, future=True)
+def make_engine(nb_connexions: int = NB_CONNEXIONS) -> Engine:
+    return MOTEUR.creer_engine(nb_connexions)
 
 def read_text(path: str) -> str:
     if not os.path.exists(path):
@@ -78,120 +218,631 @@ def split_sql_statements(sql: str) -> list[str]:
 
     return statements
 
-def normalize_schema_for_mysql(sql: str) -> str:
-    """
-    Rend le SQL plus compatible MySQL.
-    - supprime commentaires
-    - remplace NUMERIC(x,y) -> DECIMAL(x,y)
-    - TEXT ok, INT ok, DATE ok, TIMESTAMP ok
-    """
-    # remove -- comments
-    sql = re.sub(r"--.*", "", sql)
+def create_database_if_not_exists() -> None:
+    MOTEUR.creer_base()
 
-    # numeric -> decimal
-    sql = re.sub(r"\bNUMERIC\(", "DECIMAL(", sql, flags=re.IGNORECASE)
+RE_CREATE_INDEX = re.compile(r"CREATE\s+INDEX\s+(\w+)\s+ON\s+(\w+)", re.IGNORECASE)
 
-    # optionnel : IF NOT EXISTS ok, PRIMARY KEY ok
-    return sql
+def renommer_tables(stmt: str, suffixe: str) -> str:
+    """Ajoute `suffixe` aux noms des tables de l'entrepôt cités dans `stmt`."""
+    return re.sub(r"\b(" + "|".join(TABLES) + r")\b", r"\g<1>" + suffixe, stmt)
 
-def create_database_if_not_exists() -> None:
+def read_schema(schema_path: str, suffixe: str = "") -> tuple[list[str], list[str]]:
     """
-    Création de la base si elle n'existe pas.
-    On se connecte au serveur sans DB, puis CREATE DATABASE.
+    (CREATE TABLE, CREATE INDEX) de base_ventes.sql : les index secondaires
+    sont créés après le chargement en masse (create_indexes).
     """
-    server_url = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/?charset=utf8mb4"
-    engine_server = create_engine(server_url, future=True)
-
-    with engine_server.begin() as conn:
-        conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {DB_NAME} CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;"))
-
-def execute_schema(engine: Engine, schema_path: str) -> None:
     raw_sql = read_text(schema_path)
-    sql = normalize_schema_for_mysql(raw_sql)
-    statements = split_sql_statements(sql)
+    sql = MOTEUR.traduire_schema(raw_sql)
+    statements = [stmt.strip() for stmt in split_sql_statements(sql) if stmt.strip()]
+    if suffixe:
+        statements = [renommer_tables(stmt, suffixe) for stmt in statements]
+    index = [stmt for stmt in statements if RE_CREATE_INDEX.match(stmt)]
+    tables = [stmt for stmt in statements if not RE_CREATE_INDEX.match(stmt)]
+    return tables, index
+
+RE_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)",
+                             re.IGNORECASE | re.DOTALL)
+RE_COLONNE = re.compile(r"^\s*(\w+)\s+([A-Za-z]+)", re.MULTILINE)
+# Types SQL numériques du DDL -> dtype des colonnes lues dans les sources Excel
+TYPES_NUMERIQUES = {'INT': 'Int64', 'INTEGER': 'Int64', 'BIGINT': 'Int64', 'SMALLINT': 'Int64',
+                    'TINYINT': 'Int64', 'NUMERIC': 'float64', 'DECIMAL': 'float64',
+                    'FLOAT': 'float64', 'DOUBLE': 'float64', 'REAL': 'float64'}
+
+def types_colonnes(table: str, schema_path: str | None = None) -> dict:
+    """{colonne: dtype} des colonnes numériques de `table` dans base_ventes.sql ({} sans schéma)."""
+    schema_path = schema_path or SQL_SCHEMA_PATH
+    if not os.path.exists(schema_path):
+        return {}
+    for stmt in read_schema(schema_path)[0]:
+        creation = RE_CREATE_TABLE.search(stmt)
+        if creation and creation.group(1) == table:
+            return {col: TYPES_NUMERIQUES[type_sql.upper()]
+                    for col, type_sql in RE_COLONNE.findall(creation.group(2))
+                    if type_sql.upper() in TYPES_NUMERIQUES}
+    return {}
+
+@instrumente(octets=lambda _, a: os.path.getsize(a['schema_path']))
+def execute_schema(engine: Engine, schema_path: str, suffixe: str = "") -> None:
+    """
+    Exécute le DDL des tables (sans les index secondaires). suffixe : crée
+    les tables sous le nom <table><suffixe> (tables de staging du
+    rechargement complet, recréées vides).
+    """
+    statements, _ = read_schema(schema_path, suffixe)
 
     with engine.begin() as conn:
+        if suffixe:
+            for table in TABLES:
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}{suffixe};"))
         for stmt in statements:
-            stmt = stmt.strip()
-            if stmt:
-                conn.execute(text(stmt))
-
-def read_excel(path: str, sheet: str) -> pd.DataFrame:
-    df = pd.read_excel(path, sheet_name=sheet, engine="openpyxl")
-    # NaN -> None pour MySQL (sinon pandas envoie NaN comme float)
-    df = df.replace({np.nan: None})
-    return df
-
-def truncate_table(engine: Engine, table: str) -> None:
+            conn.execute(text(stmt))
+        conn.execute(text(DDL_ETAT_CHARGEMENT))
+        # Etat_Chargement créée avant les empreintes
+        if 'Empreinte' not in {c['name'] for c in inspect(conn).get_columns('Etat_Chargement')}:
+            conn.execute(text("ALTER TABLE Etat_Chargement ADD COLUMN Empreinte VARCHAR(40);"))
+
+@instrumente(lignes=lambda n, _: n)
+def create_indexes(engine: Engine, schema_path: str, suffixe: str = "") -> int:
+    """
+    Crée, après chargement, les index secondaires de base_ventes.sql absents
+    de la base (MySQL n'a pas de CREATE INDEX IF NOT EXISTS).
+    Retourne le nombre d'index créés.
+    """
+    _, statements = read_schema(schema_path, suffixe)
+    crees = 0
     with engine.begin() as conn:
-        # MySQL: TRUNCATE fonctionne, mais attention FK : si FK plus tard, il faudra désactiver FK checks
-        conn.execute(text(f"TRUNCATE TABLE {table};"))
+        for stmt in statements:
+            nom, table = RE_CREATE_INDEX.match(stmt).groups()
+            if not MOTEUR.index_existe(conn, table, nom):
+                conn.execute(text(stmt))
+                crees += 1
+    return crees
 
-def upload_df(df: pd.DataFrame, table: str, engine: Engine) -> None:
+@instrumente(cible=lambda a: a['table'], lignes=lambda _, a: len(a['df']))
+def upload_df(df: pd.DataFrame, table: str, engine: Engine, mode: str = MODE_CHARGEMENT,
+              table_vide: bool = False) -> int:
+    """
+    Charge les données dans la base puis vérifie le volume avec le nombre de
+    lignes affectées renvoyé par le serveur (pas de COUNT(*) par lot).
+    mode "bulk" : LOAD DATA LOCAL INFILE, repli sur INSERT si le serveur le refuse
+    (INSERT d'office si le moteur n'a pas de chargement de fichier, ex. SQLite).
+    mode "insert" : INSERT multi-lignes (to_sql).
+    table_vide : fournie par l'appelant (table vide avant son chargement).
     """
-    Charge les données dans MySQL.
+    chargees = None
+    if mode == "bulk" and MOTEUR.chargement_fichier:
+        try:
+            chargees = upload_df_bulk(df, table, engine, table_vide=table_vide)
+            mode = None
+        except DBAPIError as exc:
+            if not _local_infile_refuse(exc):
+                raise
+            print(f"   ⚠️ LOAD DATA LOCAL refusé ({exc.orig}) : repli sur INSERT pour {table}")
+    if mode is not None:
+        chargees = upload_df_insert(df, table, engine)
+
+    # rowcount inconnu (None ou -1 selon le pilote) : pas de contrôle
+    if chargees is not None and chargees >= 0 and chargees != len(df):
+        raise RuntimeError(f"{table} : {chargees} lignes chargées pour {len(df)} attendues")
+    return len(df)
+
+def upload_df_insert(df: pd.DataFrame, table: str, engine: Engine) -> int | None:
+    """
+    Charge les données dans la base ; retourne les lignes insérées (rowcount).
     if_exists='append' : insertion
     chunksize: batch
+    method : INSERT multi-lignes, ou executemany selon le moteur
     """
-    df.to_sql(
+    return df.to_sql(
         name=table,
         con=engine,
         if_exists="append",
         index=False,
         chunksize=5000,
-        method="multi",
+        method=MOTEUR.methode_insert,
     )
 
+def _local_infile_refuse(exc: DBAPIError) -> bool:
+    code = exc.orig.args[0] if exc.orig is not None and exc.orig.args else None
+    return code in ERREURS_LOCAL_INFILE
+
+def _ecrire_lot_temporaire(lot: pd.DataFrame) -> str:
+    """
+    Lot -> fichier temporaire délimité pour LOAD DATA : virgule, guillemets
+    si nécessaire, NULL non entouré pour les valeurs manquantes.
+    Les clés ID_* lues en float (NaN) sont réécrites en entiers.
+    """
+    lot = lot.copy(deep=False)
+    for col in lot.columns:
+        if col.startswith('ID_') and not pd.api.types.is_integer_dtype(lot[col]):
+            lot[col] = pd.to_numeric(lot[col]).astype('Int64')
+
+    f = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', newline='', delete=False)
+    with f:
+        lot.to_csv(f, index=False, header=False, na_rep='NULL', lineterminator='\n')
+    return f.name
+
+def upload_df_bulk(df: pd.DataFrame, table: str, engine: Engine, table_vide: bool = False) -> int:
+    """
+    LOAD DATA LOCAL INFILE par lots de TAILLE_LOT_BULK lignes, dans une seule
+    transaction (un échec n'en laisse aucun lot chargé). Retourne les lignes
+    chargées (lignes affectées de chaque LOAD DATA).
+    table_vide : la table est vide avant chargement (ex. après TRUNCATE) ;
+    seulement dans ce cas, les contrôles d'unicité secondaires et de clés
+    étrangères sont suspendus le temps du chargement.
+    """
+    colonnes = ", ".join(f"`{c}`" for c in df.columns)
+    chargees = 0
+    with engine.begin() as conn:
+        if table_vide:
+            conn.exec_driver_sql("SET unique_checks = 0, foreign_key_checks = 0")
+        try:
+            for debut in range(0, len(df), TAILLE_LOT_BULK):
+                chemin = _ecrire_lot_temporaire(df.iloc[debut:debut + TAILLE_LOT_BULK])
+                try:
+                    chargees += conn.exec_driver_sql(
+                        f"LOAD DATA LOCAL INFILE '{chemin.replace(os.sep, '/')}' INTO TABLE {table} "
+                        "CHARACTER SET utf8mb4 "
+                        "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                        f"LINES TERMINATED BY '\\n' ({colonnes})"
+                    ).rowcount
+                finally:
+                    os.remove(chemin)
+        finally:
+            if table_vide:
+                conn.exec_driver_sql("SET unique_checks = 1, foreign_key_checks = 1")
+    return chargees
+
+@instrumente(cible=lambda a: a['table'], lignes=lambda n, _: n)
 def count_rows(engine: Engine, table: str) -> int:
     with engine.connect() as conn:
         return int(conn.execute(text(f"SELECT COUNT(*) FROM {table};")).scalar_one())
 
 
+# ============================================
+# CHARGEMENT MULTI-TABLES (PARALLÈLE)
+# ============================================
+
+def source_table(table: str) -> tuple[str, str, str | None]:
+    """(chemin, format, option) du premier fichier source présent pour `table`."""
+    for fichier, fmt, option in SOURCES[table]:
+        chemin = os.path.join(SOURCES_DIR, fichier)
+        if os.path.exists(chemin):
+            return chemin, fmt, option
+    attendus = ", ".join(fichier for fichier, _, _ in SOURCES[table])
+    raise FileNotFoundError(f"Source introuvable pour {table} ({attendus}) dans {SOURCES_DIR}")
+
+def lire_source(table: str):
+    """Lots (DataFrames) de `table` lus depuis son fichier source, quel que soit le format."""
+    chemin, fmt, option = source_table(table)
+    if fmt == 'xlsx':
+        # dtype des colonnes fixé par le schéma cible, pas par le contenu de chaque lot
+        types = types_colonnes(table)
+        for fichier, feuille in shards_excel(chemin, option):
+            yield from lire_excel_par_lots(fichier, feuille, types=types)
+    elif fmt == 'csv':
+        yield from lire_csv_par_lots(chemin)
+    elif fmt == 'json':
+        yield from lire_json_par_lots(chemin, cle=option)
+    elif fmt == 'ndjson':
+        yield from lire_ndjson_par_lots(chemin)
+    elif fmt == 'xml':
+        yield from lire_xml_par_lots(chemin, option)
+    else:
+        raise ValueError(f"Format source inconnu : {fmt}")
+
+def lire_source_nettoyee(table: str, nettoyeur: Nettoyeur | None = None):
+    """lire_source(), lots nettoyés par `nettoyeur` s'il est fourni."""
+    lots = lire_source(table)
+    return nettoyeur.nettoyer(table, lots) if nettoyeur else lots
+
+@instrumente(cible=lambda a: a['table'], lignes=lambda n, _: n,
+             octets=lambda _, a: os.path.getsize(source_table(a['table'])[0]))
+def charger_table(engine: Engine, table: str, suffixe: str = "",
+                  validateur: ValidateurIntegrite | None = None, nettoyeur: Nettoyeur | None = None,
+                  empreintes: dict | None = None) -> int:
+    """
+    Charge `table` lot par lot depuis sa source dans <table><suffixe>, chaque
+    lot étant nettoyé par `nettoyeur` puis contrôlé par `validateur` avant
+    envoi ; retourne le nombre de lignes chargées.
+    empreintes : reçoit {table: EmpreinteSource des lignes chargées} (faits).
+    """
+    # un seul COUNT(*) par table (et non par lot) : seul ce chargement écrit dans la table
+    table_vide = count_rows(engine, table + suffixe) == 0
+    empreinte = EmpreinteSource()
+    nb_lignes = 0
+    for lot in lire_source_nettoyee(table, nettoyeur):
+        if validateur:
+            validateur.controler(table, lot)
+        upload_df(lot, table + suffixe, engine, table_vide=table_vide)
+        if table in FILIGRANES:
+            empreinte.ajouter(lot)
+        nb_lignes += len(lot)
+    if empreintes is not None and table in FILIGRANES:
+        empreintes[table] = empreinte
+    return nb_lignes
+
+def charger_table_staging(engine: Engine, table: str, validateur: ValidateurIntegrite | None = None,
+                          nettoyeur: Nettoyeur | None = None, empreintes: dict | None = None) -> int:
+    return charger_table(engine, table, SUFFIXE_STAGING, validateur, nettoyeur, empreintes)
+
+@instrumente(cible=lambda a: a['table'], lignes=lambda n, _: n,
+             octets=lambda _, a: os.path.getsize(source_table(a['table'])[0]))
+def charger_table_incrementale(engine: Engine, table: str, validateur: ValidateurIntegrite | None = None,
+                               nettoyeur: Nettoyeur | None = None, empreintes: dict | None = None) -> int:
+    """
+    Faits : ajout des seules lignes au-delà du filigrane de la table.
+    Dimensions : upsert de la source (nouvelles lignes insérées, lignes
+    modifiées mises à jour). Retourne le nombre de lignes envoyées.
+    Les clés de toute la source sont enregistrées par `validateur` ; seules
+    les lignes envoyées sont contrôlées.
+
+    Les lignes de la source en deçà du filigrane doivent reproduire
+    l'empreinte enregistrée au chargement précédent : sinon (source
+    régénérée, même à volume égal ou supérieur), SourceRegeneree est levée,
+    avant tout envoi si la source est triée sur la colonne filigrane.
+    """
+    if table not in FILIGRANES:
+        nb_lignes = 0
+        for lot in lire_source_nettoyee(table, nettoyeur):
+            if validateur:
+                validateur.controler(table, lot)
+            upsert_df(lot, table, engine)
+            nb_lignes += len(lot)
+        return nb_lignes
+
+    colonne = FILIGRANES[table][0]
+    filigrane = lire_filigrane(engine, table, colonne)
+    seuil = None if filigrane is None else _valeurs_filigrane(pd.Series([filigrane]), colonne)[0]
+    attendue = lire_empreinte(engine, table, colonne)
+    if seuil is not None and attendue is None:
+        raise SourceRegeneree(f"{table} : pas d'empreinte enregistrée pour le filigrane "
+                              f"{colonne}={filigrane}, source non vérifiable")
+
+    anciennes = EmpreinteSource()
+    nouvelles = EmpreinteSource()
+    for lot in lire_source_nettoyee(table, nettoyeur):
+        nouveau = lot
+        if seuil is not None:
+            masque = (_valeurs_filigrane(lot[colonne], colonne) > seuil).to_numpy()
+            anciennes.ajouter(lot[~masque])
+            nouveau = lot[masque]
+            # avant le premier envoi : toutes les lignes connues doivent avoir été lues
+            if len(nouveau) and anciennes != attendue:
+                break
+        if validateur:
+            validateur.controler(table, lot, a_verifier=nouveau)
+        if len(nouveau):
+            # pas de filigrane : table vide (lire_filigrane tient compte du MAX en base)
+            upload_df(nouveau, table, engine, table_vide=seuil is None)
+            nouvelles.ajouter(nouveau)
+
+    if seuil is not None and anciennes != attendue:
+        raise SourceRegeneree(f"{table} : lignes en deçà du filigrane {colonne}={filigrane} "
+                              f"différentes du dernier chargement (empreinte {anciennes}, "
+                              f"attendue {attendue}) : source régénérée ?")
+    if empreintes is not None:
+        empreintes[table] = anciennes.fusionner(nouvelles)
+    return nouvelles.nb_lignes
+
+class SourceRegeneree(RuntimeError):
+    """Source d'un fait différente de celle chargée jusqu'à son filigrane (données régénérées)."""
+
+class EmpreinteSource:
+    """
+    Empreinte d'un ensemble de lignes : nombre de lignes et somme (modulo
+    2**64) des hash 64 bits de chaque ligne. Indépendante de l'ordre et du
+    découpage en lots ; texte "<nb_lignes>:<somme hexadécimale>".
+    """
+
+    def __init__(self, nb_lignes: int = 0, somme: int = 0):
+        self.nb_lignes = nb_lignes
+        self.somme = somme
+
+    @classmethod
+    def depuis_texte(cls, texte: str) -> "EmpreinteSource":
+        nb_lignes, somme = texte.split(":")
+        return cls(int(nb_lignes), int(somme, 16))
+
+    def ajouter(self, lot: pd.DataFrame) -> None:
+        # nombres en float64, le reste en texte : même hash quel que soit le type lu par lot
+        normalise = pd.DataFrame({col: lot[col].astype('float64') if pd.api.types.is_numeric_dtype(lot[col])
+                                  else lot[col].astype('string') for col in lot.columns})
+        hashs = pd.util.hash_pandas_object(normalise, index=False).to_numpy()
+        self.nb_lignes += len(lot)
+        self.somme = (self.somme + int(hashs.sum(dtype=np.uint64))) % 2**64
+
+    def fusionner(self, autre: "EmpreinteSource") -> "EmpreinteSource":
+        return EmpreinteSource(self.nb_lignes + autre.nb_lignes, (self.somme + autre.somme) % 2**64)
+
+    def __eq__(self, autre) -> bool:
+        return (isinstance(autre, EmpreinteSource)
+                and (self.nb_lignes, self.somme) == (autre.nb_lignes, autre.somme))
+
+    def __str__(self) -> str:
+        return f"{self.nb_lignes}:{self.somme:016x}"
+
+def upsert_df(df: pd.DataFrame, table: str, engine: Engine) -> None:
+    """
+    Upsert via une table de staging <table>_maj chargée comme une table
+    vide (chemin bulk rapide), puis INSERT ... SELECT ... ON DUPLICATE KEY
+    UPDATE (MySQL ; INSERT OR REPLACE sous SQLite) en une transaction.
+    """
+    staging = table + SUFFIXE_MAJ
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging};"))
+        conn.execute(text(MOTEUR.sql_staging(staging, table)))
+    try:
+        upload_df(df, staging, engine, table_vide=True)
+        with engine.begin() as conn:
+            conn.execute(text(MOTEUR.sql_upsert(table, list(df.columns), staging)))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging};"))
+
+def _valeurs_filigrane(serie: pd.Series, colonne: str) -> pd.Series:
+    """Valeurs comparables au filigrane : entiers pour les ID_*, dates sinon."""
+    if colonne.startswith('ID_'):
+        return pd.to_numeric(serie).astype('Int64')
+    return pd.to_datetime(serie)
+
+def dependances(tables: list[str]) -> dict:
+    """{table: tables référencées (parmi `tables`) à charger avant elle}."""
+    return {table: {ref for fait, _, ref, _ in CLES_ETRANGERES
+                    if fait == table and ref in tables and ref != table}
+            for table in tables}
+
+def charger_tables(engine: Engine, tables: list[str] = TABLES, chargeur=charger_table,
+                   nb_workers: int = NB_CONNEXIONS, validateur: ValidateurIntegrite | None = None,
+                   nettoyeur: Nettoyeur | None = None, empreintes: dict | None = None) -> dict:
+    """
+    Charge `tables` en parallèle avec chargeur(engine, table, validateur=..., nettoyeur=...,
+    empreintes=...) sur `nb_workers`
+    threads (une connexion du pool chacun). Une table démarre dès que les tables qu'elle référence
+    sont chargées (dimensions avant faits, Fait_Ventes avant Fait_Retours) ;
+    parmi les tables prêtes, les plus grosses sources partent en premier :
+    la durée totale tend vers celle de la plus grosse table.
+    Retourne {table: lignes chargées}.
+    """
+    if MOTEUR.ecrivains_max:
+        nb_workers = min(nb_workers, MOTEUR.ecrivains_max)
+    attentes = dependances(tables)
+    restantes = sorted(tables, key=lambda t: os.path.getsize(source_table(t)[0]), reverse=True)
+    chargees = {}
+    en_cours = {}
+
+    with ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix="chargement") as executor:
+        while restantes or en_cours:
+            for table in [t for t in restantes if attentes[t] <= chargees.keys()]:
+                restantes.remove(table)
+                en_cours[executor.submit(chargeur, engine, table, validateur=validateur, nettoyeur=nettoyeur,
+                                         empreintes=empreintes)] = (table, time.perf_counter())
+
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in termines:
+                table, debut = en_cours.pop(futur)
+                chargees[table] = futur.result()
+                print(f"   ✅ {table} : {chargees[table]} lignes ({time.perf_counter() - debut:.1f} s)")
+    return chargees
+
+def basculer_tables(engine: Engine, tables: list[str] = TABLES) -> None:
+    """
+    Bascule atomique des tables <table>_nouv chargées : un seul RENAME TABLE
+    pour toutes les tables (MySQL ; sous SQLite, ALTER TABLE ... RENAME dans
+    une transaction), aucun état intermédiaire visible, puis suppression
+    des anciennes versions.
+    """
+    renommages = []
+    for table in tables:
+        renommages.append((table, f"{table}{SUFFIXE_ANCIEN}"))
+        renommages.append((f"{table}{SUFFIXE_STAGING}", table))
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}{SUFFIXE_ANCIEN};"))
+        for stmt in MOTEUR.sql_bascule(renommages):
+            conn.execute(text(stmt))
+        for table in tables:
+            conn.execute(text(f"DROP TABLE {table}{SUFFIXE_ANCIEN};"))
+
+def lire_filigrane(engine: Engine, table: str, colonne: str) -> str | None:
+    """
+    Filigrane de `table` : le plus grand entre celui enregistré dans
+    Etat_Chargement et MAX(colonne) de la table (un chargement interrompu
+    avant l'enregistrement ne provoque pas de doublons). None si table vide.
+    """
+    with engine.connect() as conn:
+        enregistre = conn.execute(
+            text("SELECT Filigrane FROM Etat_Chargement WHERE Nom_Table = :t AND Colonne = :c;"),
+            {"t": table, "c": colonne},
+        ).scalar_one_or_none()
+        maximum = conn.execute(text(f"SELECT CAST(MAX({colonne}) AS CHAR) FROM {table};")).scalar_one()
+    candidats = pd.Series([v for v in (enregistre, maximum) if v is not None], dtype=object)
+    if candidats.empty:
+        return None
+    return candidats.iloc[_valeurs_filigrane(candidats, colonne).argmax()]
+
+def lire_empreinte(engine: Engine, table: str, colonne: str) -> "EmpreinteSource | None":
+    """Empreinte des lignes chargées jusqu'au filigrane `colonne` de `table` (None si absente)."""
+    with engine.connect() as conn:
+        texte = conn.execute(
+            text("SELECT Empreinte FROM Etat_Chargement WHERE Nom_Table = :t AND Colonne = :c;"),
+            {"t": table, "c": colonne},
+        ).scalar_one_or_none()
+    return None if texte is None else EmpreinteSource.depuis_texte(texte)
+
+def enregistrer_filigranes(engine: Engine, tables: list[str] = TABLES, empreintes: dict | None = None) -> dict:
+    """
+    Enregistre dans Etat_Chargement le MAX des colonnes filigranes, et avec la
+    première l'empreinte des lignes chargées (`empreintes`, {table: EmpreinteSource} ;
+    NULL si absente : le prochain chargement incrémental sera complet).
+    Retourne {(table, colonne): valeur}.
+    """
+    empreintes = empreintes or {}
+    filigranes = {}
+    with engine.begin() as conn:
+        for table in tables:
+            for i, colonne in enumerate(FILIGRANES.get(table, [])):
+                empreinte = empreintes.get(table) if i == 0 else None
+                conn.execute(text(MOTEUR.sql_upsert(
+                    "Etat_Chargement", ["Nom_Table", "Colonne", "Filigrane", "Date_Chargement", "Empreinte"],
+                    f"(SELECT '{table}' AS Nom_Table, '{colonne}' AS Colonne, "
+                    f"CAST(MAX({colonne}) AS CHAR) AS Filigrane, CURRENT_TIMESTAMP AS Date_Chargement, "
+                    f"{'NULL' if empreinte is None else repr(str(empreinte))} AS Empreinte "
+                    f"FROM {table})",
+                )))
+                filigranes[(table, colonne)] = conn.execute(
+                    text("SELECT Filigrane FROM Etat_Chargement WHERE Nom_Table = :t AND Colonne = :c;"),
+                    {"t": table, "c": colonne},
+                ).scalar_one()
+    return filigranes
+
+def verifier_volumes(engine: Engine, chargees: dict, suffixe: str = "") -> None:
+    """
+    COUNT(*) de chaque <table><suffixe> comparé aux lignes chargées ; lève
+    RuntimeError en cas d'écart (appelé avant la bascule : les tables en
+    service restent en place).
+    """
+    ecarts = []
+    for table, attendu in chargees.items():
+        nb = count_rows(engine, table + suffixe)
+        print(f"   - {table}{suffixe}: {nb} lignes" + ("" if nb == attendu else f" ⚠️ attendu {attendu}"))
+        if nb != attendu:
+            ecarts.append(f"{table}{suffixe} ({nb} lignes pour {attendu})")
+    if ecarts:
+        raise RuntimeError(f"Volumes incohérents, bascule annulée : {', '.join(ecarts)}")
+
+def creer_nettoyeur_sources() -> Nettoyeur | None:
+    """Nettoyeur des lots selon NETTOYAGE (None : sources brutes)."""
+    return creer_nettoyeur(CLES_ETRANGERES, SOURCES_DIR) if NETTOYAGE == "oui" else None
+
+def creer_validateur() -> ValidateurIntegrite | None:
+    """Validateur des lots selon VALIDATION (None : pas de contrôle)."""
+    if VALIDATION == "aucune":
+        return None
+    return ValidateurIntegrite(CLES_PRIMAIRES, CLES_ETRANGERES, bloquant=VALIDATION == "bloquer")
+
+def compter_orphelins(engine: Engine, tables: list[str] = TABLES) -> list[tuple]:
+    """(fait, colonne, référence, nb orphelins) de chaque clé étrangère logique (NULL exclus)."""
+    resultats = []
+    with engine.connect() as conn:
+        for fait, colonne, ref, cle in CLES_ETRANGERES:
+            if fait not in tables or ref not in tables:
+                continue
+            nb = conn.execute(text(f"""
+                SELECT COUNT(*)
+                FROM {fait} f
+                LEFT JOIN {ref} r ON f.{colonne} = r.{cle}
+                WHERE f.{colonne} IS NOT NULL AND r.{cle} IS NULL;
+            """)).scalar_one()
+            resultats.append((fait, colonne, ref, int(nb)))
+    return resultats
+
+
 # ============================================
 # MAIN
 # ============================================
 
 def main():
+    instrumentation = Instrumentation('upload_to_sql', dossier_profil=PROFIL_UPLOAD)
+    instrumentation.parametres = {'moteur': MOTEUR.nom, 'base': SQLITE_PATH if DB_BACKEND == "sqlite" else DB_NAME,
+                                  'hote': DB_HOST, 'schema': SQL_SCHEMA_PATH}
+    with activer(instrumentation):
+        charger()
+
+    instrumentation.afficher_resume()
+    if RAPPORT_UPLOAD:
+        instrumentation.ecrire_rapport(RAPPORT_UPLOAD)
+        print(f"📝 Rapport d'exécution : {RAPPORT_UPLOAD}")
+
+def charger_tables_validees(engine: Engine, chargeur, validateur: ValidateurIntegrite | None,
+                            nettoyeur: Nettoyeur | None, empreintes: dict | None = None) -> dict:
+    """
+    charger_tables() puis résumés du nettoyage et des contrôles d'intégrité
+    (affichés aussi si un lot est rejeté).
+    """
+    try:
+        return charger_tables(engine, TABLES, chargeur=chargeur, validateur=validateur, nettoyeur=nettoyeur,
+                              empreintes=empreintes)
+    except ErreurIntegrite as exc:
+        print(f"⛔ Lot rejeté avant chargement : {exc}")
+        raise
+    finally:
+        if nettoyeur:
+            nettoyeur.resume()
+        if validateur:
+            # le nettoyage fusionne les doublons avant contrôle : ses fusions complètent le résumé
+            if nettoyeur:
+                validateur.signaler_fusions(nettoyeur.correspondance_clients)
+            validateur.resume()
+
+def charger() -> dict:
+    """Schéma, chargement, agrégats et filigranes ; retourne {table: lignes envoyées}."""
     print("🔧 (1) Création base si nécessaire...")
     create_database_if_not_exists()
 
-    print("🔌 (2) Connexion MySQL...")
+    print(f"🔌 (2) Connexion {MOTEUR.nom} (pool de {NB_CONNEXIONS} connexions)...")
     engine = make_engine()
 
     print("🏗️ (3) Exécution du schéma base_ventes.sql...")
     execute_schema(engine, SQL_SCHEMA_PATH)
 
-    print("📥 (4) Lecture Excel : Dim_Client + Fait_Ventes...")
-    df_clients = read_excel(DIM_CLIENT_XLSX, "Dim_Client")
-    df_ventes = read_excel(FAIT_VENTES_XLSX, "Fait_Ventes")
-
-    # Optionnel mais conseillé : forcer certains types
-    # df_clients["ID_Client"] = df_clients["ID_Client"].astype("Int64")
-    # df_ventes["ID_Vente"] = df_ventes["ID_Vente"].astype("Int64")
-
-    print("🧹 (5) Nettoyage/chargement : TRUNCATE puis INSERT...")
-    truncate_table(engine, T_FAIT_VENTES)
-    truncate_table(engine, T_DIM_CLIENT)
-
-    # Charger dimensions d'abord, puis faits
-    upload_df(df_clients, T_DIM_CLIENT, engine)
-    upload_df(df_ventes, T_FAIT_VENTES, engine)
-
-    print("✅ (6) Vérification volumes...")
-    print(f"   - {T_DIM_CLIENT}: {count_rows(engine, T_DIM_CLIENT)} lignes")
-    print(f"   - {T_FAIT_VENTES}: {count_rows(engine, T_FAIT_VENTES)} lignes")
+    incremental = MODE_RAFRAICHISSEMENT == "incremental"
+    empreintes = {}
+    nb_ecrivains = min(NB_CONNEXIONS, MOTEUR.ecrivains_max or NB_CONNEXIONS)
+    if incremental:
+        # filigranes avant chargement : dates des nouvelles lignes pour les agrégats
+        filigranes_avant = {table: lire_filigrane(engine, table, colonnes[0])
+                            for table, colonnes in FILIGRANES.items()}
+        print(f"📥 (4) Chargement incrémental des {len(TABLES)} tables "
+              f"({MODE_CHARGEMENT}, {nb_ecrivains} en parallèle) : upsert des dimensions, "
+              "ajout des faits au-delà des filigranes...")
+        try:
+            chargees = charger_tables_validees(engine, charger_table_incrementale,
+                                               creer_validateur(), creer_nettoyeur_sources(), empreintes)
+            print(f"🗂️ Index secondaires : {create_indexes(engine, SQL_SCHEMA_PATH)} créés après chargement")
+        except SourceRegeneree as exc:
+            # lignes connues modifiées : les faits et les dimensions upsertées ne sont plus
+            # cohérents, le rechargement complet remplace toutes les tables
+            print(f"⚠️ {exc} -> rechargement complet")
+            incremental = False
+            empreintes = {}
+
+    if not incremental:
+        print(f"📥 (4) Rechargement complet des {len(TABLES)} tables dans les tables "
+              f"*{SUFFIXE_STAGING} ({MODE_CHARGEMENT}, {nb_ecrivains} en parallèle)...")
+        execute_schema(engine, SQL_SCHEMA_PATH, suffixe=SUFFIXE_STAGING)
+        chargees = charger_tables_validees(engine, charger_table_staging,
+                                           creer_validateur(), creer_nettoyeur_sources(), empreintes)
+        if MOTEUR.index_avant_bascule:
+            nb_index = create_indexes(engine, SQL_SCHEMA_PATH, suffixe=SUFFIXE_STAGING)
+        print(f"✅ (5) Vérification volumes des tables *{SUFFIXE_STAGING} avant bascule...")
+        verifier_volumes(engine, chargees, SUFFIXE_STAGING)
+        print("🔀 Bascule atomique des tables (RENAME TABLE)...")
+        basculer_tables(engine, TABLES)
+        if not MOTEUR.index_avant_bascule:
+            nb_index = create_indexes(engine, SQL_SCHEMA_PATH)
+        print(f"🗂️ Index secondaires : {nb_index} créés après chargement")
+
+    if incremental:
+        print("✅ (5) Volumes...")
+        for table in TABLES:
+            print(f"   - {table}: {count_rows(engine, table)} lignes ({chargees[table]} envoyées)")
+
+    print("📊 (6) Agrégats des tableaux de bord "
+          f"({'dates touchées' if incremental else 'reconstruction'})...")
+    maintenir_agregats(engine, filigranes_avant if incremental else None,
+                       chemin_objectifs=os.path.join(SOURCES_DIR, "Objectifs_Mensuels.xlsx"))
+
+    for (table, colonne), valeur in enregistrer_filigranes(engine, TABLES, empreintes).items():
+        print(f"🔖 Filigrane {table}.{colonne} = {valeur}")
 
     # Vérif FK logique (même si pas encore FK en DB)
-    with engine.connect() as conn:
-        missing = conn.execute(text(f"""
-            SELECT COUNT(*)
-            FROM {T_FAIT_VENTES} v
-            LEFT JOIN {T_DIM_CLIENT} c ON v.ID_Client = c.ID_Client
-            WHERE c.ID_Client IS NULL;
-        """)).scalar_one()
-    print(f"🔎 Ventes avec ID_Client absent dans Dim_Client : {int(missing)} (attendu: 0)")
-
-    print("\n🎉 Terminé : schéma créé + Dim_Client & Fait_Ventes chargées dans MySQL.")
+    for fait, colonne, ref, nb in compter_orphelins(engine):
+        print(f"🔎 {fait}.{colonne} absent de {ref} : {nb} (attendu: 0)")
+
+    print(f"\n🎉 Terminé : schéma créé + {len(TABLES)} tables chargées dans {MOTEUR.nom} + agrégats à jour.")
+    return chargees
 
 if __name__ == "__main__":
     main()
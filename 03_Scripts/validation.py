@@ -0,0 +1,196 @@
+"""
+Contrôles d'intégrité avant chargement, en mémoire et vectorisés.
+
+Chaque lot lu est contrôlé avant d'être envoyé à la base :
+- clés primaires : pas de doublon dans le lot ni avec les lots déjà vus ;
+- clés étrangères : chaque ID_* non NULL d'un fait existe dans la table
+  référencée (ensembles de clés hachés, pd.Index + isin : un seul passage
+  vectorisé par colonne, sans jointure SQL) ;
+- doublons clients : empreinte (hash 64 bits) des champs d'identité
+  normalisés (nom complet, email, date d'inscription).
+
+Les tables sont contrôlées dans l'ordre de chargement (dimensions avant
+faits, Fait_Ventes avant Fait_Retours) : les clés d'une table référencée
+sont enregistrées au fil de sa lecture.
+
+Utilisation autonome (lit les sources sans rien charger) :
+    python validation.py            # code de sortie 1 si anomalie
+"""
+
+import sys
+import threading
+
+import pandas as pd
+
+# Champs d'identité d'un client (doublons : mêmes valeurs une fois normalisées)
+COLONNES_IDENTITE = ['Nom_Complet', 'Email', 'Date_Inscription']
+NB_EXEMPLES = 5
+
+
+class ErreurIntegrite(ValueError):
+    """Lot rejeté avant chargement (clé étrangère orpheline, clé primaire en double)."""
+
+
+def normaliser_texte(serie: pd.Series) -> pd.Series:
+    """Minuscules, sans accents, espaces réduits : "  Fès  El-Bali" -> "fes el-bali"."""
+    return (serie.astype('string')
+            .str.normalize('NFKD')
+            .str.replace('[\u0300-\u036f]', '', regex=True)
+            .str.lower()
+            .str.strip()
+            .str.replace(r'\s+', ' ', regex=True))
+
+def empreintes_identite(clients: pd.DataFrame, colonnes=COLONNES_IDENTITE) -> pd.Series:
+    """Hash 64 bits par client des champs d'identité normalisés (NULL -> chaîne vide)."""
+    normalises = pd.DataFrame({col: normaliser_texte(clients[col]).fillna('') for col in colonnes})
+    return pd.util.hash_pandas_object(normalises, index=False)
+
+def doublons_clients(clients: pd.DataFrame, colonnes=COLONNES_IDENTITE) -> pd.DataFrame:
+    """
+    Clients en double : (ID_Client, ID_Client_Reference), la référence étant
+    le plus petit ID_Client de même empreinte.
+    """
+    empreintes = empreintes_identite(clients, colonnes)
+    ids = clients['ID_Client'].to_numpy()
+    reference = pd.Series(ids).groupby(empreintes.to_numpy()).transform('min').to_numpy()
+    masque = ids != reference
+    return pd.DataFrame({'ID_Client': ids[masque], 'ID_Client_Reference': reference[masque]})
+
+
+class ValidateurIntegrite:
+    """
+    Contrôle les lots de chaque table avant chargement.
+
+    cles_primaires : {table: colonne clé} ; cles_etrangeres : liste de
+    (table, colonne, table référencée, clé référencée).
+    bloquant : lever ErreurIntegrite à la première anomalie (sinon, les
+    anomalies sont seulement enregistrées ; les doublons clients ne
+    bloquent jamais).
+    """
+
+    def __init__(self, cles_primaires: dict, cles_etrangeres: list, bloquant: bool = True):
+        self.cles_primaires = cles_primaires
+        self.cles_etrangeres = cles_etrangeres
+        self.bloquant = bloquant
+        self.anomalies = []
+        self.doublons = pd.DataFrame(columns=['ID_Client', 'ID_Client_Reference'])
+        self.fusions = pd.DataFrame(columns=['ID_Client', 'ID_Client_Reference'])
+        self._lots_cles = {}      # table -> [tableaux de clés des lots vus]
+        self._index = {}          # table -> pd.Index des clés (construit à la demande)
+        self._empreintes = []     # Dim_Client : (empreintes, ID_Client) des lots vus
+        self._verrou = threading.Lock()
+
+    def cles(self, table: str) -> pd.Index:
+        """Ensemble haché des clés vues de `table`."""
+        with self._verrou:
+            if table not in self._index:
+                lots = self._lots_cles.get(table, [])
+                valeurs = pd.concat(lots, ignore_index=True) if lots else pd.Series([], dtype='Int64')
+                self._index[table] = pd.Index(valeurs.dropna().unique())
+            return self._index[table]
+
+    def _signaler(self, table: str, controle: str, colonne: str, valeurs: pd.Series,
+                  reference: str | None = None) -> None:
+        anomalie = {
+            'table': table, 'controle': controle, 'colonne': colonne, 'reference': reference,
+            'nb': int(len(valeurs)), 'exemples': [int(v) for v in valeurs.unique()[:NB_EXEMPLES]],
+        }
+        with self._verrou:
+            self.anomalies.append(anomalie)
+        if self.bloquant:
+            raise ErreurIntegrite(f"{table}.{colonne} : {anomalie['nb']} {controle} "
+                                  f"(ex. {anomalie['exemples']})")
+
+    def enregistrer(self, table: str, lot: pd.DataFrame) -> None:
+        """Clés primaires du lot : contrôle d'unicité puis ajout à l'ensemble de la table."""
+        colonne = self.cles_primaires.get(table)
+        if colonne is None or colonne not in lot.columns:
+            return
+        cles = lot[colonne]
+        deja_vues = cles[cles.isin(self.cles(table))]
+        en_double = cles[cles.duplicated()]
+        doubles = pd.concat([deja_vues, en_double])
+        with self._verrou:
+            self._lots_cles.setdefault(table, []).append(cles)
+            self._index.pop(table, None)
+        if len(doubles):
+            self._signaler(table, "clés primaires en double", colonne, doubles)
+
+        if table == 'Dim_Client':
+            self._enregistrer_clients(lot)
+
+    def _enregistrer_clients(self, lot: pd.DataFrame) -> None:
+        """Doublons clients (informatifs : le nettoyage ETL les fusionne)."""
+        if not set(COLONNES_IDENTITE) <= set(lot.columns):
+            return
+        with self._verrou:
+            self._empreintes.append(pd.DataFrame({'Empreinte': empreintes_identite(lot).to_numpy(),
+                                                  'ID_Client': lot['ID_Client'].to_numpy()}))
+            vus = pd.concat(self._empreintes, ignore_index=True)
+        reference = vus.groupby('Empreinte')['ID_Client'].transform('min')
+        masque = (vus['ID_Client'] != reference).to_numpy()
+        self.doublons = pd.DataFrame({'ID_Client': vus['ID_Client'].to_numpy()[masque],
+                                      'ID_Client_Reference': reference.to_numpy()[masque]})
+
+    def verifier(self, table: str, lot: pd.DataFrame) -> None:
+        """Clés étrangères du lot (NULL acceptés) contre les clés des tables référencées."""
+        for fait, colonne, ref, _ in self.cles_etrangeres:
+            if fait != table or colonne not in lot.columns:
+                continue
+            valeurs = lot[colonne].dropna()
+            orphelins = valeurs[~valeurs.isin(self.cles(ref))]
+            if len(orphelins):
+                self._signaler(table, "clés absentes de la référence", colonne, orphelins, ref)
+
+    def controler(self, table: str, lot: pd.DataFrame, a_verifier: pd.DataFrame | None = None) -> None:
+        """enregistrer(lot) puis verifier(a_verifier, par défaut le lot entier)."""
+        self.enregistrer(table, lot)
+        self.verifier(table, lot if a_verifier is None else a_verifier)
+
+    def signaler_fusions(self, correspondance: pd.Series) -> None:
+        """
+        Doublons clients déjà fusionnés en amont (nettoyage.py) :
+        {ID_Client fusionné: ID_Client survivant}, repris dans le résumé.
+        """
+        self.fusions = pd.DataFrame({'ID_Client': correspondance.index.to_numpy(),
+                                     'ID_Client_Reference': correspondance.to_numpy()})
+
+    def resume(self) -> None:
+        fusionnes = f" ({len(self.fusions)} fusionné(s) par le nettoyage)" if len(self.fusions) else ""
+        print(f"🧪 Intégrité avant chargement : {len(self.anomalies)} anomalie(s), "
+              f"{len(self.doublons)} doublon(s) client restant(s){fusionnes}")
+        for a in self.anomalies:
+            cible = f" -> {a['reference']}" if a['reference'] else ""
+            print(f"   ⚠️ {a['table']}.{a['colonne']}{cible} : {a['nb']} {a['controle']} (ex. {a['exemples']})")
+        for libelle, doublons in (("Doublons clients", self.doublons),
+                                  ("Clients fusionnés", self.fusions)):
+            if len(doublons):
+                exemples = doublons.head(NB_EXEMPLES).itertuples(index=False)
+                print(f"   👥 {libelle} (ID -> référence) : "
+                      + ", ".join(f"{i} -> {r}" for i, r in exemples))
+
+
+# ============================================
+# MAIN : contrôle des sources sans chargement
+# ============================================
+
+def main():
+    from upload_to_sql import CLES_ETRANGERES, CLES_PRIMAIRES, TABLES, dependances, lire_source
+
+    validateur = ValidateurIntegrite(CLES_PRIMAIRES, CLES_ETRANGERES, bloquant=False)
+    attentes = dependances(TABLES)
+    restantes = list(TABLES)
+    while restantes:
+        table = next(t for t in restantes if not attentes[t] & set(restantes))
+        restantes.remove(table)
+        nb_lignes = 0
+        for lot in lire_source(table):
+            validateur.controler(table, lot)
+            nb_lignes += len(lot)
+        print(f"   ✅ {table} : {nb_lignes} lignes contrôlées")
+
+    validateur.resume()
+    sys.exit(1 if validateur.anomalies else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Configuration commune des tests : scripts de 03_Scripts importables, base
+SQLite et sources dans des dossiers temporaires (jamais 02_Donnees).
+
+    python -m pytest -q        # depuis la racine du dépôt
+"""
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+DOSSIER_SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "03_Scripts")
+sys.path.insert(0, DOSSIER_SCRIPTS)
+
+# Lues à l'import de upload_to_sql : à fixer avant tout import des scripts
+_TEMPORAIRE = tempfile.mkdtemp(prefix="ecommerce_tests_")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_TEMPORAIRE, "entrepot.db")
+os.environ["SOURCES_DIR"] = os.path.join(_TEMPORAIRE, "Sources")
+
+from gen_data import ParametresGeneration, executer  # noqa: E402
+import upload_to_sql  # noqa: E402
+from moteurs_sql import creer_moteur  # noqa: E402
+
+# Petit jeu : quelques secondes par génération, plusieurs shards par fait
+VOLUMES_TEST = dict(nb_clients=300, nb_produits=40, nb_transactions=3000,
+                    nb_sessions_web=3000, taille_chunk=1000)
+
+
+def generer_sources(dossier, **options) -> str:
+    """Génère le petit jeu de test dans `dossier` ; retourne son chemin."""
+    executer(ParametresGeneration(output_path=str(dossier), **{**VOLUMES_TEST, **options}))
+    return str(dossier)
+
+def lire_tables(dossier: str, monkeypatch) -> dict:
+    """{table: DataFrame} de chaque source, relue comme par upload_to_sql (tous formats)."""
+    monkeypatch.setattr(upload_to_sql, "SOURCES_DIR", dossier)
+    return {table: pd.concat(upload_to_sql.lire_source(table), ignore_index=True)
+            for table in upload_to_sql.TABLES}
+
+def utiliser_sources(monkeypatch, dossier: str) -> str:
+    monkeypatch.setattr(upload_to_sql, "SOURCES_DIR", dossier)
+    monkeypatch.setattr(upload_to_sql, "SQL_SCHEMA_PATH", f"{dossier}/base_ventes.sql")
+    return dossier
+
+def compter(tables) -> dict:
+    engine = upload_to_sql.make_engine()
+    try:
+        return {table: upload_to_sql.count_rows(engine, table) for table in tables}
+    finally:
+        engine.dispose()
+
+def lire_table(requete: str) -> pd.DataFrame:
+    engine = upload_to_sql.make_engine()
+    try:
+        with engine.connect() as conn:
+            return pd.read_sql(requete, conn)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """upload_to_sql pointé sur une base SQLite temporaire, en rechargement complet."""
+    monkeypatch.setattr(upload_to_sql, "MOTEUR", creer_moteur("sqlite", chemin=str(tmp_path / "entrepot.db")))
+    monkeypatch.setattr(upload_to_sql, "MODE_RAFRAICHISSEMENT", "complet")
+
+@pytest.fixture
+def entrepot(base, tmp_path, monkeypatch):
+    """Petit jeu de sources temporaire, lu par upload_to_sql."""
+    return utiliser_sources(monkeypatch, generer_sources(tmp_path / "Sources"))
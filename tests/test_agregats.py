@@ -0,0 +1,61 @@
+"""Agrégats des tableaux de bord : recalcul incrémental des seules dates touchées."""
+
+import pandas as pd
+
+import upload_to_sql
+from agregats import maintenir_agregats
+from conftest import lire_table
+
+AGREGATS_JOUR = {
+    'Agg_Ventes_Jour': ['ID_Date', 'ID_Canal', 'Categorie', 'Ville'],
+    'Agg_Retours_Jour': ['ID_Date', 'ID_Motif'],
+    'Agg_Funnel_Jour': ['ID_Date'],
+}
+
+
+def lire_agregats() -> dict:
+    return {agregat: lire_table(f"SELECT * FROM {agregat}").sort_values(cles, ignore_index=True)
+            for agregat, cles in AGREGATS_JOUR.items()}
+
+def du_jour(df: pd.DataFrame, id_date: int, egal: bool = True) -> pd.DataFrame:
+    return df[(df['ID_Date'] == id_date) == egal].reset_index(drop=True)
+
+def ajouter_faits(engine, table: str, cle: str, colonne_date: str, id_date: int, nb: int) -> None:
+    """Copies des `nb` premières lignes de `table`, à de nouvelles clés et à la date `id_date`."""
+    with engine.connect() as conn:
+        lignes = pd.read_sql(f"SELECT * FROM {table} ORDER BY {cle} LIMIT {nb}", conn)
+        maximum = conn.exec_driver_sql(f"SELECT MAX({cle}) FROM {table}").scalar_one()
+    lignes[cle] = range(maximum + 1, maximum + 1 + nb)
+    lignes[colonne_date] = id_date
+    with engine.begin() as conn:
+        lignes.to_sql(table, conn, if_exists="append", index=False)
+
+
+def test_incremental_ne_recalcule_que_la_date_touchee(entrepot):
+    upload_to_sql.charger()
+    avant = lire_agregats()
+
+    engine = upload_to_sql.make_engine()
+    try:
+        filigranes = {fait: upload_to_sql.lire_filigrane(engine, fait, colonnes[0])
+                      for fait, colonnes in upload_to_sql.FILIGRANES.items()}
+        # une date déjà vendue : ses lignes d'agrégat sont remplacées, pas dupliquées
+        id_date = int(avant['Agg_Ventes_Jour']['ID_Date'].iloc[0])
+        ajouter_faits(engine, 'Fait_Ventes', 'ID_Vente', 'ID_Date', id_date, 5)
+        ajouter_faits(engine, 'Fait_Retours', 'ID_Retour', 'ID_Date_Retour', id_date, 3)
+
+        maintenir_agregats(engine, filigranes)
+        incremental = lire_agregats()
+        maintenir_agregats(engine, None)
+        reconstruit = lire_agregats()
+    finally:
+        engine.dispose()
+
+    for agregat in AGREGATS_JOUR:
+        pd.testing.assert_frame_equal(incremental[agregat], reconstruit[agregat], obj=agregat)
+        pd.testing.assert_frame_equal(du_jour(incremental[agregat], id_date, egal=False),
+                                      du_jour(avant[agregat], id_date, egal=False), obj=agregat)
+
+    ventes, retours = (du_jour(incremental[a], id_date) for a in ('Agg_Ventes_Jour', 'Agg_Retours_Jour'))
+    assert ventes['Nb_Ventes'].sum() == du_jour(avant['Agg_Ventes_Jour'], id_date)['Nb_Ventes'].sum() + 5
+    assert retours['Nb_Retours'].sum() == du_jour(avant['Agg_Retours_Jour'], id_date)['Nb_Retours'].sum() + 3
@@ -0,0 +1,29 @@
+"""Générateur : un même seed donne les mêmes sources quel que soit le mode d'exécution."""
+
+import pandas as pd
+import pytest
+
+from conftest import generer_sources, lire_tables
+
+
+def assert_memes_tables(attendu: dict, obtenu: dict) -> None:
+    assert attendu.keys() == obtenu.keys()
+    for table in attendu:
+        pd.testing.assert_frame_equal(attendu[table], obtenu[table], obj=table)
+
+
+def test_sharde_identique_quel_que_soit_nb_workers(tmp_path, monkeypatch):
+    un_worker = generer_sources(tmp_path / "w1", sharde=True, nb_workers=1)
+    trois_workers = generer_sources(tmp_path / "w3", sharde=True, nb_workers=3)
+
+    tables = lire_tables(un_worker, monkeypatch)
+    assert len(tables['Fait_Ventes']) == 3000
+    assert_memes_tables(tables, lire_tables(trois_workers, monkeypatch))
+
+
+@pytest.mark.parametrize("streaming", [False, True], ids=["en_memoire", "streaming"])
+def test_schema_compact_memes_sources(tmp_path, monkeypatch, streaming):
+    normal = generer_sources(tmp_path / "normal", streaming=streaming)
+    compact = generer_sources(tmp_path / "compact", streaming=streaming, schema_compact=True)
+
+    assert_memes_tables(lire_tables(normal, monkeypatch), lire_tables(compact, monkeypatch))
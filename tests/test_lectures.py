@@ -0,0 +1,26 @@
+"""Lecteurs par lots (lectures.py)."""
+
+import pandas as pd
+
+from lectures import lire_excel_par_lots
+
+
+def test_excel_types_du_schema_identiques_dans_tous_les_lots(tmp_path):
+    chemin = tmp_path / "Fait_Ventes.xlsx"
+    # vides uniquement dans le 2e lot ; prix entiers dans le 1er
+    pd.DataFrame({
+        'ID_Vente': [1, 2, 3, 4],
+        'Quantite': [1, 2, None, 4],
+        'Montant_HT': [100.0, 200.0, 99.5, None],
+        'Telephone': ['+212612345678'] * 4,
+    }).to_excel(chemin, sheet_name='Fait_Ventes', index=False)
+
+    types = {'ID_Vente': 'Int64', 'Quantite': 'Int64', 'Montant_HT': 'float64'}
+    lots = list(lire_excel_par_lots(str(chemin), 'Fait_Ventes', taille_lot=2, types=types))
+
+    assert len(lots) == 2
+    for lot in lots:
+        assert {col: str(lot[col].dtype) for col in types} == types
+    assert lots[0]['Montant_HT'].tolist() == [100.0, 200.0]
+    assert lots[1]['Quantite'].isna().tolist() == [True, False]
+    assert lots[0]['Telephone'].iloc[0] == '+212612345678'
@@ -0,0 +1,84 @@
+"""Règles de nettoyage (nettoyage.py) sur de petits lots construits à la main."""
+
+import pandas as pd
+
+from nettoyage import VILLE_INCONNUE, Nettoyeur, dedoublonner_clients, normaliser_telephones
+
+CLES_ETRANGERES = [('Fait_Ventes', 'ID_Client', 'Dim_Client', 'ID_Client')]
+REFERENTIEL_GEO = pd.DataFrame({'Ville': ['Casablanca', 'Fès'], 'Code_Postal': ['20000', '30000']})
+
+
+def clients(*lignes) -> pd.DataFrame:
+    colonnes = ['ID_Client', 'Nom_Complet', 'Email', 'Date_Inscription', 'Telephone', 'Ville', 'Code_Postal']
+    return pd.DataFrame(list(lignes), columns=colonnes)
+
+CLIENTS = clients(
+    (1, 'Amine Alami', 'amine@mail.ma', '2023-01-05', None, 'Casablanca', None),
+    (2, 'Sara Bennani', 'sara@mail.ma', '2023-02-10', '00212 661 23 45 67', None, '30000'),
+    # doublon de 1 (espaces, casse), plus complet mais sans ville
+    (3, '  AMINE   alami ', 'Amine@Mail.ma', '2023-01-05', '0612345678', None, '20000'),
+    (4, 'Omar Idrissi', 'omar@mail.ma', '2023-03-15', '212700112233', None, None),
+)
+
+
+def nettoyer_clients() -> tuple[Nettoyeur, pd.DataFrame]:
+    nettoyeur = Nettoyeur(CLES_ETRANGERES, REFERENTIEL_GEO)
+    # deux lots : Dim_Client est dédoublonnée sur la table entière
+    lots = [CLIENTS.iloc[:2], CLIENTS.iloc[2:]]
+    return nettoyeur, pd.concat(nettoyeur.nettoyer('Dim_Client', lots), ignore_index=True)
+
+
+def test_dedoublonnage_survivant_le_plus_complet():
+    nettoyeur, resultat = nettoyer_clients()
+
+    assert resultat['ID_Client'].tolist() == [2, 3, 4]
+    assert nettoyeur.correspondance_clients.to_dict() == {1: 3}
+    survivant = resultat.set_index('ID_Client').loc[3]
+    assert survivant['Ville'] == 'Casablanca'          # NULL complété par la fiche 1
+    assert survivant['Telephone'] == '+212612345678'
+
+def test_dedoublonnage_a_egalite_plus_petit_id():
+    doublons = clients((7, 'Lina Tazi', 'lina@mail.ma', '2023-04-01', None, 'Rabat', None),
+                       (5, 'lina tazi', 'LINA@mail.ma', '2023-04-01', '0611111111', None, None))
+
+    survivants, correspondance = dedoublonner_clients(doublons)
+    assert survivants['ID_Client'].tolist() == [5]
+    assert correspondance.to_dict() == {7: 5}
+    assert survivants.loc[0, 'Ville'] == 'Rabat'
+
+def test_faits_rediriges_vers_le_survivant():
+    nettoyeur, _ = nettoyer_clients()
+    ventes = pd.DataFrame({'ID_Vente': [10, 11, 12, 13], 'ID_Client': [1, 2, 3, 1]})
+
+    resultat = nettoyeur.nettoyer_lot('Fait_Ventes', ventes)
+    assert resultat['ID_Client'].tolist() == [3, 2, 3, 3]
+    assert ventes['ID_Client'].tolist() == [1, 2, 3, 1]     # lot source intact
+    assert nettoyeur.rapport['Fait_Ventes']['clients_fusionnes'] == 2
+
+def test_normaliser_telephones():
+    numeros = pd.Series(['0612345678', '00212612345678', '212612345678', '+212 6 12 34 56 78',
+                         '06-12-34-56-78', '12345', None], dtype='string')
+
+    resultat = normaliser_telephones(numeros)
+    assert resultat.iloc[:5].tolist() == ['+212612345678'] * 5
+    assert resultat.iloc[5] == '12345'                       # non reconnu : inchangé
+    assert pd.isna(resultat.iloc[6])
+
+def test_villes_imputees_par_code_postal():
+    _, resultat = nettoyer_clients()
+    villes = resultat.set_index('ID_Client')['Ville']
+
+    assert villes[2] == 'Fès'                                # 30000
+    assert villes[4] == VILLE_INCONNUE                       # ni ville ni code postal
+
+def test_rapport_par_regle():
+    nettoyeur, _ = nettoyer_clients()
+
+    rapport = nettoyeur.rapport['Dim_Client']
+    assert rapport['textes'] == 1
+    assert rapport['doublons'] == 1
+    assert rapport['completes_par_doublon'] == 1
+    assert rapport['emails'] == 1
+    assert rapport['telephones'] == 3
+    assert rapport['villes_imputees'] == 1
+    assert rapport['villes_manquantes'] == 1
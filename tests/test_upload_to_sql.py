@@ -0,0 +1,92 @@
+"""Chargement de bout en bout sur SQLite : rechargement complet puis incrémental."""
+
+from datetime import datetime
+
+import pytest
+
+import upload_to_sql
+from conftest import compter, generer_sources, lire_table, lire_tables, utiliser_sources
+
+FAITS = [t for t in upload_to_sql.TABLES if t.startswith('Fait_')]
+
+
+def nb_faits(sources: str, monkeypatch) -> dict:
+    return {table: len(df) for table, df in lire_tables(sources, monkeypatch).items() if table in FAITS}
+
+
+def test_complet_puis_incremental_sans_nouveaux_faits(entrepot, monkeypatch):
+    attendus = nb_faits(entrepot, monkeypatch)
+
+    envoyees = upload_to_sql.charger()
+    assert {table: envoyees[table] for table in FAITS} == attendus
+    assert compter(upload_to_sql.TABLES) == envoyees
+    assert compter(['Agg_Ventes_Jour'])['Agg_Ventes_Jour'] > 0
+    engine = upload_to_sql.make_engine()
+    try:
+        assert all(nb == 0 for *_, nb in upload_to_sql.compter_orphelins(engine))
+    finally:
+        engine.dispose()
+
+    # mêmes sources : rien au-delà des filigranes
+    monkeypatch.setattr(upload_to_sql, "MODE_RAFRAICHISSEMENT", "incremental")
+    envoyees = upload_to_sql.charger()
+    assert {table: envoyees[table] for table in FAITS} == dict.fromkeys(FAITS, 0)
+    assert compter(FAITS) == attendus
+
+
+def test_source_regeneree_au_dela_du_filigrane(entrepot, tmp_path, monkeypatch):
+    upload_to_sql.charger()
+
+    # autre seed, plus de ventes : les ID dépassent le filigrane, les lignes connues ont changé
+    regeneree = utiliser_sources(monkeypatch, generer_sources(tmp_path / "Regeneree", seed=7,
+                                                              nb_transactions=4000))
+    engine = upload_to_sql.make_engine()
+    try:
+        with pytest.raises(upload_to_sql.SourceRegeneree):
+            upload_to_sql.charger_table_incrementale(engine, 'Fait_Ventes',
+                                                     nettoyeur=upload_to_sql.creer_nettoyeur_sources())
+    finally:
+        engine.dispose()
+    assert compter(['Fait_Ventes'])['Fait_Ventes'] == 3000   # rien d'envoyé
+
+    # charger() se replie sur le rechargement complet : l'entrepôt reflète la nouvelle source
+    monkeypatch.setattr(upload_to_sql, "MODE_RAFRAICHISSEMENT", "incremental")
+    attendus = nb_faits(regeneree, monkeypatch)
+    envoyees = upload_to_sql.charger()
+    assert {table: envoyees[table] for table in FAITS} == attendus
+    source = lire_tables(regeneree, monkeypatch)['Fait_Ventes']
+    chargee = lire_table("SELECT ID_Vente, ID_Produit FROM Fait_Ventes ORDER BY ID_Vente")
+    assert chargee['ID_Produit'].tolist() == source.sort_values('ID_Vente')['ID_Produit'].tolist()
+
+
+def test_stock_complete_charge_en_incremental(base, tmp_path, monkeypatch):
+    dossier = tmp_path / "Sources"
+    utiliser_sources(monkeypatch, generer_sources(dossier, date_fin=datetime(2024, 6, 30),
+                                                  stock_incremental=True))
+    upload_to_sql.charger()
+    avant = compter(FAITS)
+
+    # semaines ajoutées à Fait_Stock.csv : lignes connues intactes, pas de repli
+    generer_sources(dossier, tables=['Dim_Temps', 'Fait_Stock'], stock_incremental=True)
+    monkeypatch.setattr(upload_to_sql, "MODE_RAFRAICHISSEMENT", "incremental")
+    envoyees = upload_to_sql.charger()
+    assert envoyees['Fait_Stock'] > 0
+    assert {table: envoyees[table] for table in FAITS if table != 'Fait_Stock'} == \
+        {table: 0 for table in FAITS if table != 'Fait_Stock'}
+    assert compter(['Fait_Stock'])['Fait_Stock'] == avant['Fait_Stock'] + envoyees['Fait_Stock']
+
+
+def test_chargement_incomplet_pas_de_bascule(entrepot, monkeypatch):
+    upload_to_sql.charger()
+    avant = compter(upload_to_sql.TABLES)
+
+    # pilote qui perd une ligne par lot de Fait_Retours sans le signaler
+    insert = upload_to_sql.upload_df_insert
+    def insert_tronque(df, table, engine):
+        insert(df.iloc[:-1] if table.startswith('Fait_Retours') else df, table, engine)
+        return None
+    monkeypatch.setattr(upload_to_sql, "upload_df_insert", insert_tronque)
+
+    with pytest.raises(RuntimeError, match="bascule annulée"):
+        upload_to_sql.charger()
+    assert compter(upload_to_sql.TABLES) == avant
@@ -0,0 +1,57 @@
+"""Contrôles d'intégrité avant chargement (validation.py)."""
+
+import pandas as pd
+import pytest
+
+from validation import ErreurIntegrite, ValidateurIntegrite, doublons_clients
+
+CLES_PRIMAIRES = {'Dim_Produit': 'ID_Produit', 'Fait_Ventes': 'ID_Vente', 'Fait_Retours': 'ID_Retour'}
+CLES_ETRANGERES = [
+    ('Fait_Ventes', 'ID_Produit', 'Dim_Produit', 'ID_Produit'),
+    ('Fait_Retours', 'ID_Vente', 'Fait_Ventes', 'ID_Vente'),
+]
+
+
+@pytest.fixture
+def validateur() -> ValidateurIntegrite:
+    validateur = ValidateurIntegrite(CLES_PRIMAIRES, CLES_ETRANGERES)
+    validateur.controler('Dim_Produit', pd.DataFrame({'ID_Produit': [1, 2, 3]}))
+    validateur.controler('Fait_Ventes', pd.DataFrame({'ID_Vente': [10, 11], 'ID_Produit': [1, 3]}))
+    return validateur
+
+
+def test_produit_orphelin_bloque(validateur):
+    with pytest.raises(ErreurIntegrite, match="Fait_Ventes.ID_Produit"):
+        validateur.controler('Fait_Ventes', pd.DataFrame({'ID_Vente': [12, 13], 'ID_Produit': [2, 99]}))
+    assert validateur.anomalies[-1]['exemples'] == [99]
+
+def test_vente_orpheline_bloque(validateur):
+    with pytest.raises(ErreurIntegrite, match="Fait_Retours.ID_Vente"):
+        validateur.controler('Fait_Retours', pd.DataFrame({'ID_Retour': [1, 2], 'ID_Vente': [10, 42]}))
+
+def test_cles_etrangeres_null_acceptees(validateur):
+    validateur.controler('Fait_Retours', pd.DataFrame({'ID_Retour': [1], 'ID_Vente': pd.array([None], 'Int64')}))
+    assert validateur.anomalies == []
+
+def test_cle_primaire_en_double_entre_deux_lots(validateur):
+    with pytest.raises(ErreurIntegrite, match="clés primaires en double"):
+        validateur.controler('Fait_Ventes', pd.DataFrame({'ID_Vente': [12, 11], 'ID_Produit': [1, 2]}))
+    assert validateur.anomalies[-1]['exemples'] == [11]
+
+def test_mode_signaler_ne_bloque_pas():
+    validateur = ValidateurIntegrite(CLES_PRIMAIRES, CLES_ETRANGERES, bloquant=False)
+    validateur.controler('Dim_Produit', pd.DataFrame({'ID_Produit': [1]}))
+    validateur.controler('Fait_Ventes', pd.DataFrame({'ID_Vente': [10, 10], 'ID_Produit': [1, 5]}))
+    assert [a['controle'] for a in validateur.anomalies] == ["clés primaires en double",
+                                                            "clés absentes de la référence"]
+
+def test_doublons_clients_casse_accents_espaces():
+    clients = pd.DataFrame({
+        'ID_Client': [1, 2, 3, 4],
+        'Nom_Complet': ['Hélène Chraïbi', '  HELENE   chraibi ', 'Hélène Chraïbi', 'Hélène Alaoui'],
+        'Email': ['helene@mail.ma', 'Helene@Mail.MA', 'helene@mail.ma', 'helene@mail.ma'],
+        'Date_Inscription': ['2023-01-05', '2023-01-05', '2023-02-05', '2023-01-05'],
+    })
+
+    doublons = doublons_clients(clients)
+    assert doublons.to_dict('records') == [{'ID_Client': 2, 'ID_Client_Reference': 1}]